@@ -5,6 +5,7 @@ import os
 from config import Config
 from database import db
 from utils.auditoria import registrar_login, registrar_logout
+from services.agendador import iniciar_agendador
 
 # Importar blueprints
 from routes.filiais import filiais_bp
@@ -70,6 +71,26 @@ app.register_blueprint(capacity_bp)
 app.register_blueprint(margem_bp)
 app.register_blueprint(auditoria_bp)
 
+# Devolver ao pool a conexão compartilhada pelos models durante a requisição
+app.teardown_appcontext(db.release_request_connection)
+
+# Tarefas diárias (ex.: status de contas vencidas) fora do caminho das requisições.
+# Não inicia na importação (scripts, testes, o processo vigia do reloader): só nos
+# processos que atendem requisições; iniciar_agendador respeita AGENDADOR_ATIVO e
+# não inicia duas vezes no mesmo processo
+@app.before_request
+def garantir_agendador():
+    iniciar_agendador()
+
+@app.after_request
+def expor_metricas_sql(response):
+    """Expõe os totais de SQL da requisição nos headers (visíveis no DevTools do navegador)"""
+    stats = db.get_request_sql_stats()
+    if stats is not None:
+        response.headers['X-SQL-Queries'] = str(stats.queries)
+        response.headers['Server-Timing'] = f'sql;dur={stats.tempo_ms:.1f};desc="{stats.queries} queries"'
+    return response
+
 # Decorator para rotas protegidas
 def login_required(f):
     @wraps(f)
@@ -421,4 +442,8 @@ def test_database():
         return "❌ Falha na conexão com banco de dados!", 500
 
 if __name__ == '__main__':
+    # Com o reloader do modo debug este bloco roda também no processo vigia, que não
+    # atende requisições; o agendador fica só no processo filho (WERKZEUG_RUN_MAIN)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        iniciar_agendador()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,15 @@
+"""
+Preenche o hash das linhas de extrato importadas antes da migration 016, para
+que novas importações reconheçam as linhas já existentes
+
+Uso: python backfill_hash_extratos.py
+"""
+import time
+from models.conciliacao import Conciliacao
+
+print("=== PREENCHENDO hash_linha DE transacoes_extrato ===\n")
+
+inicio = time.perf_counter()
+linhas = Conciliacao.preencher_hashes_linhas()
+
+print(f"✅ {linhas} linhas preenchidas em {time.perf_counter() - inicio:.2f}s")
@@ -0,0 +1,24 @@
+"""
+Confere os contadores gravados em conciliacoes_bancarias (total_transacoes,
+total_conciliadas, total_pendentes) contra a contagem real de transacoes_extrato
+
+Uso: python check_contadores_conciliacao.py [--corrigir]
+"""
+import sys
+from models.conciliacao import Conciliacao
+
+corrigir = '--corrigir' in sys.argv
+
+print("=== CONTADORES DAS CONCILIAÇÕES ===\n")
+
+divergencias = Conciliacao.verificar_contadores(corrigir=corrigir)
+
+for d in divergencias:
+    print(f"Conciliação {d['id']:5d} | gravado (total, conciliadas, pendentes): {d['gravado']} | real: {d['real']}")
+
+if not divergencias:
+    print("✅ Todos os contadores conferem")
+elif corrigir:
+    print(f"\n✅ {len(divergencias)} conciliação(ões) corrigida(s)")
+else:
+    print(f"\n⚠️  {len(divergencias)} conciliação(ões) divergente(s). Rode com --corrigir para gravar os valores reais")
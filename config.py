@@ -14,6 +14,34 @@ class Config:
     MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD') or ''
     MYSQL_DATABASE = os.environ.get('MYSQL_DATABASE') or 'meetcall_system'
     
+    # Pool de conexões MySQL
+    MYSQL_POOL_MIN = int(os.environ.get('MYSQL_POOL_MIN') or 2)
+    MYSQL_POOL_MAX = int(os.environ.get('MYSQL_POOL_MAX') or 10)
+    MYSQL_POOL_TIMEOUT = float(os.environ.get('MYSQL_POOL_TIMEOUT') or 10)  # segundos aguardando uma conexão livre
+    MYSQL_POOL_VALIDAR_APOS = int(os.environ.get('MYSQL_POOL_VALIDAR_APOS') or 30)  # segundos ociosa antes do ping
+    MYSQL_POOL_RECICLAR_APOS = int(os.environ.get('MYSQL_POOL_RECICLAR_APOS') or 3600)  # tempo de vida máximo da conexão
+    MYSQL_POOL_RESET_SESSAO = (os.environ.get('MYSQL_POOL_RESET_SESSAO') or 'false').lower() == 'true'
+    
+    # Instrumentação de SQL (contagem por requisição, log de queries lentas, detector de N+1)
+    SQL_INSTRUMENTACAO = (os.environ.get('SQL_INSTRUMENTACAO') or 'true').lower() == 'true'
+    SQL_LENTA_MS = float(os.environ.get('SQL_LENTA_MS') or 200)  # acima disso vai para o log de queries lentas
+    SQL_LOG_LENTAS = os.environ.get('SQL_LOG_LENTAS') or os.path.join('logs', 'sql_lentas.log')
+    SQL_N_MAIS_1_LIMITE = int(os.environ.get('SQL_N_MAIS_1_LIMITE') or 10)  # execuções da mesma query por requisição
+    
+    # Inserções em lote (INSERT com várias linhas): linhas por comando
+    INSERCAO_LOTE_TAMANHO = int(os.environ.get('INSERCAO_LOTE_TAMANHO') or 1000)
+    
+    # Cache de resultados dos endpoints de dashboard/relatórios
+    CACHE_TTL = int(os.environ.get('CACHE_TTL') or 300)  # segundos
+    CACHE_MAX_ITENS = int(os.environ.get('CACHE_MAX_ITENS') or 256)
+    
+    # Agendador de tarefas diárias (status de contas vencidas)
+    AGENDADOR_ATIVO = (os.environ.get('AGENDADOR_ATIVO') or 'true').lower() == 'true'
+    AGENDADOR_HORARIO = os.environ.get('AGENDADOR_HORARIO') or '00:05'  # HH:MM, horário local do servidor
+    
+    # Conciliação bancária: similaridade de descrição/documento (tokens, trigramas, combinada ou sequencia)
+    CONCILIACAO_SIMILARIDADE = os.environ.get('CONCILIACAO_SIMILARIDADE') or 'combinada'
+    
     # Configurações de Email/SMTP
     SMTP_HOST = os.environ.get('SMTP_HOST') or 'smtp.gmail.com'
     SMTP_PORT = int(os.environ.get('SMTP_PORT') or 587)
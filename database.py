@@ -1,26 +1,668 @@
+import os
+import re
+import sys
+import hashlib
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
 import mysql.connector
+from mysql.connector import errors as mysql_errors
 import bcrypt
 from contextlib import contextmanager
+from flask import g, has_app_context
 from config import Config
 
+# Conexão compartilhada fora de requisições Flask (scripts, jobs) durante um unit_of_work
+_thread_state = threading.local()
+
+
+class PoolExhaustedError(mysql_errors.PoolError):
+    """Nenhuma conexão ficou livre dentro do timeout de checkout"""
+
+
+class TransactionRolledBackError(mysql_errors.Error):
+    """Algum model desfez a transação dentro de um unit_of_work que terminou sem exceção"""
+
+
+_RE_COMENTARIO = re.compile(r'/\*.*?\*/|--[^\n]*', re.S)
+_RE_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_RE_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_RE_PARAM = re.compile(r'%\(\w+\)s|%s|\?')
+_RE_LISTA = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_RE_ESPACO = re.compile(r'\s+')
+
+_log_lentas_lock = threading.Lock()
+
+
+@lru_cache(maxsize=2048)
+def fingerprint_sql(sql):
+    """
+    Normaliza o SQL (literais e parâmetros viram ?, listas IN colapsadas, espaços únicos)
+    
+    Returns:
+        tuple: (sql normalizado, hash curto que identifica a "forma" da query)
+    """
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode('utf-8', 'replace')
+    normalizado = _RE_COMENTARIO.sub(' ', sql)
+    normalizado = _RE_STRING.sub('?', normalizado)
+    normalizado = _RE_PARAM.sub('?', normalizado)
+    normalizado = _RE_NUMERO.sub('?', normalizado)
+    normalizado = _RE_LISTA.sub('(?+)', normalizado)
+    normalizado = _RE_ESPACO.sub(' ', normalizado).strip().lower()
+    return normalizado, hashlib.sha1(normalizado.encode('utf-8')).hexdigest()[:12]
+
+
+def inserir_em_lote(cursor, tabela, colunas, linhas, tamanho_lote=None, retornar_ids=False):
+    """
+    INSERT de várias linhas por comando (INSERT ... VALUES (...), (...), ...)
+    
+    Substitui os laços com um cursor.execute por linha: cada lote de tamanho_lote
+    linhas vai ao banco em uma única ida e volta. Não faz commit (a transação é do
+    chamador).
+    
+    Args:
+        cursor: Cursor da conexão/transação do chamador
+        tabela (str): Nome da tabela
+        colunas (list): Colunas na ordem dos valores de cada linha
+        linhas (list): Tuplas de valores
+        tamanho_lote (int): Linhas por comando (padrão: Config.INSERCAO_LOTE_TAMANHO)
+        retornar_ids (bool): Devolve os ids gerados (AUTO_INCREMENT). Um INSERT com
+                             VALUES é um "simple insert" para o InnoDB, que reserva
+                             os ids do comando inteiro de uma vez, a partir do
+                             primeiro e de @@auto_increment_increment em
+                             @@auto_increment_increment (diferente de 1 em replicação
+                             multi-primário/Galera)
+    
+    Returns:
+        dict: {'linhas', 'segundos', 'linhas_por_segundo', 'ids'}
+    """
+    tamanho_lote = tamanho_lote or Config.INSERCAO_LOTE_TAMANHO
+    linha_sql = f"({', '.join(['%s'] * len(colunas))})"
+    prefixo = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES "
+    ids = [] if retornar_ids else None
+    passo = 1
+    if retornar_ids and linhas:
+        cursor.execute("SELECT @@SESSION.auto_increment_increment AS passo")
+        resultado = cursor.fetchone()
+        passo = int(resultado['passo'] if isinstance(resultado, dict) else resultado[0])
+    
+    inicio = time.perf_counter()
+    for posicao in range(0, len(linhas), tamanho_lote):
+        lote = linhas[posicao:posicao + tamanho_lote]
+        params = [valor for linha in lote for valor in linha]
+        cursor.execute(prefixo + ', '.join([linha_sql] * len(lote)), params)
+        if retornar_ids:
+            ids.extend(range(cursor.lastrowid, cursor.lastrowid + len(lote) * passo, passo))
+    segundos = time.perf_counter() - inicio
+    
+    return {
+        'linhas': len(linhas),
+        'segundos': segundos,
+        'linhas_por_segundo': len(linhas) / segundos if segundos > 0 else float(len(linhas)),
+        'ids': ids
+    }
+
+
+def _chamador():
+    """Primeiro frame de models/ (ou, na falta, fora deste arquivo) que disparou a query"""
+    frame = sys._getframe(2)
+    fora_daqui = None
+    while frame is not None:
+        modulo = frame.f_globals.get('__name__', '')
+        if modulo.startswith('models.'):
+            return f"{modulo}.{frame.f_code.co_qualname}"
+        if fora_daqui is None and modulo != __name__ and not modulo.startswith('contextlib'):
+            fora_daqui = f"{modulo}.{frame.f_code.co_qualname}"
+        frame = frame.f_back
+    return fora_daqui or '?'
+
+
+class RequestSQLStats:
+    """Totais de SQL de uma requisição: quantidade, tempo, linhas e execuções por fingerprint"""
+    
+    def __init__(self):
+        self.queries = 0
+        self.tempo_ms = 0.0
+        self.linhas = 0
+        self.por_fingerprint = {}
+        self.suspeitas_n_mais_1 = []
+    
+    def registrar(self, fingerprint, sql, duracao_ms, linhas, chamador, limite_n_mais_1):
+        self.queries += 1
+        self.tempo_ms += duracao_ms
+        self.linhas += linhas or 0
+        
+        item = self.por_fingerprint.get(fingerprint)
+        if item is None:
+            item = self.por_fingerprint[fingerprint] = {
+                'sql': sql, 'execucoes': 0, 'tempo_ms': 0.0, 'linhas': 0, 'chamadores': set()
+            }
+        item['execucoes'] += 1
+        item['tempo_ms'] += duracao_ms
+        item['linhas'] += linhas or 0
+        item['chamadores'].add(chamador)
+        
+        # Avisa uma única vez por fingerprint, no momento em que o limite é ultrapassado
+        if limite_n_mais_1 and item['execucoes'] == limite_n_mais_1 + 1:
+            self.suspeitas_n_mais_1.append(fingerprint)
+            return True
+        return False
+    
+    def resumo(self):
+        return {
+            'queries': self.queries,
+            'tempo_ms': round(self.tempo_ms, 2),
+            'linhas': self.linhas,
+            'fingerprints': len(self.por_fingerprint),
+            'suspeitas_n_mais_1': [
+                {
+                    'fingerprint': fp,
+                    'sql': self.por_fingerprint[fp]['sql'],
+                    'execucoes': self.por_fingerprint[fp]['execucoes'],
+                    'chamadores': sorted(self.por_fingerprint[fp]['chamadores'])
+                }
+                for fp in self.suspeitas_n_mais_1
+            ]
+        }
+
+
+class InstrumentedCursor:
+    """
+    Cursor que mede cada statement: fingerprint, duração, linhas e método do model chamador
+    
+    Demais atributos (rowcount, lastrowid, description, ...) são delegados ao cursor real.
+    """
+    
+    def __init__(self, raw, config):
+        self.raw = raw
+        self._config = config
+        self._pendente = None  # (fingerprint, sql) de um SELECT não bufferizado ainda sem contagem de linhas
+    
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+    
+    def __iter__(self):
+        row = self.fetchone()
+        while row is not None:
+            yield row
+            row = self.fetchone()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def execute(self, operation, params=None, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self.raw.execute(operation, params, *args, **kwargs)
+        finally:
+            self._registrar(operation, inicio)
+    
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self.raw.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._registrar(operation, inicio)
+    
+    def fetchone(self):
+        row = self.raw.fetchone()
+        if row is not None:
+            self._contar_linhas(1)
+        return row
+    
+    def fetchmany(self, *args, **kwargs):
+        rows = self.raw.fetchmany(*args, **kwargs)
+        self._contar_linhas(len(rows))
+        return rows
+    
+    def fetchall(self):
+        rows = self.raw.fetchall()
+        self._contar_linhas(len(rows))
+        return rows
+    
+    def _contar_linhas(self, quantidade):
+        # Cursores bufferizados já informam as linhas no rowcount logo após o execute
+        if self._pendente is not None and quantidade:
+            stats = DatabaseManager.get_request_sql_stats()
+            if stats is not None:
+                fingerprint = self._pendente[0]
+                stats.linhas += quantidade
+                stats.por_fingerprint[fingerprint]['linhas'] += quantidade
+    
+    def _registrar(self, operation, inicio):
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        sql, fingerprint = fingerprint_sql(operation)
+        rowcount = getattr(self.raw, 'rowcount', -1)
+        linhas = rowcount if rowcount is not None and rowcount >= 0 else None
+        self._pendente = (fingerprint, sql) if linhas is None else None
+        chamador = _chamador()
+        
+        stats = DatabaseManager.get_request_sql_stats(criar=True)
+        if stats is not None:
+            if stats.registrar(fingerprint, sql, duracao_ms, linhas, chamador,
+                               self._config.SQL_N_MAIS_1_LIMITE):
+                print(f"⚠️ N+1 suspeito: [{fingerprint}] executada mais de "
+                      f"{self._config.SQL_N_MAIS_1_LIMITE}x na requisição por {chamador}: {sql[:200]}")
+        
+        if duracao_ms >= self._config.SQL_LENTA_MS:
+            self._log_lenta(fingerprint, sql, duracao_ms, linhas, chamador, operation)
+    
+    def _log_lenta(self, fingerprint, sql, duracao_ms, linhas, chamador, operation):
+        caminho = self._config.SQL_LOG_LENTAS
+        linha = (f"{datetime.now().isoformat(timespec='seconds')} {duracao_ms:.1f}ms "
+                 f"linhas={'?' if linhas is None else linhas} fp={fingerprint} "
+                 f"chamador={chamador} sql={sql}\n")
+        try:
+            with _log_lentas_lock:
+                pasta = os.path.dirname(caminho)
+                if pasta:
+                    os.makedirs(pasta, exist_ok=True)
+                with open(caminho, 'a', encoding='utf-8') as arquivo:
+                    arquivo.write(linha)
+        except OSError as e:
+            print(f"Erro ao gravar log de queries lentas: {e}")
+
+
+class ManagedConnection:
+    """
+    Conexão emprestada do pool e compartilhada pelos models de uma mesma requisição
+    
+    Dentro de um unit_of_work os commit() dos models são adiados para o fim da unidade,
+    de modo que várias operações formam uma única transação.
+    """
+    
+    def __init__(self, raw, config=None):
+        self.raw = raw
+        self._config = config
+        self._uow_depth = 0
+        self._rollback_only = False
+        self._apos_commit = []
+    
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+    
+    def cursor(self, *args, **kwargs):
+        # Cursores bufferizados: um model que não consome todas as linhas não pode
+        # travar a conexão para o próximo model da requisição ("Unread result found")
+        kwargs.setdefault('buffered', True)
+        cursor = self.raw.cursor(*args, **kwargs)
+        if self._config is not None and self._config.SQL_INSTRUMENTACAO:
+            return InstrumentedCursor(cursor, self._config)
+        return cursor
+    
+    def commit(self):
+        if self._uow_depth:
+            return
+        self.raw.commit()
+    
+    def rollback(self):
+        if self._uow_depth:
+            self._rollback_only = True
+        self.raw.rollback()
+    
+    def close(self):
+        """A conexão é devolvida ao pool pelo DatabaseManager, nunca fechada pelo model"""
+    
+    def apos_commit(self, callback):
+        """Executa o callback após o commit real (imediatamente fora de um unit_of_work)"""
+        if self._uow_depth:
+            self._apos_commit.append(callback)
+        else:
+            callback()
+    
+    @property
+    def in_unit_of_work(self):
+        return self._uow_depth > 0
+    
+    def begin_unit(self):
+        if self._uow_depth == 0:
+            # Encerra o snapshot de leituras anteriores para a unidade enxergar dados atuais
+            if self.raw.in_transaction:
+                self.raw.commit()
+            self._rollback_only = False
+        self._uow_depth += 1
+    
+    def end_unit(self, success):
+        self._uow_depth -= 1
+        if not success:
+            self._rollback_only = True
+        if self._uow_depth > 0:
+            return
+        
+        rollback_only = self._rollback_only
+        callbacks, self._apos_commit = self._apos_commit, []
+        self._rollback_only = False
+        if rollback_only:
+            self.raw.rollback()
+            if success:
+                raise TransactionRolledBackError(msg='A transação foi desfeita durante o unit_of_work')
+        else:
+            self.raw.commit()
+            for callback in callbacks:
+                callback()
+
+
+class ConnectionPool:
+    """
+    Pool de conexões MySQL com tamanho mínimo/máximo, timeout de checkout,
+    reset da conexão na devolução e validação de conexões ociosas
+    """
+    
+    def __init__(self, mysql_config, min_size=2, max_size=10, timeout=10.0,
+                 validate_after=30, recycle_after=3600, reset_session=False):
+        self.mysql_config = dict(mysql_config)
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.timeout = timeout
+        self.validate_after = validate_after
+        self.recycle_after = recycle_after
+        self.reset_session = reset_session
+        
+        self._idle = deque()  # (conexão, devolvida_em)
+        self._size = 0
+        self._cond = threading.Condition()
+        self._filled = False
+        self._stats = {
+            'checkouts': 0,
+            'esperas': 0,
+            'esgotamentos': 0,
+            'criadas': 0,
+            'descartadas': 0,
+            'invalidas': 0
+        }
+    
+    def _connect(self):
+        """Abre uma nova conexão física"""
+        connection = mysql.connector.connect(**self.mysql_config)
+        connection._pool_created_at = time.monotonic()
+        with self._cond:
+            self._stats['criadas'] += 1
+        return connection
+    
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+    
+    def _fill(self):
+        """Abre as conexões mínimas no primeiro uso (não na importação do módulo)"""
+        with self._cond:
+            if self._filled:
+                return
+            self._filled = True
+            faltantes = self.min_size - self._size
+            self._size += max(0, faltantes)
+        
+        for _ in range(max(0, faltantes)):
+            try:
+                connection = self._connect()
+            except mysql.connector.Error:
+                with self._cond:
+                    self._size -= 1
+                continue
+            with self._cond:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+    
+    def acquire(self):
+        """
+        Retira uma conexão do pool, aguardando até `timeout` segundos
+        
+        Raises:
+            PoolExhaustedError: Se nenhuma conexão ficar livre no prazo
+        """
+        if not self._filled:
+            self._fill()
+        
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        
+        with self._cond:
+            self._stats['checkouts'] += 1
+            while True:
+                if self._idle:
+                    # LIFO: a conexão devolvida mais recentemente tem mais chance de estar viva
+                    connection, returned_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    connection, returned_at = None, None
+                    break
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['esgotamentos'] += 1
+                    raise PoolExhaustedError(
+                        msg=f"Pool de conexões esgotado ({self.max_size} em uso) após {self.timeout}s"
+                    )
+                if not waited:
+                    self._stats['esperas'] += 1
+                    waited = True
+                self._cond.wait(remaining)
+        
+        if connection is None:
+            try:
+                return self._connect()
+            except Exception:
+                self._discard_slot()
+                raise
+        
+        return self._validate(connection, returned_at)
+    
+    def _validate(self, connection, returned_at):
+        """Recicla conexões antigas e faz ping nas que ficaram muito tempo ociosas"""
+        now = time.monotonic()
+        created_at = getattr(connection, '_pool_created_at', now)
+        
+        if self.recycle_after and now - created_at > self.recycle_after:
+            return self._replace(connection)
+        
+        if now - returned_at > self.validate_after:
+            try:
+                connection.ping(reconnect=False)
+            except mysql.connector.Error:
+                with self._cond:
+                    self._stats['invalidas'] += 1
+                return self._replace(connection)
+        
+        return connection
+    
+    def _replace(self, connection):
+        """Fecha uma conexão e ocupa o mesmo slot com uma nova"""
+        self._close_quietly(connection)
+        try:
+            return self._connect()
+        except Exception:
+            self._discard_slot()
+            raise
+    
+    def _discard_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._stats['descartadas'] += 1
+            self._cond.notify()
+    
+    def release(self, connection):
+        """Devolve a conexão ao pool, desfazendo transação e resultados pendentes"""
+        try:
+            if connection.unread_result:
+                connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+            if self.reset_session:
+                connection.reset_session()
+            reusable = connection.is_connected()
+        except mysql.connector.Error:
+            reusable = False
+        
+        if not reusable:
+            self._close_quietly(connection)
+            self._discard_slot()
+            return
+        
+        with self._cond:
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+    
+    def close_all(self):
+        """Fecha as conexões ociosas (as em uso são fechadas ao serem devolvidas)"""
+        with self._cond:
+            ociosas = list(self._idle)
+            self._idle.clear()
+            self._size -= len(ociosas)
+            self._filled = False
+        for connection, _ in ociosas:
+            self._close_quietly(connection)
+    
+    def stats(self):
+        """Retorna contadores e ocupação atual do pool"""
+        with self._cond:
+            dados = dict(self._stats)
+            dados.update({
+                'tamanho': self._size,
+                'ociosas': len(self._idle),
+                'em_uso': self._size - len(self._idle),
+                'min': self.min_size,
+                'max': self.max_size
+            })
+            return dados
+
+
 class DatabaseManager:
+    _pool = None
+    _pool_pid = None
+    _pool_lock = threading.Lock()
+    
     def __init__(self):
         self.config = Config()
     
+    @property
+    def pool(self):
+        """Pool compartilhado por todas as instâncias (recriado após fork do processo)"""
+        pid = os.getpid()
+        if DatabaseManager._pool is None or DatabaseManager._pool_pid != pid:
+            with DatabaseManager._pool_lock:
+                if DatabaseManager._pool is None or DatabaseManager._pool_pid != pid:
+                    DatabaseManager._pool = ConnectionPool(
+                        self.config.MYSQL_CONFIG,
+                        min_size=self.config.MYSQL_POOL_MIN,
+                        max_size=self.config.MYSQL_POOL_MAX,
+                        timeout=self.config.MYSQL_POOL_TIMEOUT,
+                        validate_after=self.config.MYSQL_POOL_VALIDAR_APOS,
+                        recycle_after=self.config.MYSQL_POOL_RECICLAR_APOS,
+                        reset_session=self.config.MYSQL_POOL_RESET_SESSAO
+                    )
+                    DatabaseManager._pool_pid = pid
+        return DatabaseManager._pool
+    
+    @staticmethod
+    def _scope():
+        """Onde a conexão compartilhada fica: g durante a requisição, thread-local fora dela"""
+        return g if has_app_context() else _thread_state
+    
     @contextmanager
-    def get_connection(self):
-        """Context manager para conexões com o banco de dados"""
+    def get_connection(self, isolated=False):
+        """
+        Context manager para conexões com o banco de dados (emprestadas do pool)
+        
+        Dentro de uma requisição Flask todos os models recebem a mesma conexão,
+        devolvida ao pool no teardown (release_request_connection).
+        
+        Args:
+            isolated (bool): Força uma conexão própria, fora da conexão da requisição
+                             (ex.: leituras em streaming com cursor não bufferizado)
+        """
+        shared = None if isolated else getattr(self._scope(), '_db_connection', None)
+        
+        if shared is None and not isolated and has_app_context():
+            shared = ManagedConnection(self.pool.acquire(), self.config)
+            g._db_connection = shared
+        
+        if shared is not None:
+            try:
+                yield shared
+            except Exception as e:
+                # Qualquer falha no meio de um model desfaz o que ele já escreveu, como
+                # acontecia quando cada model fechava a própria conexão
+                try:
+                    shared.rollback()
+                except mysql.connector.Error:
+                    pass
+                raise e
+            return
+        
         connection = None
         try:
-            connection = mysql.connector.connect(**self.config.MYSQL_CONFIG)
+            connection = ManagedConnection(self.pool.acquire(), self.config)
             yield connection
-        except mysql.connector.Error as e:
+        except Exception as e:
             if connection:
-                connection.rollback()
+                try:
+                    connection.rollback()
+                except mysql.connector.Error:
+                    pass
             raise e
         finally:
-            if connection and connection.is_connected():
-                connection.close()
+            if connection:
+                self.pool.release(connection.raw)
+    
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Executa várias operações de models em uma única transação
+        
+        Todos os get_connection() feitos dentro do bloco usam a mesma conexão e os
+        commits dos models são adiados até o fim do bloco. Uma exceção desfaz tudo.
+        
+        Usage:
+            with db.unit_of_work():
+                ContaPagarModel.baixar(conta_id, dados_baixa)
+                ContaBancariaModel.debitar(conta_bancaria_id, valor)
+        """
+        scope = self._scope()
+        owner = getattr(scope, '_db_connection', None) is None and not has_app_context()
+        
+        with self.get_connection() as connection:
+            if owner:
+                scope._db_connection = connection
+            try:
+                connection.begin_unit()
+                try:
+                    yield connection
+                except BaseException:
+                    connection.end_unit(success=False)
+                    raise
+                connection.end_unit(success=True)
+            finally:
+                if owner:
+                    scope._db_connection = None
+    
+    def release_request_connection(self, exc=None):
+        """Devolve ao pool a conexão da requisição (registrado em app.teardown_appcontext)"""
+        connection = g.pop('_db_connection', None) if has_app_context() else None
+        if connection is not None:
+            self.pool.release(connection.raw)
+    
+    @staticmethod
+    def get_request_sql_stats(criar=False):
+        """Totais de SQL da requisição atual (None fora de uma requisição Flask)"""
+        if not has_app_context():
+            return None
+        stats = g.get('_sql_stats')
+        if stats is None and criar:
+            stats = g._sql_stats = RequestSQLStats()
+        return stats
+    
+    def get_pool_stats(self):
+        """Retorna os contadores do pool (checkouts, esperas, esgotamentos, ...)"""
+        return self.pool.stats()
     
     def initialize_database(self):
         """Cria o banco de dados e as tabelas se não existirem"""
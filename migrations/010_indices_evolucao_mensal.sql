@@ -0,0 +1,11 @@
+-- Migration 010: Índices para a evolução mensal do dashboard
+-- Data: 17/10/2026
+
+-- A evolução mensal agrupa por mês da data de realização (pagamento/recebimento/lançamento)
+-- filtrando pelo status. Sem estes índices cada ramo da consulta faz table scan completo.
+
+CREATE INDEX idx_status_data_recebimento ON contas_receber(status, data_recebimento);
+
+CREATE INDEX idx_status_data_pagamento ON contas_pagar(status, data_pagamento);
+
+CREATE INDEX idx_status_data_lancamento ON lancamentos_manuais(status, data_lancamento);
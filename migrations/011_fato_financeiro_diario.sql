@@ -0,0 +1,31 @@
+-- Migration 011: Tabela fato_financeiro_diario
+-- Data: 17/10/2026
+
+-- ======================================
+-- Resumo diário materializado de contas a receber, contas a pagar e lançamentos manuais
+-- ======================================
+
+-- Uma linha por (data, direção, natureza, origem, filial, conta bancária, centro de custo, conta contábil).
+-- Dimensões ausentes são gravadas como 0 (e não NULL) para fazerem parte da chave primária.
+-- Mantida incrementalmente pelos models (FatoFinanceiroModel) na mesma transação da escrita.
+-- Após aplicar esta migration, popular com: python rebuild_fato_financeiro.py
+
+CREATE TABLE IF NOT EXISTS fato_financeiro_diario (
+    data DATE NOT NULL,
+    direcao ENUM('entrada', 'saida') NOT NULL,
+    natureza ENUM('realizado', 'projetado') NOT NULL,
+    origem ENUM('conta_receber', 'conta_pagar', 'lancamento_manual') NOT NULL,
+    filial_id INT NOT NULL DEFAULT 0,
+    conta_bancaria_id INT NOT NULL DEFAULT 0,
+    centro_custo_id INT NOT NULL DEFAULT 0,
+    conta_contabil_id INT NOT NULL DEFAULT 0,
+    valor_bruto DECIMAL(15,2) NOT NULL DEFAULT 0 COMMENT 'valor_total (ou valor do lançamento)',
+    valor_desconto DECIMAL(15,2) NOT NULL DEFAULT 0,
+    valor_encargos DECIMAL(15,2) NOT NULL DEFAULT 0 COMMENT 'juros + multa',
+    valor_liquido DECIMAL(15,2) NOT NULL DEFAULT 0 COMMENT 'bruto - desconto + encargos',
+    quantidade INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (data, direcao, natureza, origem, filial_id, conta_bancaria_id, centro_custo_id, conta_contabil_id),
+    INDEX idx_natureza_data (natureza, data),
+    INDEX idx_filial_data (filial_id, data)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
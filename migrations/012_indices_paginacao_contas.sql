@@ -0,0 +1,20 @@
+-- Migration 012: Índices para a listagem paginada de contas a pagar/receber
+-- Data: 17/10/2026
+
+-- A listagem usa paginação por keyset: ORDER BY coluna, id com LIMIT a partir do
+-- último (coluna, id) visto. O InnoDB já inclui o id em todo índice secundário, então
+-- um índice na coluna de ordenação atende tanto a ordem quanto o ponto de partida.
+-- data_vencimento já tem idx_data_vencimento, e o filtro por status usa
+-- idx_status_data_vencimento.
+
+CREATE INDEX idx_status_data_vencimento ON contas_pagar(status, data_vencimento);
+
+CREATE INDEX idx_data_emissao ON contas_pagar(data_emissao);
+
+CREATE INDEX idx_valor_total ON contas_pagar(valor_total);
+
+CREATE INDEX idx_status_data_vencimento ON contas_receber(status, data_vencimento);
+
+CREATE INDEX idx_data_emissao ON contas_receber(data_emissao);
+
+CREATE INDEX idx_valor_total ON contas_receber(valor_total);
@@ -0,0 +1,53 @@
+-- Migration 013: Razão de movimentos bancários e saldos mensais
+-- Data: 17/10/2026
+
+-- ======================================
+-- Diário (append-only) de todo movimento que altera saldo_atual
+-- ======================================
+
+-- valor é assinado: positivo = entrada (crédito), negativo = saída (débito).
+-- saldo_apos é o saldo_atual logo após o lançamento (ordem de gravação, não de data).
+-- data_movimento é a data financeira (ex.: data do pagamento), que pode ser retroativa.
+
+CREATE TABLE IF NOT EXISTS movimentos_bancarios (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    conta_bancaria_id INT NOT NULL,
+    data_movimento DATE NOT NULL,
+    valor DECIMAL(18,2) NOT NULL COMMENT 'positivo = crédito, negativo = débito',
+    saldo_apos DECIMAL(18,2) NOT NULL COMMENT 'saldo_atual após o lançamento',
+    origem VARCHAR(30) NOT NULL DEFAULT 'manual' COMMENT 'conta_pagar, conta_receber, ajuste, abertura...',
+    origem_id INT NULL,
+    descricao VARCHAR(255) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (conta_bancaria_id) REFERENCES contas_bancarias(id),
+    INDEX idx_conta_data (conta_bancaria_id, data_movimento),
+    INDEX idx_origem (origem, origem_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ======================================
+-- Checkpoints: saldo de cada conta ao fim de cada mês fechado
+-- ======================================
+
+-- Gerados pelo agendador diário para os meses já encerrados. Um movimento retroativo
+-- soma seu valor em todos os checkpoints a partir do mês dele, na mesma transação.
+
+CREATE TABLE IF NOT EXISTS saldos_bancarios_mensais (
+    conta_bancaria_id INT NOT NULL,
+    mes DATE NOT NULL COMMENT 'primeiro dia do mês',
+    saldo_final DECIMAL(18,2) NOT NULL COMMENT 'saldo ao fim do último dia do mês',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (conta_bancaria_id, mes),
+    FOREIGN KEY (conta_bancaria_id) REFERENCES contas_bancarias(id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ======================================
+-- Abertura do razão para as contas existentes
+-- ======================================
+
+-- Não há histórico anterior a esta migration: o saldo atual entra como movimento de
+-- abertura na data de criação da conta.
+
+INSERT INTO movimentos_bancarios (conta_bancaria_id, data_movimento, valor, saldo_apos, origem, descricao)
+SELECT cb.id, DATE(cb.created_at), cb.saldo_atual, cb.saldo_atual, 'abertura', 'Saldo na abertura do razão de movimentos'
+FROM contas_bancarias cb
+WHERE NOT EXISTS (SELECT 1 FROM movimentos_bancarios m WHERE m.conta_bancaria_id = cb.id);
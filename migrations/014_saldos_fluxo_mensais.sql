@@ -0,0 +1,23 @@
+-- Migration 014: Checkpoints mensais do saldo realizado (fluxo de caixa e DFC)
+-- Data: 17/10/2026
+
+-- ======================================
+-- Saldo realizado acumulado até o fim de cada mês fechado
+-- ======================================
+
+-- Uma linha por (mês, filial, conta bancária, origem), com as mesmas dimensões de
+-- fato_financeiro_diario: os filtros de filial e de conta das consultas do fato valem aqui.
+-- saldo = entradas - saídas realizadas (valor_liquido) desde o início até o último dia do mês.
+-- Os meses formam sempre um prefixo contínuo: uma escrita realizada em um mês já fechado
+-- apaga os checkpoints daquele mês em diante, que são recalculados na próxima consulta.
+-- Não precisa ser populada: é gerada sob demanda (SaldoFluxoModel) e pelo agendador diário.
+
+CREATE TABLE IF NOT EXISTS saldos_fluxo_mensais (
+    mes DATE NOT NULL COMMENT 'primeiro dia do mês',
+    filial_id INT NOT NULL DEFAULT 0,
+    conta_bancaria_id INT NOT NULL DEFAULT 0,
+    origem ENUM('conta_receber', 'conta_pagar', 'lancamento_manual') NOT NULL,
+    saldo DECIMAL(18,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (mes, filial_id, conta_bancaria_id, origem)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
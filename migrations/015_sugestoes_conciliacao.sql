@@ -0,0 +1,43 @@
+-- Migration 015: Sugestões de conciliação persistidas
+-- Data: 17/10/2026
+
+-- ======================================
+-- Pares (linha do extrato, transação do sistema) pontuados pelo matching automático
+-- ======================================
+
+-- Calculadas com as tolerâncias padrão e lidas pela página de matching, em vez de
+-- recalcular tudo a cada carregamento. Os dados da transação do sistema são uma cópia
+-- do momento do cálculo (descrição, documento, data e valor), para a página não
+-- precisar consultar as três tabelas de origem.
+-- Conciliar apaga as sugestões da linha e as da transação do sistema usada.
+-- Desconciliar marca para recálculo a linha e as linhas pendentes próximas da
+-- transação liberada (transacoes_extrato.sugestoes_calculadas_em = NULL).
+
+CREATE TABLE IF NOT EXISTS sugestoes_conciliacao (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    conciliacao_id INT NOT NULL,
+    transacao_extrato_id INT NOT NULL,
+    transacao_sistema_tipo ENUM('contas_pagar', 'contas_receber', 'lancamento_manual') NOT NULL,
+    transacao_sistema_id INT NOT NULL,
+    entidade_id INT NULL,
+    descricao VARCHAR(500) NULL,
+    documento VARCHAR(100) NULL,
+    data_transacao DATE NOT NULL,
+    valor DECIMAL(15,2) NOT NULL,
+    similaridade DECIMAL(5,2) NOT NULL,
+    sim_descricao DECIMAL(5,2) NOT NULL DEFAULT 0,
+    sim_valor DECIMAL(5,2) NOT NULL DEFAULT 0,
+    sim_data DECIMAL(5,2) NOT NULL DEFAULT 0,
+    sim_documento DECIMAL(5,2) NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (conciliacao_id) REFERENCES conciliacoes_bancarias(id) ON DELETE CASCADE,
+    FOREIGN KEY (transacao_extrato_id) REFERENCES transacoes_extrato(id) ON DELETE CASCADE,
+    UNIQUE KEY uk_par (transacao_extrato_id, transacao_sistema_tipo, transacao_sistema_id),
+    INDEX idx_conciliacao (conciliacao_id),
+    INDEX idx_transacao_sistema (transacao_sistema_tipo, transacao_sistema_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- NULL = linha nova ou afetada por uma (des)conciliação: sugestões a recalcular
+ALTER TABLE transacoes_extrato ADD COLUMN sugestoes_calculadas_em DATETIME NULL;
+
+CREATE INDEX idx_conciliacao_sugestoes ON transacoes_extrato(conciliacao_id, sugestoes_calculadas_em);
@@ -0,0 +1,21 @@
+-- Migration 016: Impressão digital (hash) de extratos e de linhas do extrato
+-- Data: 17/10/2026
+
+-- ======================================
+-- Detecção de reimportação por conteúdo
+-- ======================================
+
+-- hash_arquivo: SHA-256 do arquivo importado. O mesmo arquivo (mesmo renomeado)
+-- na mesma conta é recusado com uma busca pelo índice (conta, hash), no lugar do
+-- antigo nome_arquivo LIKE '%nome'.
+ALTER TABLE conciliacoes_bancarias
+    ADD COLUMN hash_arquivo CHAR(64) NULL AFTER nome_arquivo,
+    ADD INDEX idx_conta_hash_arquivo (conta_bancaria_id, hash_arquivo);
+
+-- hash_linha: SHA-256 de (conta, data, tipo, valor, documento, descrição normalizada,
+-- ordem da repetição no arquivo). Linhas já importadas por outro extrato da mesma
+-- conta (períodos sobrepostos) são puladas na importação.
+-- Linhas anteriores a esta migration ficam com NULL até rodar backfill_hash_extratos.py
+ALTER TABLE transacoes_extrato
+    ADD COLUMN hash_linha CHAR(64) NULL AFTER saldo_apos,
+    ADD INDEX idx_hash_linha (hash_linha);
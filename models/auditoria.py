@@ -50,6 +50,48 @@ class AuditoriaModel:
             conn.commit()
             return cursor.lastrowid
     
+    @staticmethod
+    def registrar_acoes_lote(tabela, acao, registros, usuario_id=None, ip_address=None):
+        """
+        Registra a mesma ação para vários registros em um único INSERT
+        
+        Args:
+            tabela: Nome da tabela afetada
+            acao: Tipo de ação ('insert', 'update', 'delete', ...)
+            registros: Lista de tuplas (registro_id, dados_novos)
+            usuario_id: ID do usuário que executou a ação
+            ip_address: Endereço IP do usuário
+        
+        Returns:
+            int: Quantidade de logs gravados
+        """
+        if not registros:
+            return 0
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # executemany de INSERT vira um único INSERT com várias linhas no conector
+            cursor.executemany("""
+                INSERT INTO auditoria 
+                (usuario_id, acao, tabela, registro_id, dados_anteriores, dados_novos, ip_address)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, [
+                (
+                    usuario_id,
+                    acao,
+                    tabela,
+                    registro_id,
+                    None,
+                    json.dumps(dados_novos, default=str) if dados_novos else None,
+                    ip_address
+                )
+                for registro_id, dados_novos in registros
+            ])
+            
+            conn.commit()
+            return len(registros)
+    
     @staticmethod
     def registrar_login(usuario_id, email, ip_address, sucesso=True):
         """Registra tentativa de login (sucesso ou falha)"""
@@ -1,17 +1,84 @@
 """
 Modelo para conciliação bancária
 """
-from database import DatabaseManager
+import hashlib
+import math
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from database import DatabaseManager, inserir_em_lote
 from datetime import datetime, timedelta
 from decimal import Decimal
-from difflib import SequenceMatcher
+from services.atribuicao import atribuir
+from services.similaridade import normalizar, preparar, similaridade, similaridade_lote
 
 
 class Conciliacao:
     """Modelo para conciliação bancária"""
     
+    # Tolerâncias com que as sugestões persistidas (sugestoes_conciliacao) são calculadas
+    TOLERANCIA_DIAS_PADRAO = 3
+    TOLERANCIA_VALOR_PADRAO = 0.01
+    
+    # Pares por UPDATE na conciliação em lote (e hashes por consulta na importação)
+    TAMANHO_LOTE = 500
+    
+    # Tabela, coluna de data e tipo de linha do extrato atendido por cada origem do sistema
+    ORIGENS_SISTEMA = {
+        'contas_pagar': ('contas_pagar', 'data_pagamento', "'debito'"),
+        'contas_receber': ('contas_receber', 'data_recebimento', "'credito'"),
+        'lancamento_manual': ('lancamentos_manuais', 'data_lancamento',
+                              "CASE WHEN t.tipo = 'despesa' THEN 'debito' ELSE 'credito' END")
+    }
+    
+    # Condição para a transação do sistema ser candidata (além de conciliado = 0) e o
+    # valor comparado com o extrato; usadas na busca e na conferência da conciliação em lote
+    _VALOR_LIQUIDO = "(valor_total - COALESCE(valor_desconto, 0) + COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0))"
+    ELEGIBILIDADE_SISTEMA = {
+        'contas_pagar': ("status = 'pago'", _VALOR_LIQUIDO),
+        'contas_receber': ("status = 'recebido'", _VALOR_LIQUIDO),
+        'lancamento_manual': ("status = 'ativo' AND tipo IN ('despesa', 'receita')", 'valor')
+    }
+    
+    @staticmethod
+    def hash_arquivo(caminho):
+        """SHA-256 do conteúdo do arquivo (lido em blocos)"""
+        sha = hashlib.sha256()
+        with open(caminho, 'rb') as arquivo:
+            for bloco in iter(lambda: arquivo.read(1 << 16), b''):
+                sha.update(bloco)
+        return sha.hexdigest()
+    
+    @staticmethod
+    def hashes_linhas(conta_bancaria_id, transacoes):
+        """
+        Impressão digital de cada linha do extrato
+        
+        Combina conta, data, tipo, valor em centavos, documento e descrição normalizada.
+        Linhas idênticas no mesmo arquivo (duas tarifas iguais no dia, por exemplo)
+        recebem também a ordem da repetição, para não serem confundidas entre si; a
+        mesma linha em outra exportação que cubra o mesmo dia gera o mesmo hash.
+        
+        Returns:
+            Lista de hashes (hex) na ordem das transações
+        """
+        ocorrencias = {}
+        hashes = []
+        for trans in transacoes:
+            data = trans['data_transacao']
+            chave = '|'.join((
+                str(conta_bancaria_id),
+                data.isoformat() if hasattr(data, 'isoformat') else str(data),
+                trans['tipo'],
+                str(Conciliacao._centavos(abs(float(trans['valor'])))),
+                str(trans.get('documento') or '').strip().lstrip('0'),
+                normalizar(trans['descricao'])
+            ))
+            ocorrencias[chave] = ocorrencias.get(chave, 0) + 1
+            hashes.append(hashlib.sha256(f"{chave}|{ocorrencias[chave]}".encode('utf-8')).hexdigest())
+        return hashes
+    
     @staticmethod
-    def criar_conciliacao(conta_bancaria_id, nome_arquivo, transacoes, user_id=None):
+    def criar_conciliacao(conta_bancaria_id, nome_arquivo, transacoes, user_id=None, hash_arquivo=None):
         """
         Cria um novo registro de conciliação e importa transações
         
@@ -20,54 +87,83 @@ class Conciliacao:
             nome_arquivo: Nome do arquivo importado
             transacoes: Lista de transações do extrato
             user_id: ID do usuário que fez a importação
+            hash_arquivo: SHA-256 do arquivo (ver hash_arquivo); recusa o mesmo
+                          conteúdo já importado para a conta
             
         Returns:
-            ID da conciliação criada
+            dict: {'conciliacao_id', 'importadas', 'ignoradas', 'linhas_por_segundo'};
+            as ignoradas são as linhas já importadas por outro extrato da mesma conta
+        
+        Raises:
+            ValueError: Arquivo repetido ou sem nenhuma linha nova
         """
         db = DatabaseManager()
         
         with db.get_connection() as conn:
             cursor = conn.cursor(dictionary=True)
             
-            # Verificar se já existe uma conciliação com o mesmo arquivo e conta
-            cursor.execute("""
-                SELECT id FROM conciliacoes_bancarias
-                WHERE conta_bancaria_id = %s 
-                AND nome_arquivo LIKE %s
-            """, (conta_bancaria_id, f'%{nome_arquivo}'))
+            # Verificar se o mesmo conteúdo já foi importado nesta conta
+            if hash_arquivo:
+                cursor.execute("""
+                    SELECT id, nome_arquivo FROM conciliacoes_bancarias
+                    WHERE conta_bancaria_id = %s AND hash_arquivo = %s
+                    LIMIT 1
+                """, (conta_bancaria_id, hash_arquivo))
+                
+                conciliacao_existente = cursor.fetchone()
+                
+                if conciliacao_existente:
+                    cursor.close()
+                    raise ValueError(
+                        f'Este extrato já foi importado para esta conta '
+                        f'(arquivo "{conciliacao_existente["nome_arquivo"]}").'
+                    )
+            
+            # Pular linhas já importadas por extratos com período sobreposto
+            hashes = Conciliacao.hashes_linhas(conta_bancaria_id, transacoes)
+            existentes = set()
+            for inicio in range(0, len(hashes), Conciliacao.TAMANHO_LOTE):
+                lote = hashes[inicio:inicio + Conciliacao.TAMANHO_LOTE]
+                cursor.execute(f"""
+                    SELECT hash_linha FROM transacoes_extrato
+                    WHERE hash_linha IN ({', '.join(['%s'] * len(lote))})
+                """, lote)
+                existentes.update(row['hash_linha'] for row in cursor.fetchall())
             
-            conciliacao_existente = cursor.fetchone()
+            novas = [(trans, hash_linha) for trans, hash_linha in zip(transacoes, hashes)
+                     if hash_linha not in existentes]
+            ignoradas = len(transacoes) - len(novas)
             
-            if conciliacao_existente:
+            if not novas:
                 cursor.close()
-                raise ValueError(f'O arquivo "{nome_arquivo}" já foi importado anteriormente para esta conta.')
+                raise ValueError('Todas as transações deste extrato já foram importadas para esta conta.')
             
             # Calcular período
-            datas = [t['data_transacao'] for t in transacoes]
+            datas = [trans['data_transacao'] for trans, _ in novas]
             periodo_inicio = min(datas)
             periodo_fim = max(datas)
             
             # Criar registro de conciliação
             cursor.execute("""
                 INSERT INTO conciliacoes_bancarias 
-                (conta_bancaria_id, nome_arquivo, data_importacao, periodo_inicio, periodo_fim, 
+                (conta_bancaria_id, nome_arquivo, hash_arquivo, data_importacao, periodo_inicio, periodo_fim, 
                  total_transacoes, total_pendentes, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (conta_bancaria_id, nome_arquivo, datetime.now(), periodo_inicio, periodo_fim,
-                  len(transacoes), len(transacoes), 'processando'))
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (conta_bancaria_id, nome_arquivo, hash_arquivo, datetime.now(), periodo_inicio, periodo_fim,
+                  len(novas), len(novas), 'processando'))
             
             conciliacao_id = cursor.lastrowid
             
-            # Inserir transações do extrato
-            for trans in transacoes:
-                cursor.execute("""
-                    INSERT INTO transacoes_extrato
-                    (conciliacao_id, data_transacao, descricao, documento, valor, tipo, 
-                     saldo_apos, status_conciliacao)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """, (conciliacao_id, trans['data_transacao'], trans['descricao'], 
-                      trans.get('documento', ''), trans['valor'], trans['tipo'],
-                      trans.get('saldo_apos'), 'pendente'))
+            # Inserir transações do extrato (várias linhas por INSERT)
+            insercao = inserir_em_lote(cursor, 'transacoes_extrato', [
+                'conciliacao_id', 'data_transacao', 'descricao', 'documento', 'valor', 'tipo',
+                'saldo_apos', 'hash_linha', 'status_conciliacao'
+            ], [
+                (conciliacao_id, trans['data_transacao'], trans['descricao'],
+                 trans.get('documento', ''), trans['valor'], trans['tipo'],
+                 trans.get('saldo_apos'), hash_linha, 'pendente')
+                for trans, hash_linha in novas
+            ])
             
             # Atualizar status
             cursor.execute("""
@@ -79,23 +175,285 @@ class Conciliacao:
             conn.commit()
             cursor.close()
             
-            return conciliacao_id
+            return {
+                'conciliacao_id': conciliacao_id,
+                'importadas': len(novas),
+                'ignoradas': ignoradas,
+                'linhas_por_segundo': insercao['linhas_por_segundo']
+            }
+    
+    @staticmethod
+    def preencher_hashes_linhas():
+        """
+        Calcula hash_linha das linhas importadas antes da migration 016, uma
+        conciliação por vez (na ordem do arquivo, para a contagem das repetições)
+        
+        Returns:
+            Quantidade de linhas preenchidas
+        """
+        db = DatabaseManager()
+        preenchidas = 0
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT DISTINCT c.id, c.conta_bancaria_id
+                FROM conciliacoes_bancarias c
+                INNER JOIN transacoes_extrato te ON te.conciliacao_id = c.id
+                WHERE te.hash_linha IS NULL
+                ORDER BY c.id
+            """)
+            conciliacoes = cursor.fetchall()
+            
+            for conc in conciliacoes:
+                cursor.execute("""
+                    SELECT id, data_transacao, descricao, documento, valor, tipo
+                    FROM transacoes_extrato
+                    WHERE conciliacao_id = %s
+                    ORDER BY id
+                """, (conc['id'],))
+                linhas = cursor.fetchall()
+                
+                hashes = Conciliacao.hashes_linhas(conc['conta_bancaria_id'], linhas)
+                cursor.executemany("""
+                    UPDATE transacoes_extrato SET hash_linha = %s WHERE id = %s
+                """, [(hash_linha, linha['id']) for linha, hash_linha in zip(linhas, hashes)])
+                conn.commit()
+                preenchidas += len(linhas)
+            
+            cursor.close()
+        
+        return preenchidas
+    
+    @staticmethod
+    def _centavos(valor):
+        return int(round(float(valor) * 100))
+    
+    @staticmethod
+    def _indexar_candidatos(cursor, transacoes_extrato, tolerancia_dias, tolerancia_valor):
+        """
+        Busca de uma vez os candidatos de todas as transações do extrato
+        
+        Uma query por tabela de origem cobrindo a janela de datas (e de valores) do
+        extrato inteiro, em vez de duas ou três queries por linha.
+        
+        Returns:
+            dict: {(tipo, data): ([centavos ordenados], [candidatos na mesma ordem])},
+            com tipo 'debito' ou 'credito' (o tipo de linha do extrato que o candidato atende)
+        """
+        indice = {}
+        if not transacoes_extrato:
+            return indice
+        
+        data_min = min(t['data_transacao'] for t in transacoes_extrato) - timedelta(days=tolerancia_dias)
+        data_max = max(t['data_transacao'] for t in transacoes_extrato) + timedelta(days=tolerancia_dias)
+        valor_min = min(float(t['valor']) for t in transacoes_extrato) * (1 - tolerancia_valor)
+        valor_max = max(float(t['valor']) for t in transacoes_extrato) * (1 + tolerancia_valor)
+        tipos = {t['tipo'] for t in transacoes_extrato}
+        
+        valor_liquido = Conciliacao._VALOR_LIQUIDO
+        candidatos = []
+        
+        # Contas a pagar (débitos)
+        if 'debito' in tipos:
+            cursor.execute(f"""
+                SELECT 
+                    id, 
+                    'contas_pagar' as tipo_transacao,
+                    fornecedor_id as entidade_id,
+                    descricao,
+                    numero_documento as documento,
+                    data_pagamento as data_transacao,
+                    {valor_liquido} as valor,
+                    conciliado,
+                    'debito' as tipo_extrato
+                FROM contas_pagar
+                WHERE {Conciliacao.ELEGIBILIDADE_SISTEMA['contas_pagar'][0]}
+                AND conciliado = 0
+                AND data_pagamento BETWEEN %s AND %s
+                AND {valor_liquido} BETWEEN %s AND %s
+            """, (data_min, data_max, valor_min, valor_max))
+            candidatos.extend(cursor.fetchall())
+        
+        # Contas a receber (créditos)
+        if 'credito' in tipos:
+            cursor.execute(f"""
+                SELECT 
+                    id,
+                    'contas_receber' as tipo_transacao,
+                    cliente_id as entidade_id,
+                    descricao,
+                    numero_documento as documento,
+                    data_recebimento as data_transacao,
+                    {valor_liquido} as valor,
+                    conciliado,
+                    'credito' as tipo_extrato
+                FROM contas_receber
+                WHERE {Conciliacao.ELEGIBILIDADE_SISTEMA['contas_receber'][0]}
+                AND conciliado = 0
+                AND data_recebimento BETWEEN %s AND %s
+                AND {valor_liquido} BETWEEN %s AND %s
+            """, (data_min, data_max, valor_min, valor_max))
+            candidatos.extend(cursor.fetchall())
+        
+        # Lançamentos manuais (despesas atendem débitos; receitas, créditos)
+        cursor.execute(f"""
+            SELECT 
+                id,
+                'lancamento_manual' as tipo_transacao,
+                NULL as entidade_id,
+                descricao,
+                '' as documento,
+                data_lancamento as data_transacao,
+                valor,
+                conciliado,
+                CASE WHEN tipo = 'despesa' THEN 'debito' ELSE 'credito' END as tipo_extrato
+            FROM lancamentos_manuais
+            WHERE conciliado = 0
+            AND data_lancamento BETWEEN %s AND %s
+            AND valor BETWEEN %s AND %s
+            AND {Conciliacao.ELEGIBILIDADE_SISTEMA['lancamento_manual'][0]}
+        """, (data_min, data_max, valor_min, valor_max))
+        candidatos.extend(cursor.fetchall())
+        
+        por_chave = {}
+        for cand in candidatos:
+            tipo_extrato = cand.pop('tipo_extrato')
+            chave = (tipo_extrato, cand['data_transacao'])
+            por_chave.setdefault(chave, []).append((Conciliacao._centavos(cand['valor']), cand))
+        
+        for chave, itens in por_chave.items():
+            itens.sort(key=lambda item: item[0])
+            indice[chave] = ([item[0] for item in itens], [item[1] for item in itens])
+        
+        return indice
+    
+    @staticmethod
+    def _candidatos_da_transacao(indice, trans, tolerancia_dias, tolerancia_valor):
+        """
+        Candidatos do índice dentro das tolerâncias de data e valor da transação
+        
+        Percorre os 2 * tolerancia_dias + 1 dias da janela e, em cada um, faz busca
+        binária pela faixa de valores.
+        """
+        # Débitos buscam contas a pagar e despesas; qualquer outro tipo, créditos
+        tipo = 'debito' if trans['tipo'] == 'debito' else 'credito'
+        valor = float(trans['valor'])
+        centavos_min = math.ceil(round(valor * (1 - tolerancia_valor) * 100, 6))
+        centavos_max = math.floor(round(valor * (1 + tolerancia_valor) * 100, 6))
+        
+        candidatos = []
+        for deslocamento in range(-tolerancia_dias, tolerancia_dias + 1):
+            entrada = indice.get((tipo, trans['data_transacao'] + timedelta(days=deslocamento)))
+            if entrada is None:
+                continue
+            centavos, cands = entrada
+            inicio = bisect_left(centavos, centavos_min)
+            fim = bisect_right(centavos, centavos_max)
+            candidatos.extend(cands[inicio:fim])
+        
+        return candidatos
+    
+    @staticmethod
+    def _pontuar_matches(cursor, transacoes_extrato, tolerancia_dias, tolerancia_valor):
+        """
+        Pontua os candidatos de cada transação do extrato (sem a atribuição um-para-um)
+        
+        Returns:
+            Lista de matches com similaridade >= 60%
+        """
+        matches = []
+        
+        # Candidatos de todo o extrato em poucas queries, indexados por (tipo, data, centavos)
+        indice = Conciliacao._indexar_candidatos(cursor, transacoes_extrato, tolerancia_dias, tolerancia_valor)
+        
+        for trans in transacoes_extrato:
+            candidatos = Conciliacao._candidatos_da_transacao(indice, trans, tolerancia_dias, tolerancia_valor)
+            
+            # Similaridade por descrição: uma passada para todos os candidatos da linha
+            # (textos normalizados e tokenizados uma vez, em cache por texto)
+            sims_descricao = similaridade_lote(
+                preparar(trans['descricao']), [cand['descricao'] for cand in candidatos]
+            )
+            
+            # Calcular similaridade para cada candidato
+            for cand, sim_descricao in zip(candidatos, sims_descricao):
+                sim_descricao *= 100
+                
+                # Similaridade por documento (se tiver)
+                sim_documento = 0
+                if trans.get('documento') and cand.get('documento'):
+                    sim_documento = similaridade(str(trans['documento']), str(cand['documento'])) * 100
+                
+                # Similaridade por valor (quanto mais próximo, maior a similaridade)
+                diff_valor = abs(float(trans['valor']) - float(cand['valor']))
+                sim_valor = max(0, 100 - (diff_valor / float(trans['valor']) * 100))
+                
+                # Similaridade por data
+                diff_dias = abs((trans['data_transacao'] - cand['data_transacao']).days)
+                sim_data = max(0, 100 - (diff_dias * 20))
+                
+                # Calcular similaridade total (média ponderada)
+                similaridade_total = (
+                    sim_descricao * 0.4 +
+                    sim_valor * 0.3 +
+                    sim_data * 0.2 +
+                    sim_documento * 0.1
+                )
+                
+                # Adicionar ao match se similaridade >= 60%
+                if similaridade_total >= 60:
+                    matches.append({
+                        'transacao_extrato_id': trans['id'],
+                        'transacao_extrato': trans,
+                        'transacao_sistema_id': cand['id'],
+                        'transacao_sistema_tipo': cand['tipo_transacao'],
+                        'transacao_sistema': dict(cand),
+                        'similaridade': round(similaridade_total, 2),
+                        'sim_descricao': round(sim_descricao, 2),
+                        'sim_valor': round(sim_valor, 2),
+                        'sim_data': round(sim_data, 2),
+                        'sim_documento': round(sim_documento, 2)
+                    })
+        
+        return matches
+    
+    @staticmethod
+    def _marcar_sugeridos(matches):
+        """
+        Atribuição um-para-um: cada linha do extrato e cada transação do sistema ficam
+        em no máximo um par sugerido (os demais continuam como alternativas)
+        """
+        escolhidos = atribuir([
+            (m['transacao_extrato_id'], (m['transacao_sistema_tipo'], m['transacao_sistema_id']), m['similaridade'])
+            for m in matches
+        ])
+        for indice, match in enumerate(matches):
+            match['sugerido'] = indice in escolhidos
+        
+        # Ordenar por similaridade (maior primeiro)
+        matches.sort(key=lambda x: x['similaridade'], reverse=True)
+        
+        return matches
     
     @staticmethod
     def buscar_matches_automaticos(conciliacao_id, tolerancia_dias=3, tolerancia_valor=0.01):
         """
         Busca matches automáticos entre transações do extrato e do sistema
         
+        Calcula tudo na hora; a página de matching usa as sugestões persistidas
+        (get_matches), recalculadas só para as linhas novas ou afetadas.
+        
         Args:
             conciliacao_id: ID da conciliação
             tolerancia_dias: Diferença máxima de dias entre as datas
             tolerancia_valor: Diferença máxima percentual no valor (0.01 = 1%)
             
         Returns:
-            Lista de matches encontrados
+            Lista de matches encontrados; sugerido=True marca o conjunto de pares sem
+            conflito escolhido pela atribuição (services/atribuicao.py)
         """
         db = DatabaseManager()
-        matches = []
         
         with db.get_connection() as conn:
             cursor = conn.cursor(dictionary=True)
@@ -108,129 +466,256 @@ class Conciliacao:
             """, (conciliacao_id,))
             
             transacoes_extrato = cursor.fetchall()
+            matches = Conciliacao._pontuar_matches(cursor, transacoes_extrato, tolerancia_dias, tolerancia_valor)
             
-            for trans in transacoes_extrato:
-                data_min = trans['data_transacao'] - timedelta(days=tolerancia_dias)
-                data_max = trans['data_transacao'] + timedelta(days=tolerancia_dias)
-                valor_min = float(trans['valor']) * (1 - tolerancia_valor)
-                valor_max = float(trans['valor']) * (1 + tolerancia_valor)
-                
-                candidatos = []
-                
-                # Buscar em contas a pagar (débitos)
-                if trans['tipo'] == 'debito':
-                    cursor.execute("""
-                        SELECT 
-                            id, 
-                            'contas_pagar' as tipo_transacao,
-                            fornecedor_id as entidade_id,
-                            descricao,
-                            numero_documento as documento,
-                            data_pagamento as data_transacao,
-                            (valor_total - COALESCE(valor_desconto, 0) + COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)) as valor,
-                            conciliado
-                        FROM contas_pagar
-                        WHERE status = 'pago'
-                        AND conciliado = 0
-                        AND data_pagamento BETWEEN %s AND %s
-                        AND (valor_total - COALESCE(valor_desconto, 0) + COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)) BETWEEN %s AND %s
-                    """, (data_min, data_max, valor_min, valor_max))
-                    
-                    candidatos.extend(cursor.fetchall())
-                
-                # Buscar em contas a receber (créditos)
-                elif trans['tipo'] == 'credito':
-                    cursor.execute("""
-                        SELECT 
-                            id,
-                            'contas_receber' as tipo_transacao,
-                            cliente_id as entidade_id,
-                            descricao,
-                            numero_documento as documento,
-                            data_recebimento as data_transacao,
-                            (valor_total - COALESCE(valor_desconto, 0) + COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)) as valor,
-                            conciliado
-                        FROM contas_receber
-                        WHERE status = 'recebido'
-                        AND conciliado = 0
-                        AND data_recebimento BETWEEN %s AND %s
-                        AND (valor_total - COALESCE(valor_desconto, 0) + COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)) BETWEEN %s AND %s
-                    """, (data_min, data_max, valor_min, valor_max))
-                    
-                    candidatos.extend(cursor.fetchall())
-                
-                # Buscar em lançamentos manuais
-                cursor.execute("""
-                    SELECT 
-                        id,
-                        'lancamento_manual' as tipo_transacao,
-                        NULL as entidade_id,
-                        descricao,
-                        '' as documento,
-                        data_lancamento as data_transacao,
-                        valor,
-                        conciliado
-                    FROM lancamentos_manuais
-                    WHERE conciliado = 0
-                    AND data_lancamento BETWEEN %s AND %s
-                    AND valor BETWEEN %s AND %s
-                    AND tipo = %s
-                """, (data_min, data_max, valor_min, valor_max, 
-                      'despesa' if trans['tipo'] == 'debito' else 'receita'))
-                
-                candidatos.extend(cursor.fetchall())
-                
-                # Calcular similaridade para cada candidato
-                for cand in candidatos:
-                    # Similaridade por descrição
-                    sim_descricao = SequenceMatcher(None, 
-                                                    trans['descricao'].lower(), 
-                                                    cand['descricao'].lower()).ratio() * 100
-                    
-                    # Similaridade por documento (se tiver)
-                    sim_documento = 0
-                    if trans.get('documento') and cand.get('documento'):
-                        sim_documento = SequenceMatcher(None,
-                                                       str(trans['documento']).lower(),
-                                                       str(cand['documento']).lower()).ratio() * 100
-                    
-                    # Similaridade por valor (quanto mais próximo, maior a similaridade)
-                    diff_valor = abs(float(trans['valor']) - float(cand['valor']))
-                    sim_valor = max(0, 100 - (diff_valor / float(trans['valor']) * 100))
-                    
-                    # Similaridade por data
-                    diff_dias = abs((trans['data_transacao'] - cand['data_transacao']).days)
-                    sim_data = max(0, 100 - (diff_dias * 20))
-                    
-                    # Calcular similaridade total (média ponderada)
-                    similaridade_total = (
-                        sim_descricao * 0.4 +
-                        sim_valor * 0.3 +
-                        sim_data * 0.2 +
-                        sim_documento * 0.1
-                    )
-                    
-                    # Adicionar ao match se similaridade >= 60%
-                    if similaridade_total >= 60:
-                        matches.append({
-                            'transacao_extrato_id': trans['id'],
-                            'transacao_extrato': trans,
-                            'transacao_sistema_id': cand['id'],
-                            'transacao_sistema_tipo': cand['tipo_transacao'],
-                            'transacao_sistema': cand,
-                            'similaridade': round(similaridade_total, 2),
-                            'sim_descricao': round(sim_descricao, 2),
-                            'sim_valor': round(sim_valor, 2),
-                            'sim_data': round(sim_data, 2),
-                            'sim_documento': round(sim_documento, 2)
-                        })
+            cursor.close()
+        
+        return Conciliacao._marcar_sugeridos(matches)
+    
+    @staticmethod
+    def atualizar_sugestoes(conciliacao_id):
+        """
+        Recalcula e grava as sugestões só das linhas pendentes novas ou afetadas
+        (sugestoes_calculadas_em IS NULL), com as tolerâncias padrão
+        
+        Returns:
+            Quantidade de linhas recalculadas
+        """
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            
+            cursor.execute("""
+                SELECT * FROM transacoes_extrato
+                WHERE conciliacao_id = %s AND status_conciliacao = 'pendente'
+                AND sugestoes_calculadas_em IS NULL
+                ORDER BY data_transacao
+            """, (conciliacao_id,))
+            
+            linhas = cursor.fetchall()
+            if not linhas:
+                cursor.close()
+                return 0
             
+            matches = Conciliacao._pontuar_matches(
+                cursor, linhas, Conciliacao.TOLERANCIA_DIAS_PADRAO, Conciliacao.TOLERANCIA_VALOR_PADRAO
+            )
+            
+            ids = [linha['id'] for linha in linhas]
+            marcadores = ', '.join(['%s'] * len(ids))
+            
+            cursor.execute(f"DELETE FROM sugestoes_conciliacao WHERE transacao_extrato_id IN ({marcadores})", ids)
+            
+            if matches:
+                cursor.executemany("""
+                    INSERT INTO sugestoes_conciliacao
+                    (conciliacao_id, transacao_extrato_id, transacao_sistema_tipo, transacao_sistema_id,
+                     entidade_id, descricao, documento, data_transacao, valor,
+                     similaridade, sim_descricao, sim_valor, sim_data, sim_documento)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, [
+                    (conciliacao_id, m['transacao_extrato_id'], m['transacao_sistema_tipo'], m['transacao_sistema_id'],
+                     m['transacao_sistema'].get('entidade_id'), m['transacao_sistema']['descricao'],
+                     m['transacao_sistema'].get('documento'), m['transacao_sistema']['data_transacao'],
+                     m['transacao_sistema']['valor'], m['similaridade'], m['sim_descricao'],
+                     m['sim_valor'], m['sim_data'], m['sim_documento'])
+                    for m in matches
+                ])
+            
+            cursor.execute(f"""
+                UPDATE transacoes_extrato SET sugestoes_calculadas_em = %s
+                WHERE id IN ({marcadores})
+            """, [datetime.now()] + ids)
+            
+            conn.commit()
             cursor.close()
+            
+            return len(ids)
+    
+    @staticmethod
+    def get_matches(conciliacao_id, recalcular=False):
+        """
+        Matches da conciliação a partir das sugestões persistidas
         
-        # Ordenar por similaridade (maior primeiro)
-        matches.sort(key=lambda x: x['similaridade'], reverse=True)
+        Só as linhas novas ou afetadas por uma (des)conciliação são recalculadas; a
+        atribuição um-para-um é refeita em memória sobre os pares gravados.
         
-        return matches
+        Args:
+            conciliacao_id: ID da conciliação
+            recalcular: Descarta as sugestões gravadas e recalcula todas as linhas
+                        (ex.: depois de novos pagamentos lançados no sistema)
+        
+        Returns:
+            Lista de matches no mesmo formato de buscar_matches_automaticos
+        """
+        if recalcular:
+            Conciliacao.invalidar_sugestoes(conciliacao_id)
+        Conciliacao.atualizar_sugestoes(conciliacao_id)
+        
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            
+            cursor.execute("""
+                SELECT * FROM transacoes_extrato
+                WHERE conciliacao_id = %s AND status_conciliacao = 'pendente'
+            """, (conciliacao_id,))
+            linhas = {linha['id']: linha for linha in cursor.fetchall()}
+            
+            cursor.execute("""
+                SELECT * FROM sugestoes_conciliacao
+                WHERE conciliacao_id = %s
+            """, (conciliacao_id,))
+            sugestoes = cursor.fetchall()
+            
+            cursor.close()
+        
+        matches = []
+        for sugestao in sugestoes:
+            trans = linhas.get(sugestao['transacao_extrato_id'])
+            if trans is None:
+                continue
+            matches.append({
+                'transacao_extrato_id': trans['id'],
+                'transacao_extrato': trans,
+                'transacao_sistema_id': sugestao['transacao_sistema_id'],
+                'transacao_sistema_tipo': sugestao['transacao_sistema_tipo'],
+                'transacao_sistema': {
+                    'id': sugestao['transacao_sistema_id'],
+                    'tipo_transacao': sugestao['transacao_sistema_tipo'],
+                    'entidade_id': sugestao['entidade_id'],
+                    'descricao': sugestao['descricao'],
+                    'documento': sugestao['documento'],
+                    'data_transacao': sugestao['data_transacao'],
+                    'valor': sugestao['valor'],
+                    'conciliado': 0
+                },
+                'similaridade': float(sugestao['similaridade']),
+                'sim_descricao': float(sugestao['sim_descricao']),
+                'sim_valor': float(sugestao['sim_valor']),
+                'sim_data': float(sugestao['sim_data']),
+                'sim_documento': float(sugestao['sim_documento'])
+            })
+        
+        return Conciliacao._marcar_sugeridos(matches)
+    
+    @staticmethod
+    def invalidar_sugestoes(conciliacao_id):
+        """Marca todas as linhas da conciliação para recálculo das sugestões"""
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE transacoes_extrato SET sugestoes_calculadas_em = NULL
+                WHERE conciliacao_id = %s
+            """, (conciliacao_id,))
+            conn.commit()
+            cursor.close()
+    
+    @staticmethod
+    def invalidar_sugestoes_sistema(conn, tipo, ids):
+        """
+        Descarta as sugestões gravadas de transações do sistema alteradas (estorno,
+        cancelamento, edição), na transação de conn
+        
+        As linhas do extrato que tinham essas transações entre os candidatos voltam
+        a ser recalculadas, com os dados atuais, no próximo get_matches.
+        
+        Args:
+            conn: Conexão da transação do chamador (o commit fica com ele)
+            tipo: 'contas_pagar', 'contas_receber' ou 'lancamento_manual'
+            ids: IDs das transações alteradas
+        """
+        ids = [int(i) for i in ids if i is not None]
+        if not ids:
+            return
+        marcadores = ', '.join(['%s'] * len(ids))
+        
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            UPDATE transacoes_extrato te
+            INNER JOIN sugestoes_conciliacao s ON s.transacao_extrato_id = te.id
+            SET te.sugestoes_calculadas_em = NULL
+            WHERE s.transacao_sistema_tipo = %s AND s.transacao_sistema_id IN ({marcadores})
+        """, [tipo] + ids)
+        cursor.execute(f"""
+            DELETE FROM sugestoes_conciliacao
+            WHERE transacao_sistema_tipo = %s AND transacao_sistema_id IN ({marcadores})
+        """, [tipo] + ids)
+    
+    @staticmethod
+    def marcar_recalculo_sistema(conn, tipo, ids):
+        """
+        Marca para recálculo as sugestões das linhas pendentes que as transações do
+        sistema, no estado atual, podem atender, na transação de conn
+        
+        Mesmo tipo de linha, data dentro de TOLERANCIA_DIAS_PADRAO e extratos da conta
+        bancária da transação (lançamentos manuais e contas sem conta bancária: todas).
+        Cobre o candidato novo (baixa, recebimento, lançamento criado) e a edição que
+        leva a transação para a janela de outra linha.
+        
+        Args:
+            conn: Conexão da transação do chamador (o commit fica com ele)
+            tipo: 'contas_pagar', 'contas_receber' ou 'lancamento_manual'
+            ids: IDs das transações escritas
+        """
+        ids = [int(i) for i in ids if i is not None]
+        if not ids:
+            return
+        
+        tabela, coluna_data, tipo_linha = Conciliacao.ORIGENS_SISTEMA[tipo]
+        filtro_conta = ""
+        if tipo != 'lancamento_manual':
+            filtro_conta = "AND (t.conta_bancaria_id IS NULL OR t.conta_bancaria_id = c.conta_bancaria_id)"
+        
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            UPDATE transacoes_extrato te
+            INNER JOIN conciliacoes_bancarias c ON c.id = te.conciliacao_id
+            INNER JOIN {tabela} t ON t.id IN ({', '.join(['%s'] * len(ids))})
+            SET te.sugestoes_calculadas_em = NULL
+            WHERE te.status_conciliacao = 'pendente'
+            AND te.sugestoes_calculadas_em IS NOT NULL
+            AND te.tipo = {tipo_linha}
+            AND te.data_transacao BETWEEN DATE_SUB(t.{coluna_data}, INTERVAL %s DAY)
+                                      AND DATE_ADD(t.{coluna_data}, INTERVAL %s DAY)
+            {filtro_conta}
+        """, ids + [Conciliacao.TOLERANCIA_DIAS_PADRAO, Conciliacao.TOLERANCIA_DIAS_PADRAO])
+    
+    @staticmethod
+    @contextmanager
+    def recalculando(conn, tipo, ids):
+        """
+        Envolve uma escrita nas transações do sistema: marca para recálculo as linhas
+        da janela anterior e da nova (ver marcar_recalculo_sistema)
+        
+        Usage:
+            with Conciliacao.recalculando(conn, 'contas_pagar', [conta_id]):
+                cursor.execute("UPDATE contas_pagar SET data_pagamento = %s ... WHERE id = %s", ...)
+            conn.commit()
+        """
+        Conciliacao.marcar_recalculo_sistema(conn, tipo, ids)
+        yield
+        Conciliacao.marcar_recalculo_sistema(conn, tipo, ids)
+    
+    @staticmethod
+    def get_sugestoes(conciliacao_id, tolerancia_dias=3, tolerancia_valor=0.01):
+        """
+        Pares sugeridos sem conflito (no máximo um por linha do extrato e por transação
+        do sistema), prontos para serem aceitos em lote
+        
+        Returns:
+            Lista de matches com sugerido=True, por similaridade decrescente
+        """
+        if (tolerancia_dias, tolerancia_valor) == (Conciliacao.TOLERANCIA_DIAS_PADRAO,
+                                                   Conciliacao.TOLERANCIA_VALOR_PADRAO):
+            matches = Conciliacao.get_matches(conciliacao_id)
+        else:
+            matches = Conciliacao.buscar_matches_automaticos(conciliacao_id, tolerancia_dias, tolerancia_valor)
+        return [match for match in matches if match['sugerido']]
     
     @staticmethod
     def conciliar_transacao(transacao_extrato_id, tipo_transacao, transacao_id, user_id):
@@ -246,7 +731,14 @@ class Conciliacao:
         db = DatabaseManager()
         
         with db.get_connection() as conn:
-            cursor = conn.cursor()
+            cursor = conn.cursor(dictionary=True)
+            
+            # Status anterior da linha (travada até o commit) para ajustar os contadores
+            cursor.execute("""
+                SELECT conciliacao_id, status_conciliacao FROM transacoes_extrato
+                WHERE id = %s FOR UPDATE
+            """, (transacao_extrato_id,))
+            anterior = cursor.fetchone()
             
             # Atualizar transação do extrato
             cursor.execute("""
@@ -269,21 +761,18 @@ class Conciliacao:
                 WHERE id = %s
             """, (datetime.now(), transacao_extrato_id, transacao_id))
             
-            # Atualizar contadores da conciliação
+            # A linha e a transação do sistema saem das sugestões gravadas; as demais
+            # linhas continuam com os outros candidatos que já tinham
             cursor.execute("""
-                UPDATE conciliacoes_bancarias c
-                SET total_conciliadas = (
-                    SELECT COUNT(*) FROM transacoes_extrato 
-                    WHERE conciliacao_id = c.id AND status_conciliacao = 'conciliada'
-                ),
-                total_pendentes = (
-                    SELECT COUNT(*) FROM transacoes_extrato 
-                    WHERE conciliacao_id = c.id AND status_conciliacao = 'pendente'
-                )
-                WHERE id = (
-                    SELECT conciliacao_id FROM transacoes_extrato WHERE id = %s
-                )
-            """, (transacao_extrato_id,))
+                DELETE FROM sugestoes_conciliacao
+                WHERE transacao_extrato_id = %s
+                OR (transacao_sistema_tipo = %s AND transacao_sistema_id = %s)
+            """, (transacao_extrato_id, tipo_transacao, transacao_id))
+            
+            # Atualizar contadores da conciliação
+            if anterior:
+                Conciliacao._ajustar_contadores(cursor, anterior['conciliacao_id'],
+                                                anterior['status_conciliacao'], 'conciliada')
             
             conn.commit()
             cursor.close()
@@ -296,11 +785,11 @@ class Conciliacao:
         with db.get_connection() as conn:
             cursor = conn.cursor(dictionary=True)
             
-            # Buscar informações da conciliação
+            # Buscar informações da conciliação (linha travada até o commit)
             cursor.execute("""
-                SELECT transacao_relacionada_tipo, transacao_relacionada_id
+                SELECT conciliacao_id, status_conciliacao, transacao_relacionada_tipo, transacao_relacionada_id
                 FROM transacoes_extrato
-                WHERE id = %s
+                WHERE id = %s FOR UPDATE
             """, (transacao_extrato_id,))
             
             info = cursor.fetchone()
@@ -318,8 +807,29 @@ class Conciliacao:
                         transacao_extrato_id = NULL
                     WHERE id = %s
                 """, (info['transacao_relacionada_id'],))
+                
+                # A transação liberada volta a ser candidata: as linhas pendentes que ela
+                # pode atender (mesmo tipo, dentro da tolerância de datas) são recalculadas,
+                # em todas as conciliações da mesma conta bancária
+                tabela, coluna_data, tipo_linha = Conciliacao.ORIGENS_SISTEMA[info['transacao_relacionada_tipo']]
+                cursor.execute(f"""
+                    UPDATE transacoes_extrato te
+                    INNER JOIN conciliacoes_bancarias c ON c.id = te.conciliacao_id
+                    INNER JOIN {tabela} t ON t.id = %s
+                    SET te.sugestoes_calculadas_em = NULL
+                    WHERE c.conta_bancaria_id = (
+                        SELECT conta_bancaria_id FROM (
+                            SELECT conta_bancaria_id FROM conciliacoes_bancarias WHERE id = %s
+                        ) origem
+                    )
+                    AND te.status_conciliacao = 'pendente'
+                    AND te.tipo = {tipo_linha}
+                    AND te.data_transacao BETWEEN DATE_SUB(t.{coluna_data}, INTERVAL %s DAY)
+                                              AND DATE_ADD(t.{coluna_data}, INTERVAL %s DAY)
+                """, (info['transacao_relacionada_id'], info['conciliacao_id'],
+                      Conciliacao.TOLERANCIA_DIAS_PADRAO, Conciliacao.TOLERANCIA_DIAS_PADRAO))
             
-            # Atualizar transação do extrato
+            # Atualizar transação do extrato (volta a ter as sugestões calculadas)
             cursor.execute("""
                 UPDATE transacoes_extrato
                 SET status_conciliacao = 'pendente',
@@ -327,29 +837,253 @@ class Conciliacao:
                     transacao_relacionada_id = NULL,
                     similaridade = NULL,
                     conciliado_em = NULL,
-                    conciliado_por = NULL
+                    conciliado_por = NULL,
+                    sugestoes_calculadas_em = NULL
                 WHERE id = %s
             """, (transacao_extrato_id,))
             
             # Atualizar contadores
-            cursor.execute("""
-                UPDATE conciliacoes_bancarias c
-                SET total_conciliadas = (
-                    SELECT COUNT(*) FROM transacoes_extrato 
-                    WHERE conciliacao_id = c.id AND status_conciliacao = 'conciliada'
-                ),
-                total_pendentes = (
-                    SELECT COUNT(*) FROM transacoes_extrato 
-                    WHERE conciliacao_id = c.id AND status_conciliacao = 'pendente'
-                )
-                WHERE id = (
-                    SELECT conciliacao_id FROM transacoes_extrato WHERE id = %s
-                )
-            """, (transacao_extrato_id,))
+            if info:
+                Conciliacao._ajustar_contadores(cursor, info['conciliacao_id'],
+                                                info['status_conciliacao'], 'pendente')
             
             conn.commit()
             cursor.close()
     
+    @staticmethod
+    def conciliar_lote(conciliacao_id, similaridade_minima, user_id):
+        """
+        Aceita de uma vez todos os pares sugeridos com similaridade >= similaridade_minima
+        
+        Os pares vêm da atribuição um-para-um (get_matches), então nenhuma linha do
+        extrato nem transação do sistema aparece duas vezes. Tudo é gravado em uma
+        transação, com um UPDATE por tabela (CASE por id) em vez de um por par, e os
+        contadores da conciliação são ajustados uma única vez.
+        
+        Args:
+            conciliacao_id: ID da conciliação
+            similaridade_minima: Percentual mínimo (0-100) para aceitar o par
+            user_id: ID do usuário que fez a conciliação
+        
+        Returns:
+            dict: {'success', 'message', 'conciliadas'}
+        """
+        pares = [
+            m for m in Conciliacao.get_matches(conciliacao_id)
+            if m['sugerido'] and m['similaridade'] >= similaridade_minima
+        ]
+        if not pares:
+            return {'success': True, 'message': 'Nenhum par acima do percentual informado', 'conciliadas': 0}
+        
+        db = DatabaseManager()
+        agora = datetime.now()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            
+            try:
+                # Trava e confere o que continua livre e elegível: outra conciliação pode
+                # ter usado a linha ou a transação do sistema, e a transação pode ter sido
+                # estornada, cancelada ou editada desde o cálculo das sugestões
+                marcadores = ', '.join(['%s'] * len(pares))
+                cursor.execute(f"""
+                    SELECT id FROM transacoes_extrato
+                    WHERE id IN ({marcadores}) AND status_conciliacao = 'pendente'
+                    FOR UPDATE
+                """, [m['transacao_extrato_id'] for m in pares])
+                linhas_livres = {row['id'] for row in cursor.fetchall()}
+                
+                atuais = {}
+                for tipo, (tabela, coluna_data, tipo_linha) in Conciliacao.ORIGENS_SISTEMA.items():
+                    ids = [m['transacao_sistema_id'] for m in pares if m['transacao_sistema_tipo'] == tipo]
+                    if not ids:
+                        continue
+                    elegivel, valor = Conciliacao.ELEGIBILIDADE_SISTEMA[tipo]
+                    cursor.execute(f"""
+                        SELECT t.id, t.{coluna_data} as data_transacao, {valor} as valor,
+                               {tipo_linha} as tipo_extrato
+                        FROM {tabela} t
+                        WHERE t.id IN ({', '.join(['%s'] * len(ids))})
+                        AND COALESCE(t.conciliado, 0) = 0
+                        AND {elegivel}
+                        FOR UPDATE
+                    """, ids)
+                    atuais.update(((tipo, row['id']), row) for row in cursor.fetchall())
+                
+                pares = [
+                    m for m in pares
+                    if m['transacao_extrato_id'] in linhas_livres
+                    and Conciliacao._par_continua_valido(
+                        m['transacao_extrato'], atuais.get((m['transacao_sistema_tipo'], m['transacao_sistema_id']))
+                    )
+                ]
+                
+                for inicio in range(0, len(pares), Conciliacao.TAMANHO_LOTE):
+                    lote = pares[inicio:inicio + Conciliacao.TAMANHO_LOTE]
+                    Conciliacao._gravar_lote(cursor, lote, agora, user_id)
+                
+                # Todas as linhas do lote eram pendentes (conferido acima)
+                Conciliacao._ajustar_contadores(cursor, conciliacao_id, 'pendente', 'conciliada', len(pares))
+                
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        
+        return {
+            'success': True,
+            'message': f'{len(pares)} transação(ões) conciliada(s) automaticamente',
+            'conciliadas': len(pares)
+        }
+    
+    @staticmethod
+    def _par_continua_valido(trans, atual):
+        """
+        Confere, com os dados atuais da transação do sistema, as mesmas tolerâncias
+        padrão de tipo, data e valor usadas no cálculo das sugestões
+        """
+        if atual is None or atual['data_transacao'] is None:
+            return False
+        
+        tipo = 'debito' if trans['tipo'] == 'debito' else 'credito'
+        if atual['tipo_extrato'] != tipo:
+            return False
+        
+        if abs((atual['data_transacao'] - trans['data_transacao']).days) > Conciliacao.TOLERANCIA_DIAS_PADRAO:
+            return False
+        
+        valor = float(trans['valor'])
+        centavos_min = math.ceil(round(valor * (1 - Conciliacao.TOLERANCIA_VALOR_PADRAO) * 100, 6))
+        centavos_max = math.floor(round(valor * (1 + Conciliacao.TOLERANCIA_VALOR_PADRAO) * 100, 6))
+        return centavos_min <= Conciliacao._centavos(atual['valor']) <= centavos_max
+    
+    @staticmethod
+    def _gravar_lote(cursor, lote, agora, user_id):
+        """UPDATEs em conjunto de um lote de pares (linha do extrato, transação do sistema)"""
+        ids_extrato = [m['transacao_extrato_id'] for m in lote]
+        marcadores = ', '.join(['%s'] * len(lote))
+        caso = ' '.join(['WHEN %s THEN %s'] * len(lote))
+        
+        params = []
+        for chave in ('transacao_sistema_tipo', 'transacao_sistema_id', 'similaridade'):
+            for m in lote:
+                params.extend((m['transacao_extrato_id'], m[chave]))
+        
+        cursor.execute(f"""
+            UPDATE transacoes_extrato
+            SET status_conciliacao = 'conciliada',
+                transacao_relacionada_tipo = CASE id {caso} END,
+                transacao_relacionada_id = CASE id {caso} END,
+                similaridade = CASE id {caso} END,
+                conciliado_em = %s,
+                conciliado_por = %s
+            WHERE id IN ({marcadores})
+        """, params + [agora, user_id] + ids_extrato)
+        
+        for tipo, (tabela, _, _) in Conciliacao.ORIGENS_SISTEMA.items():
+            do_tipo = [m for m in lote if m['transacao_sistema_tipo'] == tipo]
+            if not do_tipo:
+                continue
+            
+            params = []
+            for m in do_tipo:
+                params.extend((m['transacao_sistema_id'], m['transacao_extrato_id']))
+            ids_sistema = [m['transacao_sistema_id'] for m in do_tipo]
+            
+            cursor.execute(f"""
+                UPDATE {tabela}
+                SET conciliado = 1,
+                    conciliacao_data = %s,
+                    transacao_extrato_id = CASE id {' '.join(['WHEN %s THEN %s'] * len(do_tipo))} END
+                WHERE id IN ({', '.join(['%s'] * len(do_tipo))})
+            """, [agora] + params + ids_sistema)
+            
+            cursor.execute(f"""
+                DELETE FROM sugestoes_conciliacao
+                WHERE transacao_sistema_tipo = %s
+                AND transacao_sistema_id IN ({', '.join(['%s'] * len(do_tipo))})
+            """, [tipo] + ids_sistema)
+        
+        cursor.execute(f"""
+            DELETE FROM sugestoes_conciliacao
+            WHERE transacao_extrato_id IN ({marcadores})
+        """, ids_extrato)
+    
+    @staticmethod
+    def _ajustar_contadores(cursor, conciliacao_id, status_anterior, status_novo, quantidade=1):
+        """
+        Ajusta total_conciliadas/total_pendentes pela mudança de status de linhas do
+        extrato, na transação do chamador (sem recontar transacoes_extrato)
+        """
+        if status_anterior == status_novo or not quantidade:
+            return
+        
+        delta = {'conciliada': 0, 'pendente': 0}
+        if status_anterior in delta:
+            delta[status_anterior] -= quantidade
+        if status_novo in delta:
+            delta[status_novo] += quantidade
+        
+        cursor.execute("""
+            UPDATE conciliacoes_bancarias
+            SET total_conciliadas = total_conciliadas + %s,
+                total_pendentes = total_pendentes + %s
+            WHERE id = %s
+        """, (delta['conciliada'], delta['pendente'], conciliacao_id))
+    
+    @staticmethod
+    def verificar_contadores(corrigir=False):
+        """
+        Recalcula os contadores de todas as conciliações a partir de transacoes_extrato
+        e compara com os gravados (verificação offline, fora das telas)
+        
+        Args:
+            corrigir: Grava os valores recalculados nas conciliações divergentes
+        
+        Returns:
+            Lista de divergências: {'id', 'gravado': (total, conciliadas, pendentes), 'real': (...)}
+        """
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            
+            cursor.execute("""
+                SELECT 
+                    c.id,
+                    c.total_transacoes,
+                    c.total_conciliadas,
+                    c.total_pendentes,
+                    COUNT(te.id) as total_transacoes_real,
+                    SUM(CASE WHEN te.status_conciliacao = 'conciliada' THEN 1 ELSE 0 END) as total_conciliadas_real,
+                    SUM(CASE WHEN te.status_conciliacao = 'pendente' THEN 1 ELSE 0 END) as total_pendentes_real
+                FROM conciliacoes_bancarias c
+                LEFT JOIN transacoes_extrato te ON te.conciliacao_id = c.id
+                GROUP BY c.id, c.total_transacoes, c.total_conciliadas, c.total_pendentes
+            """)
+            
+            divergencias = []
+            for row in cursor.fetchall():
+                gravado = (row['total_transacoes'] or 0, row['total_conciliadas'] or 0, row['total_pendentes'] or 0)
+                real = (int(row['total_transacoes_real']), int(row['total_conciliadas_real'] or 0),
+                        int(row['total_pendentes_real'] or 0))
+                if gravado != real:
+                    divergencias.append({'id': row['id'], 'gravado': gravado, 'real': real})
+            
+            if corrigir and divergencias:
+                cursor.executemany("""
+                    UPDATE conciliacoes_bancarias
+                    SET total_transacoes = %s, total_conciliadas = %s, total_pendentes = %s
+                    WHERE id = %s
+                """, [d['real'] + (d['id'],) for d in divergencias])
+                conn.commit()
+            
+            cursor.close()
+            
+            return divergencias
+    
     @staticmethod
     def listar_conciliacoes(conta_bancaria_id=None, limit=50):
         """Lista conciliações realizadas"""
@@ -364,13 +1098,9 @@ class Conciliacao:
                     cb.banco,
                     cb.agencia,
                     cb.numero_conta,
-                    cb.descricao as conta_nome,
-                    COUNT(te.id) as total_transacoes_real,
-                    SUM(CASE WHEN te.status_conciliacao = 'conciliada' THEN 1 ELSE 0 END) as total_conciliadas_real,
-                    SUM(CASE WHEN te.status_conciliacao = 'pendente' THEN 1 ELSE 0 END) as total_pendentes_real
+                    cb.descricao as conta_nome
                 FROM conciliacoes_bancarias c
                 INNER JOIN contas_bancarias cb ON c.conta_bancaria_id = cb.id
-                LEFT JOIN transacoes_extrato te ON te.conciliacao_id = c.id
             """
             params = []
             
@@ -378,18 +1108,13 @@ class Conciliacao:
                 query += " WHERE c.conta_bancaria_id = %s"
                 params.append(conta_bancaria_id)
             
-            query += " GROUP BY c.id ORDER BY c.data_importacao DESC LIMIT %s"
+            # Contadores gravados, mantidos por delta a cada (des)conciliação
+            query += " ORDER BY c.data_importacao DESC LIMIT %s"
             params.append(limit)
             
             cursor.execute(query, params)
             conciliacoes = cursor.fetchall()
             
-            # Substituir valores antigos pelos calculados
-            for conc in conciliacoes:
-                conc['total_transacoes'] = conc['total_transacoes_real']
-                conc['total_conciliadas'] = conc['total_conciliadas_real']
-                conc['total_pendentes'] = conc['total_pendentes_real']
-            
             cursor.close()
             
             return conciliacoes
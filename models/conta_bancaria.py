@@ -5,6 +5,8 @@ Gerencia contas correntes, poupança e caixa da empresa
 
 from decimal import Decimal
 from database import DatabaseManager
+from utils.cache import invalidar_tabelas
+from models.movimento_bancario import MovimentoBancarioModel
 
 class ContaBancariaModel:
     """Modelo para gerenciar contas bancárias"""
@@ -60,9 +62,12 @@ class ContaBancariaModel:
             }
             
             cursor.execute(sql, params)
+            conta_id = cursor.lastrowid
+            MovimentoBancarioModel.registrar_abertura(conn, conta_id, saldo)
             conn.commit()
+            invalidar_tabelas('contas_bancarias', conn=conn)
             
-            return cursor.lastrowid
+            return conta_id
     
     @staticmethod
     def get_all(filtros=None):
@@ -181,6 +186,7 @@ class ContaBancariaModel:
             
             cursor.execute(sql, params)
             conn.commit()
+            invalidar_tabelas('contas_bancarias', conn=conn)
             
             return cursor.rowcount > 0
     
@@ -203,57 +209,53 @@ class ContaBancariaModel:
             sql = "UPDATE contas_bancarias SET ativo = 0 WHERE id = %s"
             cursor.execute(sql, (conta_id,))
             conn.commit()
+            invalidar_tabelas('contas_bancarias', conn=conn)
             
             return cursor.rowcount > 0
     
     @staticmethod
-    def debitar(conta_id, valor):
+    def debitar(conta_id, valor, data_movimento=None, origem='manual', origem_id=None, descricao=None):
         """
         Debita valor da conta bancária (para pagamentos)
         
         Args:
             conta_id (int): ID da conta bancária
             valor (Decimal): Valor a debitar
+            data_movimento (date): Data do pagamento (padrão: hoje)
+            origem (str): Origem do movimento no razão (ex.: 'conta_pagar')
+            origem_id (int): ID do registro de origem
+            descricao (str): Descrição do movimento
         
         Returns:
             bool: True se debitado com sucesso
         
         Raises:
-            ValueError: Se conta não existir ou saldo insuficiente
+            ValueError: Se conta não existir ou estiver inativa
         """
         db = DatabaseManager()
         
         with db.get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            
-            # Buscar saldo atual
-            cursor.execute("SELECT saldo_atual FROM contas_bancarias WHERE id = %s AND ativo = 1", (conta_id,))
-            conta = cursor.fetchone()
-            
-            if not conta:
-                raise ValueError(f"Conta bancária {conta_id} não encontrada ou inativa")
-            
-            saldo_atual = Decimal(str(conta['saldo_atual']))
-            valor_decimal = Decimal(str(valor))
-            novo_saldo = saldo_atual - valor_decimal
-            
-            # Atualizar saldo
-            cursor.execute(
-                "UPDATE contas_bancarias SET saldo_atual = %s WHERE id = %s",
-                (novo_saldo, conta_id)
+            MovimentoBancarioModel.movimentar(
+                conn, conta_id, -Decimal(str(valor)), data_movimento,
+                origem=origem, origem_id=origem_id, descricao=descricao
             )
             conn.commit()
+            invalidar_tabelas('contas_bancarias', conn=conn)
             
             return True
     
     @staticmethod
-    def creditar(conta_id, valor):
+    def creditar(conta_id, valor, data_movimento=None, origem='manual', origem_id=None, descricao=None):
         """
         Credita valor na conta bancária (para recebimentos)
         
         Args:
             conta_id (int): ID da conta bancária
             valor (Decimal): Valor a creditar
+            data_movimento (date): Data do recebimento (padrão: hoje)
+            origem (str): Origem do movimento no razão (ex.: 'conta_receber')
+            origem_id (int): ID do registro de origem
+            descricao (str): Descrição do movimento
         
         Returns:
             bool: True se creditado com sucesso
@@ -264,25 +266,12 @@ class ContaBancariaModel:
         db = DatabaseManager()
         
         with db.get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            
-            # Buscar saldo atual
-            cursor.execute("SELECT saldo_atual FROM contas_bancarias WHERE id = %s AND ativo = 1", (conta_id,))
-            conta = cursor.fetchone()
-            
-            if not conta:
-                raise ValueError(f"Conta bancária {conta_id} não encontrada ou inativa")
-            
-            saldo_atual = Decimal(str(conta['saldo_atual']))
-            valor_decimal = Decimal(str(valor))
-            novo_saldo = saldo_atual + valor_decimal
-            
-            # Atualizar saldo
-            cursor.execute(
-                "UPDATE contas_bancarias SET saldo_atual = %s WHERE id = %s",
-                (novo_saldo, conta_id)
+            MovimentoBancarioModel.movimentar(
+                conn, conta_id, Decimal(str(valor)), data_movimento,
+                origem=origem, origem_id=origem_id, descricao=descricao
             )
             conn.commit()
+            invalidar_tabelas('contas_bancarias', conn=conn)
             
             return True
     
@@ -300,33 +289,26 @@ class ContaBancariaModel:
         Returns:
             dict: Novo saldo ou None se erro
         """
+        if operacao == 'credito':
+            valor_movimento = Decimal(str(valor))
+        elif operacao == 'debito':
+            valor_movimento = -Decimal(str(valor))
+        else:
+            return None
+        
         db = DatabaseManager()
         
         with db.get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            
-            # Buscar saldo atual
-            cursor.execute("SELECT saldo_atual FROM contas_bancarias WHERE id = %s", (conta_id,))
-            conta = cursor.fetchone()
-            
-            if not conta:
-                return None
-            
-            saldo_atual = Decimal(str(conta['saldo_atual']))
-            
-            if operacao == 'credito':
-                novo_saldo = saldo_atual + Decimal(str(valor))
-            elif operacao == 'debito':
-                novo_saldo = saldo_atual - Decimal(str(valor))
-            else:
+            try:
+                saldo_atual, novo_saldo = MovimentoBancarioModel.movimentar(
+                    conn, conta_id, valor_movimento,
+                    origem='ajuste', descricao=descricao, exigir_ativa=False
+                )
+            except ValueError:
                 return None
             
-            # Atualizar saldo
-            cursor.execute(
-                "UPDATE contas_bancarias SET saldo_atual = %s WHERE id = %s",
-                (novo_saldo, conta_id)
-            )
             conn.commit()
+            invalidar_tabelas('contas_bancarias', conn=conn)
             
             return {
                 'saldo_anterior': saldo_atual,
@@ -335,6 +317,16 @@ class ContaBancariaModel:
                 'saldo_novo': novo_saldo
             }
     
+    @staticmethod
+    def saldo_em(conta_id, data_referencia):
+        """
+        Saldo da conta ao fim de uma data (a partir do razão de movimentos)
+        
+        Returns:
+            Decimal: Saldo na data
+        """
+        return MovimentoBancarioModel.saldo_em(conta_id, data_referencia)
+    
     @staticmethod
     def get_totalizadores(filial_id=None):
         """
@@ -2,9 +2,33 @@
 Modelo para gerenciamento de Contas a Pagar
 """
 from typing import Dict, List, Optional
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime, date, timedelta
-from database import DatabaseManager
+from database import DatabaseManager, inserir_em_lote
+from utils.cache import invalidar_tabelas
+from models.fato_financeiro import FatoFinanceiroModel
+from models.conciliacao import Conciliacao
+from utils.paginacao import (ORDEM_PADRAO, LIMITE_PADRAO, normalizar_ordem, normalizar_limite,
+                             decodificar_cursor, montar_keyset, paginar)
+
+# Colunas e joins comuns à listagem (get_all e get_pagina)
+_SELECT_LISTAGEM = """
+    SELECT cp.*, 
+           f.razao_social as fornecedor_nome,
+           f.nome as fornecedor_fantasia,
+           ts.descricao as tipo_servico_descricao,
+           cc.descricao as centro_custo_descricao,
+           pc.codigo as conta_contabil_codigo,
+           pc.descricao as conta_contabil_descricao,
+           fil.nome as filial_nome
+    FROM contas_pagar cp
+    INNER JOIN fornecedores f ON cp.fornecedor_id = f.id
+    LEFT JOIN tipos_servicos ts ON cp.tipo_servico_id = ts.id
+    LEFT JOIN centro_custos cc ON cp.centro_custo_id = cc.id
+    LEFT JOIN plano_contas pc ON cp.conta_contabil_id = pc.id
+    LEFT JOIN filiais fil ON cp.filial_id = fil.id
+    WHERE 1=1
+"""
 
 class ContaPagarModel:
     """Operações CRUD para Contas a Pagar"""
@@ -51,8 +75,10 @@ class ContaPagarModel:
                     'pendente',
                     dados.get('created_by')
                 ))
-                conn.commit()
                 conta_id = cursor.lastrowid
+                FatoFinanceiroModel.adicionar(conn, 'conta_pagar', [conta_id])
+                conn.commit()
+                invalidar_tabelas('contas_pagar', conn=conn)
                 
                 # Se tiver mais de uma parcela, criar as outras
                 if dados.get('numero_parcelas', 1) > 1:
@@ -71,24 +97,13 @@ class ContaPagarModel:
         
         # Pegar a data de vencimento da primeira parcela
         data_base = datetime.strptime(dados['data_vencimento'], '%Y-%m-%d').date() if isinstance(dados['data_vencimento'], str) else dados['data_vencimento']
+        linhas = []
         
         for i in range(2, numero_parcelas + 1):
             # Calcular vencimento (30 dias após a anterior)
             data_vencimento = data_base + timedelta(days=30 * (i - 1))
             
-            query = """
-                INSERT INTO contas_pagar
-                (fornecedor_id, tipo_servico_id, centro_custo_id, conta_contabil_id, filial_id,
-                 descricao, numero_documento, observacoes,
-                 valor_total, numero_parcelas, parcela_atual,
-                 recorrente, tipo_recorrencia,
-                 data_emissao, data_vencimento, referencia,
-                 percentual_juros, percentual_multa,
-                 status, created_by)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            cursor.execute(query, (
+            linhas.append((
                 dados['fornecedor_id'],
                 dados.get('tipo_servico_id'),
                 dados.get('centro_custo_id'),
@@ -111,7 +126,20 @@ class ContaPagarModel:
                 dados.get('created_by')
             ))
         
+        # Todas as parcelas em um INSERT com várias linhas
+        insercao = inserir_em_lote(cursor, 'contas_pagar', [
+            'fornecedor_id', 'tipo_servico_id', 'centro_custo_id', 'conta_contabil_id', 'filial_id',
+            'descricao', 'numero_documento', 'observacoes',
+            'valor_total', 'numero_parcelas', 'parcela_atual',
+            'recorrente', 'tipo_recorrencia',
+            'data_emissao', 'data_vencimento', 'referencia',
+            'percentual_juros', 'percentual_multa',
+            'status', 'created_by'
+        ], linhas, retornar_ids=True)
+        
+        FatoFinanceiroModel.adicionar(conn, 'conta_pagar', insercao['ids'])
         conn.commit()
+        invalidar_tabelas('contas_pagar', conn=conn)
 
     @staticmethod
     def get_all(fornecedor_id: Optional[int] = None, 
@@ -120,75 +148,114 @@ class ContaPagarModel:
                 status: Optional[str] = None,
                 data_inicio: Optional[date] = None,
                 data_fim: Optional[date] = None) -> List[Dict]:
-        """Lista todas as contas a pagar com filtros opcionais"""
+        """Lista todas as contas a pagar com filtros opcionais (usado nas exportações)"""
+        filtro_sql, params = ContaPagarModel._filtros_sql({
+            'fornecedor_id': fornecedor_id,
+            'filial_id': filial_id,
+            'centro_custo_id': centro_custo_id,
+            'status': status,
+            'data_inicio': data_inicio,
+            'data_fim': data_fim
+        })
+        
         db = DatabaseManager()
         with db.get_connection() as conn:
             cursor = conn.cursor(dictionary=True)
             
-            query = """
-                SELECT cp.*, 
-                       f.razao_social as fornecedor_nome,
-                       f.nome as fornecedor_fantasia,
-                       ts.descricao as tipo_servico_descricao,
-                       cc.descricao as centro_custo_descricao,
-                       pc.codigo as conta_contabil_codigo,
-                       pc.descricao as conta_contabil_descricao,
-                       fil.nome as filial_nome
-                FROM contas_pagar cp
-                INNER JOIN fornecedores f ON cp.fornecedor_id = f.id
-                LEFT JOIN tipos_servicos ts ON cp.tipo_servico_id = ts.id
-                LEFT JOIN centro_custos cc ON cp.centro_custo_id = cc.id
-                LEFT JOIN plano_contas pc ON cp.conta_contabil_id = pc.id
-                LEFT JOIN filiais fil ON cp.filial_id = fil.id
-                WHERE 1=1
-            """
-            params = []
-            
-            if fornecedor_id:
-                query += " AND cp.fornecedor_id = %s"
-                params.append(fornecedor_id)
-            
-            if centro_custo_id:
-                query += " AND cp.centro_custo_id = %s"
-                params.append(centro_custo_id)
-            
-            if filial_id:
-                query += " AND cp.filial_id = %s"
-                params.append(filial_id)
-            
-            if status:
-                query += " AND cp.status = %s"
-                params.append(status)
-            
-            if data_inicio:
-                query += " AND cp.data_vencimento >= %s"
-                params.append(data_inicio)
-            
-            if data_fim:
-                query += " AND cp.data_vencimento <= %s"
-                params.append(data_fim)
-            
-            query += " ORDER BY cp.data_vencimento ASC, cp.id DESC"
+            query = _SELECT_LISTAGEM + filtro_sql + " ORDER BY cp.data_vencimento ASC, cp.id DESC"
             
             cursor.execute(query, tuple(params))
-            contas = cursor.fetchall()
-            
-            # Atualizar status de contas vencidas
-            ContaPagarModel._atualizar_status_vencidas(conn)
+            return cursor.fetchall()
+
+    @staticmethod
+    def _filtros_sql(filtros: Dict) -> tuple:
+        """
+        Condições WHERE dos filtros da listagem (alias cp)
+        
+        Returns:
+            tuple: (sql, params)
+        """
+        sql = ""
+        params = []
+        
+        colunas = (
+            ('fornecedor_id', 'cp.fornecedor_id = %s'),
+            ('centro_custo_id', 'cp.centro_custo_id = %s'),
+            ('filial_id', 'cp.filial_id = %s'),
+            ('status', 'cp.status = %s'),
+            ('data_inicio', 'cp.data_vencimento >= %s'),
+            ('data_fim', 'cp.data_vencimento <= %s')
+        )
+        for chave, condicao in colunas:
+            if filtros.get(chave):
+                sql += f" AND {condicao}"
+                params.append(filtros[chave])
+        
+        return sql, params
+
+    @staticmethod
+    def get_pagina(filtros: Dict = None, cursor: Optional[str] = None,
+                   limite: int = LIMITE_PADRAO, ordem: str = ORDEM_PADRAO) -> Dict:
+        """
+        Lista uma página de contas a pagar (paginação por keyset)
+        
+        Em vez de OFFSET, a página continua a partir da última linha vista
+        (coluna de ordenação, id), então o custo não cresce com a profundidade.
+        
+        Args:
+            filtros: Mesmos filtros de get_all (fornecedor_id, filial_id, centro_custo_id,
+                     status, data_inicio, data_fim)
+            cursor: Cursor opaco recebido em proximo_cursor/cursor_anterior
+            limite: Tamanho da página (máximo LIMITE_MAXIMO)
+            ordem: Chave de utils.paginacao.ORDENACOES
+        
+        Returns:
+            dict: {'itens', 'proximo_cursor', 'cursor_anterior', 'limite', 'ordem'}
+        """
+        ordem = normalizar_ordem(ordem)
+        limite = normalizar_limite(limite)
+        posicao = decodificar_cursor(cursor, ordem)
+        
+        filtro_sql, params = ContaPagarModel._filtros_sql(filtros or {})
+        keyset_sql, keyset_params, order_by = montar_keyset('cp', ordem, posicao)
+        
+        db = DatabaseManager()
+        with db.get_connection() as conn:
+            cursor_db = conn.cursor(dictionary=True)
             
-            return contas
+            # Uma linha a mais indica se existe página seguinte
+            query = _SELECT_LISTAGEM + filtro_sql + keyset_sql + order_by + " LIMIT %s"
+            cursor_db.execute(query, params + keyset_params + [limite + 1])
+            linhas = cursor_db.fetchall()
+        
+        return paginar(linhas, limite, ordem, posicao)
 
     @staticmethod
-    def _atualizar_status_vencidas(conn):
-        """Atualiza status de contas vencidas automaticamente"""
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE contas_pagar 
-            SET status = 'vencido'
-            WHERE status = 'pendente' 
-            AND data_vencimento < CURDATE()
-        """)
-        conn.commit()
+    def atualizar_status_vencidas() -> int:
+        """
+        Marca como vencidas as contas pendentes com vencimento anterior a hoje
+        
+        Executada pelo agendador (services/agendador.py) na inicialização e uma vez
+        por dia, e não mais a cada listagem. pendente e vencido têm a mesma natureza
+        no fato_financeiro_diario, então o fato não muda.
+        
+        Returns:
+            int: Quantidade de contas atualizadas
+        """
+        db = DatabaseManager()
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE contas_pagar 
+                SET status = 'vencido'
+                WHERE status = 'pendente' 
+                AND data_vencimento < CURDATE()
+            """)
+            atualizadas = cursor.rowcount
+            conn.commit()
+            if atualizadas:
+                invalidar_tabelas('contas_pagar', conn=conn)
+            return atualizadas
 
     @staticmethod
     def get_by_id(conta_id: int) -> Optional[Dict]:
@@ -216,6 +283,48 @@ class ContaPagarModel:
             cursor.execute(query, (conta_id,))
             return cursor.fetchone()
 
+    @staticmethod
+    def get_by_ids(contas_ids: List[int]) -> List[Dict]:
+        """Busca várias contas por ID (mesmas colunas da listagem), em uma query"""
+        contas_ids = [int(i) for i in contas_ids]
+        if not contas_ids:
+            return []
+        
+        db = DatabaseManager()
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            query = (_SELECT_LISTAGEM
+                     + f" AND cp.id IN ({', '.join(['%s'] * len(contas_ids))})"
+                     + " ORDER BY cp.data_vencimento ASC, cp.id ASC")
+            cursor.execute(query, tuple(contas_ids))
+            return cursor.fetchall()
+
+    @staticmethod
+    def _calcular_encargos(conta: Dict, data_pagamento: date) -> tuple:
+        """
+        Multa (uma vez) e juros (por dia de atraso) pelos percentuais da conta
+        
+        Returns:
+            tuple: (valor_juros, valor_multa) arredondados em centavos
+        """
+        valor_juros = Decimal('0')
+        valor_multa = Decimal('0')
+        
+        if data_pagamento > conta['data_vencimento']:
+            dias_atraso = (data_pagamento - conta['data_vencimento']).days
+            valor_total = Decimal(str(conta['valor_total']))
+            
+            # Multa (uma vez)
+            if conta['percentual_multa'] > 0:
+                valor_multa = (valor_total * Decimal(str(conta['percentual_multa']))) / 100
+            
+            # Juros (por dia)
+            if conta['percentual_juros'] > 0:
+                valor_juros = (valor_total * Decimal(str(conta['percentual_juros'])) * dias_atraso) / 100
+        
+        centavo = Decimal('0.01')
+        return valor_juros.quantize(centavo, ROUND_HALF_UP), valor_multa.quantize(centavo, ROUND_HALF_UP)
+
     @staticmethod
     def baixar(conta_id: int, dados_baixa: Dict) -> Dict:
         """Realiza a baixa (pagamento) de uma conta"""
@@ -247,15 +356,7 @@ class ContaPagarModel:
                 
                 # Se não informado manualmente, calcular automaticamente
                 if valor_juros == 0 and valor_multa == 0 and data_pagamento > data_vencimento:
-                    dias_atraso = (data_pagamento - data_vencimento).days
-                    
-                    # Multa (uma vez)
-                    if conta['percentual_multa'] > 0:
-                        valor_multa = (Decimal(str(conta['valor_total'])) * Decimal(str(conta['percentual_multa']))) / 100
-                    
-                    # Juros (por dia)
-                    if conta['percentual_juros'] > 0:
-                        valor_juros = (Decimal(str(conta['valor_total'])) * Decimal(str(conta['percentual_juros'])) * dias_atraso) / 100
+                    valor_juros, valor_multa = ContaPagarModel._calcular_encargos(conta, data_pagamento)
                 
                 # Aplicar desconto se houver
                 valor_desconto = Decimal(str(dados_baixa.get('valor_desconto', 0)))
@@ -279,16 +380,19 @@ class ContaPagarModel:
                     WHERE id = %s
                 """
                 
-                cursor.execute(query, (
-                    dados_baixa['conta_bancaria_id'],
-                    data_pagamento,
-                    valor_total_pago,
-                    valor_juros,
-                    valor_multa,
-                    valor_desconto,
-                    conta_id
-                ))
+                with FatoFinanceiroModel.atualizando(conn, 'conta_pagar', [conta_id]), \
+                        Conciliacao.recalculando(conn, 'contas_pagar', [conta_id]):
+                    cursor.execute(query, (
+                        dados_baixa['conta_bancaria_id'],
+                        data_pagamento,
+                        valor_total_pago,
+                        valor_juros,
+                        valor_multa,
+                        valor_desconto,
+                        conta_id
+                    ))
                 conn.commit()
+                invalidar_tabelas('contas_pagar', conn=conn)
                 
                 return {
                     'success': True, 
@@ -301,6 +405,108 @@ class ContaPagarModel:
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
+    @staticmethod
+    def baixar_lote(contas_ids: List[int], dados_baixa: Dict) -> Dict:
+        """
+        Realiza a baixa de várias contas de uma vez, tudo ou nada
+        
+        As contas são travadas (FOR UPDATE) e validadas juntas: se alguma não puder
+        ser paga nenhuma é baixada. Juros e multa são calculados por conta, como em
+        baixar(). O débito bancário e a auditoria ficam com o chamador, que deve
+        envolver tudo em db.unit_of_work() e usar os totais de 'por_conta_bancaria'.
+        
+        Args:
+            contas_ids: IDs das contas a pagar
+            dados_baixa: conta_bancaria_id e data_pagamento (comuns ao lote)
+        
+        Returns:
+            dict: success, message, quantidade, total_pago, por_conta_bancaria
+                  ({conta_bancaria_id: Decimal}) e contas (valores aplicados por conta)
+        """
+        try:
+            contas_ids = list(dict.fromkeys(int(i) for i in contas_ids))
+            if not contas_ids:
+                return {'success': False, 'message': 'Nenhuma conta selecionada'}
+            
+            if not dados_baixa.get('conta_bancaria_id'):
+                return {'success': False, 'message': 'Conta bancária é obrigatória'}
+            conta_bancaria_id = int(dados_baixa['conta_bancaria_id'])
+            
+            data_pagamento = dados_baixa['data_pagamento']
+            if isinstance(data_pagamento, str):
+                data_pagamento = datetime.strptime(data_pagamento, '%Y-%m-%d').date()
+            
+            db = DatabaseManager()
+            with db.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                placeholders = ', '.join(['%s'] * len(contas_ids))
+                cursor.execute(f"""
+                    SELECT id, descricao, status, data_vencimento, valor_total,
+                           percentual_juros, percentual_multa
+                    FROM contas_pagar
+                    WHERE id IN ({placeholders})
+                    FOR UPDATE
+                """, tuple(contas_ids))
+                contas = {conta['id']: conta for conta in cursor.fetchall()}
+                
+                # Validar o lote inteiro antes de alterar qualquer conta
+                erros = []
+                for conta_id in contas_ids:
+                    conta = contas.get(conta_id)
+                    if not conta:
+                        erros.append(f"Conta {conta_id} não encontrada")
+                    elif conta['status'] not in ('pendente', 'vencido'):
+                        erros.append(f"Conta {conta_id} ({conta['descricao']}) está {conta['status']}")
+                if erros:
+                    conn.rollback()  # libera as linhas travadas
+                    return {'success': False, 'message': '; '.join(erros)}
+                
+                baixas = []
+                for conta_id in contas_ids:
+                    conta = contas[conta_id]
+                    valor_juros, valor_multa = ContaPagarModel._calcular_encargos(conta, data_pagamento)
+                    valor_pago = Decimal(str(conta['valor_total'])) + valor_juros + valor_multa
+                    baixas.append({
+                        'id': conta_id,
+                        'valor_pago': valor_pago,
+                        'valor_juros': valor_juros,
+                        'valor_multa': valor_multa
+                    })
+                
+                with FatoFinanceiroModel.atualizando(conn, 'conta_pagar', contas_ids), \
+                        Conciliacao.recalculando(conn, 'contas_pagar', contas_ids):
+                    cursor.executemany("""
+                        UPDATE contas_pagar
+                        SET status = 'pago',
+                            conta_bancaria_id = %s,
+                            data_pagamento = %s,
+                            valor_pago = %s,
+                            valor_juros = %s,
+                            valor_multa = %s,
+                            valor_desconto = 0
+                        WHERE id = %s
+                    """, [
+                        (conta_bancaria_id, data_pagamento, baixa['valor_pago'],
+                         baixa['valor_juros'], baixa['valor_multa'], baixa['id'])
+                        for baixa in baixas
+                    ])
+                conn.commit()
+                invalidar_tabelas('contas_pagar', conn=conn)
+                
+                total_pago = sum((baixa['valor_pago'] for baixa in baixas), Decimal('0'))
+                
+                return {
+                    'success': True,
+                    'message': f'{len(baixas)} pagamento(s) registrado(s) com sucesso',
+                    'quantidade': len(baixas),
+                    'total_pago': total_pago,
+                    'por_conta_bancaria': {conta_bancaria_id: total_pago},
+                    'contas': baixas
+                }
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+
     @staticmethod
     def cancelar(conta_id: int) -> Dict:
         """Cancela uma conta a pagar"""
@@ -308,11 +514,14 @@ class ContaPagarModel:
             db = DatabaseManager()
             with db.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute(
-                    "UPDATE contas_pagar SET status = 'cancelado' WHERE id = %s",
-                    (conta_id,)
-                )
+                with FatoFinanceiroModel.atualizando(conn, 'conta_pagar', [conta_id]):
+                    cursor.execute(
+                        "UPDATE contas_pagar SET status = 'cancelado' WHERE id = %s",
+                        (conta_id,)
+                    )
+                Conciliacao.invalidar_sugestoes_sistema(conn, 'contas_pagar', [conta_id])
                 conn.commit()
+                invalidar_tabelas('contas_pagar', conn=conn)
                 return {'success': True, 'message': 'Conta cancelada com sucesso'}
         except Exception as e:
             return {'success': False, 'message': str(e)}
@@ -355,24 +564,28 @@ class ContaPagarModel:
                     WHERE id = %s
                 """
                 
-                cursor.execute(query, (
-                    dados['fornecedor_id'],
-                    dados.get('tipo_servico_id'),
-                    dados.get('centro_custo_id'),
-                    dados.get('conta_contabil_id'),
-                    dados.get('filial_id'),
-                    dados['descricao'],
-                    dados.get('numero_documento'),
-                    dados.get('observacoes'),
-                    dados['valor_total'],
-                    dados['data_emissao'],
-                    dados['data_vencimento'],
-                    dados.get('referencia'),
-                    dados.get('percentual_juros', 0),
-                    dados.get('percentual_multa', 0),
-                    conta_id
-                ))
+                with FatoFinanceiroModel.atualizando(conn, 'conta_pagar', [conta_id]), \
+                        Conciliacao.recalculando(conn, 'contas_pagar', [conta_id]):
+                    cursor.execute(query, (
+                        dados['fornecedor_id'],
+                        dados.get('tipo_servico_id'),
+                        dados.get('centro_custo_id'),
+                        dados.get('conta_contabil_id'),
+                        dados.get('filial_id'),
+                        dados['descricao'],
+                        dados.get('numero_documento'),
+                        dados.get('observacoes'),
+                        dados['valor_total'],
+                        dados['data_emissao'],
+                        dados['data_vencimento'],
+                        dados.get('referencia'),
+                        dados.get('percentual_juros', 0),
+                        dados.get('percentual_multa', 0),
+                        conta_id
+                    ))
+                Conciliacao.invalidar_sugestoes_sistema(conn, 'contas_pagar', [conta_id])
                 conn.commit()
+                invalidar_tabelas('contas_pagar', conn=conn)
                 
                 return {'success': True, 'message': 'Conta atualizada com sucesso'}
         except Exception as e:
@@ -397,11 +610,14 @@ class ContaPagarModel:
                     return {'success': False, 'message': 'Não é possível excluir uma conta já paga. Use o estorno.'}
                 
                 # Soft delete - marca como cancelado
-                cursor.execute(
-                    "UPDATE contas_pagar SET status = 'cancelado', updated_at = NOW() WHERE id = %s",
-                    (conta_id,)
-                )
+                with FatoFinanceiroModel.atualizando(conn, 'conta_pagar', [conta_id]):
+                    cursor.execute(
+                        "UPDATE contas_pagar SET status = 'cancelado', updated_at = NOW() WHERE id = %s",
+                        (conta_id,)
+                    )
+                Conciliacao.invalidar_sugestoes_sistema(conn, 'contas_pagar', [conta_id])
                 conn.commit()
+                invalidar_tabelas('contas_pagar', conn=conn)
                 
                 return {'success': True, 'message': 'Conta excluída com sucesso'}
         except Exception as e:
@@ -409,47 +625,35 @@ class ContaPagarModel:
 
     @staticmethod
     def get_totalizadores(filtros: Dict = None) -> Dict:
-        """Retorna totalizadores de contas a pagar"""
+        """
+        Retorna totalizadores de contas a pagar para os filtros da listagem
+        
+        Uma única agregação sobre todas as linhas filtradas, independente da página
+        exibida (ver get_pagina).
+        """
+        filtro_sql, params = ContaPagarModel._filtros_sql(filtros or {})
+        
         db = DatabaseManager()
         with db.get_connection() as conn:
             cursor = conn.cursor(dictionary=True)
             
-            query_base = "SELECT SUM(valor_total) as total FROM contas_pagar WHERE 1=1"
-            params = []
-            
-            if filtros:
-                if filtros.get('fornecedor_id'):
-                    query_base += " AND fornecedor_id = %s"
-                    params.append(filtros['fornecedor_id'])
-                
-                if filtros.get('centro_custo_id'):
-                    query_base += " AND centro_custo_id = %s"
-                    params.append(filtros['centro_custo_id'])
-                
-                if filtros.get('filial_id'):
-                    query_base += " AND filial_id = %s"
-                    params.append(filtros['filial_id'])
-            
-            # Total pendente
-            query_pendente = query_base + " AND status = 'pendente'"
-            cursor.execute(query_pendente, tuple(params))
-            total_pendente = cursor.fetchone()['total'] or 0
-            
-            # Total vencido
-            query_vencido = query_base + " AND status = 'vencido'"
-            cursor.execute(query_vencido, tuple(params))
-            total_vencido = cursor.fetchone()['total'] or 0
-            
-            # Total pago
-            query_pago = query_base + " AND status = 'pago'"
-            cursor.execute(query_pago, tuple(params))
-            total_pago = cursor.fetchone()['total'] or 0
+            cursor.execute(f"""
+                SELECT 
+                    COALESCE(SUM(CASE WHEN cp.status = 'pendente' THEN cp.valor_total ELSE 0 END), 0) as total_pendente,
+                    COALESCE(SUM(CASE WHEN cp.status = 'vencido' THEN cp.valor_total ELSE 0 END), 0) as total_vencido,
+                    COALESCE(SUM(CASE WHEN cp.status = 'pago' THEN cp.valor_total ELSE 0 END), 0) as total_pago,
+                    COUNT(*) as quantidade
+                FROM contas_pagar cp
+                WHERE 1=1{filtro_sql}
+            """, tuple(params))
+            totais = cursor.fetchone()
             
             return {
-                'total_pendente': float(total_pendente),
-                'total_vencido': float(total_vencido),
-                'total_pago': float(total_pago),
-                'total_geral': float(total_pendente + total_vencido + total_pago)
+                'total_pendente': float(totais['total_pendente']),
+                'total_vencido': float(totais['total_vencido']),
+                'total_pago': float(totais['total_pago']),
+                'total_geral': float(totais['total_pendente'] + totais['total_vencido'] + totais['total_pago']),
+                'quantidade': int(totais['quantidade'])
             }
 
     @staticmethod
@@ -523,8 +727,11 @@ class ContaPagarModel:
                     WHERE id = %s
                 """
                 
-                cursor.execute(query, (motivo, conta_id))
+                with FatoFinanceiroModel.atualizando(conn, 'conta_pagar', [conta_id]):
+                    cursor.execute(query, (motivo, conta_id))
+                Conciliacao.invalidar_sugestoes_sistema(conn, 'contas_pagar', [conta_id])
                 conn.commit()
+                invalidar_tabelas('contas_pagar', conn=conn)
                 
                 return {'success': True, 'message': 'Pagamento estornado com sucesso'}
                 
@@ -3,8 +3,32 @@ Modelo de dados para Contas a Receber
 """
 from typing import List, Dict, Optional
 from datetime import date, datetime, timedelta
-from decimal import Decimal
-from database import DatabaseManager
+from decimal import Decimal, InvalidOperation
+from database import DatabaseManager, inserir_em_lote
+from utils.cache import invalidar_tabelas
+from models.fato_financeiro import FatoFinanceiroModel
+from models.conciliacao import Conciliacao
+from utils.paginacao import (ORDEM_PADRAO, LIMITE_PADRAO, normalizar_ordem, normalizar_limite,
+                             decodificar_cursor, montar_keyset, paginar)
+
+# Colunas e joins comuns à listagem (get_all e get_pagina)
+_SELECT_LISTAGEM = """
+    SELECT cr.*, 
+           c.razao_social as cliente_nome,
+           c.nome as cliente_fantasia,
+           ts.descricao as tipo_servico_descricao,
+           cc.descricao as centro_custo_descricao,
+           pc.codigo as conta_contabil_codigo,
+           pc.descricao as conta_contabil_descricao,
+           fil.nome as filial_nome
+    FROM contas_receber cr
+    INNER JOIN clientes c ON cr.cliente_id = c.id
+    LEFT JOIN tipos_servicos ts ON cr.tipo_servico_id = ts.id
+    LEFT JOIN centro_custos cc ON cr.centro_custo_id = cc.id
+    LEFT JOIN plano_contas pc ON cr.conta_contabil_id = pc.id
+    LEFT JOIN filiais fil ON cr.filial_id = fil.id
+    WHERE 1=1
+"""
 
 class ContaReceberModel:
     """Classe para gerenciar operações de Contas a Receber"""
@@ -73,9 +97,12 @@ class ContaReceberModel:
                     dados.get('observacoes'),
                     dados.get('created_by')
                 ))
+                conta_id = cursor.lastrowid
+                FatoFinanceiroModel.adicionar(conn, 'conta_receber', [conta_id])
                 
                 conn.commit()
-                return cursor.lastrowid
+                invalidar_tabelas('contas_receber', conn=conn)
+                return conta_id
     
     @staticmethod
     def _criar_parcelas(cursor, dados: Dict, conn) -> int:
@@ -89,7 +116,7 @@ class ContaReceberModel:
             data_vencimento = datetime.strptime(data_vencimento, '%Y-%m-%d').date()
         
         intervalo_dias = dados.get('intervalo_parcelas', 30)
-        primeiro_id = None
+        linhas = []
         
         for i in range(1, numero_parcelas + 1):
             # Calcular data de vencimento da parcela
@@ -98,17 +125,7 @@ class ContaReceberModel:
             else:
                 data_parcela = data_vencimento + timedelta(days=(i-1) * intervalo_dias)
             
-            query = """
-                INSERT INTO contas_receber 
-                (cliente_id, filial_id, tipo_servico_id, centro_custo_id, conta_contabil_id,
-                 descricao, numero_documento, valor_total, data_emissao, data_vencimento,
-                 numero_parcelas, parcela_atual, intervalo_parcelas,
-                 percentual_juros, percentual_multa, is_recorrente, recorrencia_tipo,
-                 observacoes, created_by)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            cursor.execute(query, (
+            linhas.append((
                 dados['cliente_id'],
                 dados.get('filial_id'),
                 dados.get('tipo_servico_id'),
@@ -129,12 +146,20 @@ class ContaReceberModel:
                 dados.get('observacoes'),
                 dados.get('created_by')
             ))
-            
-            if i == 1:
-                primeiro_id = cursor.lastrowid
         
+        # Todas as parcelas em um INSERT com várias linhas
+        insercao = inserir_em_lote(cursor, 'contas_receber', [
+            'cliente_id', 'filial_id', 'tipo_servico_id', 'centro_custo_id', 'conta_contabil_id',
+            'descricao', 'numero_documento', 'valor_total', 'data_emissao', 'data_vencimento',
+            'numero_parcelas', 'parcela_atual', 'intervalo_parcelas',
+            'percentual_juros', 'percentual_multa', 'is_recorrente', 'recorrencia_tipo',
+            'observacoes', 'created_by'
+        ], linhas, retornar_ids=True)
+        
+        FatoFinanceiroModel.adicionar(conn, 'conta_receber', insercao['ids'])
         conn.commit()
-        return primeiro_id
+        invalidar_tabelas('contas_receber', conn=conn)
+        return insercao['ids'][0]
     
     @staticmethod
     def get_all(cliente_id: Optional[int] = None, 
@@ -143,75 +168,113 @@ class ContaReceberModel:
                 status: Optional[str] = None,
                 data_inicio: Optional[date] = None,
                 data_fim: Optional[date] = None) -> List[Dict]:
-        """Lista todas as contas a receber com filtros opcionais"""
+        """Lista todas as contas a receber com filtros opcionais (usado nas exportações)"""
+        filtro_sql, params = ContaReceberModel._filtros_sql({
+            'cliente_id': cliente_id,
+            'filial_id': filial_id,
+            'centro_custo_id': centro_custo_id,
+            'status': status,
+            'data_inicio': data_inicio,
+            'data_fim': data_fim
+        })
+        
         db = DatabaseManager()
         with db.get_connection() as conn:
             cursor = conn.cursor(dictionary=True)
             
-            query = """
-                SELECT cr.*, 
-                       c.razao_social as cliente_nome,
-                       c.nome as cliente_fantasia,
-                       ts.descricao as tipo_servico_descricao,
-                       cc.descricao as centro_custo_descricao,
-                       pc.codigo as conta_contabil_codigo,
-                       pc.descricao as conta_contabil_descricao,
-                       fil.nome as filial_nome
-                FROM contas_receber cr
-                INNER JOIN clientes c ON cr.cliente_id = c.id
-                LEFT JOIN tipos_servicos ts ON cr.tipo_servico_id = ts.id
-                LEFT JOIN centro_custos cc ON cr.centro_custo_id = cc.id
-                LEFT JOIN plano_contas pc ON cr.conta_contabil_id = pc.id
-                LEFT JOIN filiais fil ON cr.filial_id = fil.id
-                WHERE 1=1
-            """
-            params = []
-            
-            if cliente_id:
-                query += " AND cr.cliente_id = %s"
-                params.append(cliente_id)
-            
-            if centro_custo_id:
-                query += " AND cr.centro_custo_id = %s"
-                params.append(centro_custo_id)
-            
-            if filial_id:
-                query += " AND cr.filial_id = %s"
-                params.append(filial_id)
-            
-            if status:
-                query += " AND cr.status = %s"
-                params.append(status)
-            
-            if data_inicio:
-                query += " AND cr.data_vencimento >= %s"
-                params.append(data_inicio)
-            
-            if data_fim:
-                query += " AND cr.data_vencimento <= %s"
-                params.append(data_fim)
-            
-            query += " ORDER BY cr.data_vencimento ASC, cr.parcela_atual ASC"
+            query = _SELECT_LISTAGEM + filtro_sql + " ORDER BY cr.data_vencimento ASC, cr.parcela_atual ASC"
             
             cursor.execute(query, params)
-            contas = cursor.fetchall()
-            
-            # Atualizar status de vencidas
-            ContaReceberModel._atualizar_status_vencidas(cursor, conn)
+            return cursor.fetchall()
+    
+    @staticmethod
+    def _filtros_sql(filtros: Dict) -> tuple:
+        """
+        Condições WHERE dos filtros da listagem (alias cr)
+        
+        Returns:
+            tuple: (sql, params)
+        """
+        sql = ""
+        params = []
+        
+        colunas = (
+            ('cliente_id', 'cr.cliente_id = %s'),
+            ('centro_custo_id', 'cr.centro_custo_id = %s'),
+            ('filial_id', 'cr.filial_id = %s'),
+            ('status', 'cr.status = %s'),
+            ('data_inicio', 'cr.data_vencimento >= %s'),
+            ('data_fim', 'cr.data_vencimento <= %s')
+        )
+        for chave, condicao in colunas:
+            if filtros.get(chave):
+                sql += f" AND {condicao}"
+                params.append(filtros[chave])
+        
+        return sql, params
+    
+    @staticmethod
+    def get_pagina(filtros: Dict = None, cursor: Optional[str] = None,
+                   limite: int = LIMITE_PADRAO, ordem: str = ORDEM_PADRAO) -> Dict:
+        """
+        Lista uma página de contas a receber (paginação por keyset)
+        
+        Em vez de OFFSET, a página continua a partir da última linha vista
+        (coluna de ordenação, id), então o custo não cresce com a profundidade.
+        
+        Args:
+            filtros: Mesmos filtros de get_all (cliente_id, filial_id, centro_custo_id,
+                     status, data_inicio, data_fim)
+            cursor: Cursor opaco recebido em proximo_cursor/cursor_anterior
+            limite: Tamanho da página (máximo LIMITE_MAXIMO)
+            ordem: Chave de utils.paginacao.ORDENACOES
+        
+        Returns:
+            dict: {'itens', 'proximo_cursor', 'cursor_anterior', 'limite', 'ordem'}
+        """
+        ordem = normalizar_ordem(ordem)
+        limite = normalizar_limite(limite)
+        posicao = decodificar_cursor(cursor, ordem)
+        
+        filtro_sql, params = ContaReceberModel._filtros_sql(filtros or {})
+        keyset_sql, keyset_params, order_by = montar_keyset('cr', ordem, posicao)
+        
+        db = DatabaseManager()
+        with db.get_connection() as conn:
+            cursor_db = conn.cursor(dictionary=True)
             
-            return contas
+            # Uma linha a mais indica se existe página seguinte
+            query = _SELECT_LISTAGEM + filtro_sql + keyset_sql + order_by + " LIMIT %s"
+            cursor_db.execute(query, params + keyset_params + [limite + 1])
+            linhas = cursor_db.fetchall()
+        
+        return paginar(linhas, limite, ordem, posicao)
     
     @staticmethod
-    def _atualizar_status_vencidas(cursor, conn):
-        """Atualiza automaticamente o status de contas vencidas"""
-        query = """
-            UPDATE contas_receber 
-            SET status = 'vencido'
-            WHERE status = 'pendente' 
-            AND data_vencimento < CURDATE()
+    def atualizar_status_vencidas() -> int:
         """
-        cursor.execute(query)
-        conn.commit()
+        Marca como vencidas as contas pendentes com vencimento anterior a hoje
+        
+        Executada pelo agendador (services/agendador.py) na inicialização e uma vez
+        por dia, e não mais a cada listagem.
+        
+        Returns:
+            int: Quantidade de contas atualizadas
+        """
+        db = DatabaseManager()
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE contas_receber 
+                SET status = 'vencido'
+                WHERE status = 'pendente' 
+                AND data_vencimento < CURDATE()
+            """)
+            atualizadas = cursor.rowcount
+            conn.commit()
+            if atualizadas:
+                invalidar_tabelas('contas_receber', conn=conn)
+            return atualizadas
     
     @staticmethod
     def get_by_id(conta_id: int) -> Optional[Dict]:
@@ -274,19 +337,200 @@ class ContaReceberModel:
                 WHERE id = %s
             """
             
-            cursor.execute(query, (
-                dados_recebimento['conta_bancaria_id'],
-                dados_recebimento['data_recebimento'],
-                dados_recebimento['valor_pago'],
-                dados_recebimento.get('valor_juros', 0),
-                dados_recebimento.get('valor_multa', 0),
-                dados_recebimento.get('valor_desconto', 0),
-                conta_id
-            ))
+            with FatoFinanceiroModel.atualizando(conn, 'conta_receber', [conta_id]), \
+                    Conciliacao.recalculando(conn, 'contas_receber', [conta_id]):
+                cursor.execute(query, (
+                    dados_recebimento['conta_bancaria_id'],
+                    dados_recebimento['data_recebimento'],
+                    dados_recebimento['valor_pago'],
+                    dados_recebimento.get('valor_juros', 0),
+                    dados_recebimento.get('valor_multa', 0),
+                    dados_recebimento.get('valor_desconto', 0),
+                    conta_id
+                ))
             
             conn.commit()
+            invalidar_tabelas('contas_receber', conn=conn)
             return cursor.rowcount > 0
     
+    @staticmethod
+    def _preparar_item_lote(item: Dict, conta: Optional[Dict], conta_bancaria_padrao) -> Dict:
+        """
+        Valida um item do recebimento em lote e calcula os valores a gravar
+        
+        Raises:
+            ValueError: Com o motivo pelo qual o item não pode ser recebido
+        """
+        if not conta:
+            raise ValueError('Conta não encontrada')
+        if conta['status'] not in ('pendente', 'vencido'):
+            raise ValueError(f"Conta está {conta['status']}")
+        
+        conta_bancaria_id = item.get('conta_bancaria_id') or conta_bancaria_padrao
+        if not conta_bancaria_id:
+            raise ValueError('Conta bancária é obrigatória para registrar recebimento')
+        
+        data_recebimento = item.get('data_recebimento') or date.today()
+        if isinstance(data_recebimento, str):
+            try:
+                data_recebimento = datetime.strptime(data_recebimento, '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError('Data de recebimento inválida (use AAAA-MM-DD)')
+        
+        try:
+            valor_juros = Decimal(str(item.get('valor_juros') or 0))
+            valor_multa = Decimal(str(item.get('valor_multa') or 0))
+            valor_desconto = Decimal(str(item.get('valor_desconto') or 0))
+            if item.get('valor_pago') not in (None, ''):
+                valor_pago = Decimal(str(item['valor_pago']))
+            else:
+                valor_pago = Decimal(str(conta['valor_total'])) + valor_juros + valor_multa - valor_desconto
+        except InvalidOperation:
+            raise ValueError('Valor inválido')
+        
+        if min(valor_juros, valor_multa, valor_desconto) < 0:
+            raise ValueError('Juros, multa e desconto não podem ser negativos')
+        if valor_pago <= 0:
+            raise ValueError('Valor recebido deve ser maior que zero')
+        
+        return {
+            'id': conta['id'],
+            'conta_bancaria_id': int(conta_bancaria_id),
+            'data_recebimento': data_recebimento,
+            'valor_pago': valor_pago,
+            'valor_juros': valor_juros,
+            'valor_multa': valor_multa,
+            'valor_desconto': valor_desconto
+        }
+    
+    @staticmethod
+    def receber_lote(itens: List[Dict], conta_bancaria_id: Optional[int] = None) -> Dict:
+        """
+        Registra o recebimento de várias contas em uma única transação
+        
+        Cada item tem a própria data, juros, multa e desconto. Itens inválidos são
+        ignorados e aparecem no relatório com o motivo; os demais são gravados.
+        O crédito bancário e a auditoria ficam com o chamador, que deve envolver
+        tudo em db.unit_of_work() e usar os totais de 'creditos'.
+        
+        Args:
+            itens: Lista de dicts com id e, opcionalmente, data_recebimento,
+                   valor_juros, valor_multa, valor_desconto, valor_pago e
+                   conta_bancaria_id
+            conta_bancaria_id: Conta bancária dos itens que não informarem uma
+        
+        Returns:
+            dict: success, message, quantidade, total_recebido,
+                  por_conta_bancaria ({conta_bancaria_id: Decimal}), creditos
+                  ({(conta_bancaria_id, data): (Decimal, quantidade)}), recebidos
+                  (valores gravados) e itens (relatório por item, na ordem recebida)
+        """
+        ids = []
+        for item in itens:
+            try:
+                ids.append(int(item['id']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        
+        db = DatabaseManager()
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            
+            contas = {}
+            if ids:
+                cursor.execute(f"""
+                    SELECT id, status, valor_total
+                    FROM contas_receber
+                    WHERE id IN ({', '.join(['%s'] * len(ids))})
+                    FOR UPDATE
+                """, tuple(ids))
+                contas = {conta['id']: conta for conta in cursor.fetchall()}
+            
+            # Contas bancárias citadas no lote (um único SELECT para validar todas)
+            bancarias_citadas = {
+                int(b) for b in [conta_bancaria_id] + [item.get('conta_bancaria_id') for item in itens]
+                if b and str(b).isdigit()
+            }
+            bancarias_ativas = set()
+            if bancarias_citadas:
+                cursor.execute(f"""
+                    SELECT id FROM contas_bancarias
+                    WHERE ativo = 1 AND id IN ({', '.join(['%s'] * len(bancarias_citadas))})
+                """, tuple(bancarias_citadas))
+                bancarias_ativas = {row['id'] for row in cursor.fetchall()}
+            
+            relatorio = []
+            recebidos = []
+            vistos = set()
+            for item in itens:
+                item_id = item.get('id') if isinstance(item, dict) else None
+                try:
+                    if not str(item_id).isdigit():
+                        raise ValueError('ID da conta inválido')
+                    item_id = int(item_id)
+                    if item_id in vistos:
+                        raise ValueError('Conta repetida no lote')
+                    vistos.add(item_id)
+                    
+                    recebido = ContaReceberModel._preparar_item_lote(item, contas.get(item_id), conta_bancaria_id)
+                    if recebido['conta_bancaria_id'] not in bancarias_ativas:
+                        raise ValueError(f"Conta bancária {recebido['conta_bancaria_id']} não encontrada ou inativa")
+                    
+                    recebidos.append(recebido)
+                    relatorio.append({'id': item_id, 'success': True, 'valor_pago': recebido['valor_pago']})
+                except (ValueError, TypeError) as e:
+                    relatorio.append({'id': item_id, 'success': False, 'message': str(e)})
+            
+            if recebidos:
+                recebidos_ids = [recebido['id'] for recebido in recebidos]
+                with FatoFinanceiroModel.atualizando(conn, 'conta_receber', recebidos_ids), \
+                        Conciliacao.recalculando(conn, 'contas_receber', recebidos_ids):
+                    cursor.executemany("""
+                        UPDATE contas_receber
+                        SET conta_bancaria_id = %s,
+                            data_recebimento = %s,
+                            valor_pago = %s,
+                            valor_juros = %s,
+                            valor_multa = %s,
+                            valor_desconto = %s,
+                            status = 'recebido'
+                        WHERE id = %s
+                    """, [
+                        (r['conta_bancaria_id'], r['data_recebimento'], r['valor_pago'],
+                         r['valor_juros'], r['valor_multa'], r['valor_desconto'], r['id'])
+                        for r in recebidos
+                    ])
+                conn.commit()
+                invalidar_tabelas('contas_receber', conn=conn)
+            elif not conn.in_unit_of_work:
+                # Libera as linhas travadas. Dentro de um unit_of_work quem encerra a
+                # transação é a unidade: um rollback aqui a marcaria para desfazer e o
+                # relatório por item viraria um erro no fim do bloco
+                conn.rollback()
+        
+        # Totais por conta bancária e, para o razão de movimentos, por conta e data
+        por_conta_bancaria = {}
+        creditos = {}
+        for recebido in recebidos:
+            conta_bancaria = recebido['conta_bancaria_id']
+            por_conta_bancaria[conta_bancaria] = por_conta_bancaria.get(conta_bancaria, Decimal('0')) + recebido['valor_pago']
+            
+            chave = (conta_bancaria, recebido['data_recebimento'])
+            total, quantidade = creditos.get(chave, (Decimal('0'), 0))
+            creditos[chave] = (total + recebido['valor_pago'], quantidade + 1)
+        
+        ignorados = len(relatorio) - len(recebidos)
+        return {
+            'success': bool(recebidos),
+            'message': f'{len(recebidos)} recebimento(s) registrado(s), {ignorados} ignorado(s)',
+            'quantidade': len(recebidos),
+            'total_recebido': sum(por_conta_bancaria.values(), Decimal('0')),
+            'por_conta_bancaria': por_conta_bancaria,
+            'creditos': creditos,
+            'recebidos': recebidos,
+            'itens': relatorio
+        }
+    
     @staticmethod
     def cancelar(conta_id: int) -> bool:
         """Cancela uma conta a receber"""
@@ -294,8 +538,11 @@ class ContaReceberModel:
         with db.get_connection() as conn:
             cursor = conn.cursor()
             query = "UPDATE contas_receber SET status = 'cancelado' WHERE id = %s"
-            cursor.execute(query, (conta_id,))
+            with FatoFinanceiroModel.atualizando(conn, 'conta_receber', [conta_id]):
+                cursor.execute(query, (conta_id,))
+            Conciliacao.invalidar_sugestoes_sistema(conn, 'contas_receber', [conta_id])
             conn.commit()
+            invalidar_tabelas('contas_receber', conn=conn)
             return cursor.rowcount > 0
     
     @staticmethod
@@ -347,26 +594,30 @@ class ContaReceberModel:
                 WHERE id = %s
             """
             
-            cursor.execute(query, (
-                dados['cliente_id'],
-                dados.get('tipo_servico_id'),
-                dados.get('centro_custo_id'),
-                dados.get('conta_contabil_id'),
-                dados.get('filial_id'),
-                dados['descricao'],
-                dados.get('numero_documento'),
-                dados.get('observacoes'),
-                dados['valor_total'],
-                dados['data_emissao'],
-                dados.get('prazo_dias', 30),
-                dados['data_vencimento'],
-                dados.get('referencia'),
-                dados.get('percentual_juros', 0),
-                dados.get('percentual_multa', 0),
-                conta_id
-            ))
+            with FatoFinanceiroModel.atualizando(conn, 'conta_receber', [conta_id]), \
+                    Conciliacao.recalculando(conn, 'contas_receber', [conta_id]):
+                cursor.execute(query, (
+                    dados['cliente_id'],
+                    dados.get('tipo_servico_id'),
+                    dados.get('centro_custo_id'),
+                    dados.get('conta_contabil_id'),
+                    dados.get('filial_id'),
+                    dados['descricao'],
+                    dados.get('numero_documento'),
+                    dados.get('observacoes'),
+                    dados['valor_total'],
+                    dados['data_emissao'],
+                    dados.get('prazo_dias', 30),
+                    dados['data_vencimento'],
+                    dados.get('referencia'),
+                    dados.get('percentual_juros', 0),
+                    dados.get('percentual_multa', 0),
+                    conta_id
+                ))
             
+            Conciliacao.invalidar_sugestoes_sistema(conn, 'contas_receber', [conta_id])
             conn.commit()
+            invalidar_tabelas('contas_receber', conn=conn)
             return {'success': True, 'message': 'Conta atualizada com sucesso'}
     
     @staticmethod
@@ -397,38 +648,40 @@ class ContaReceberModel:
             
             # Soft delete - marca como cancelada
             query = "UPDATE contas_receber SET status = 'cancelado', updated_at = NOW() WHERE id = %s"
-            cursor.execute(query, (conta_id,))
+            with FatoFinanceiroModel.atualizando(conn, 'conta_receber', [conta_id]):
+                cursor.execute(query, (conta_id,))
+            Conciliacao.invalidar_sugestoes_sistema(conn, 'contas_receber', [conta_id])
             conn.commit()
+            invalidar_tabelas('contas_receber', conn=conn)
             
             return {'success': True, 'message': 'Conta excluída com sucesso'}
     
     @staticmethod
-    def get_totalizadores() -> Dict:
-        """Retorna valores totalizados por status"""
+    def get_totalizadores(filtros: Dict = None) -> Dict:
+        """
+        Retorna valores totalizados por status para os filtros da listagem
+        
+        Uma única agregação sobre todas as linhas filtradas, independente da página
+        exibida (ver get_pagina).
+        """
+        filtro_sql, params = ContaReceberModel._filtros_sql(filtros or {})
+        
         db = DatabaseManager()
         with db.get_connection() as conn:
             cursor = conn.cursor(dictionary=True)
             
-            # Atualizar vencidas primeiro
-            cursor.execute("""
-                UPDATE contas_receber 
-                SET status = 'vencido'
-                WHERE status = 'pendente' AND data_vencimento < CURDATE()
-            """)
-            conn.commit()
-            
-            # Buscar totalizadores
-            query = """
+            query = f"""
                 SELECT 
-                    COALESCE(SUM(CASE WHEN status = 'pendente' THEN valor_total ELSE 0 END), 0) as total_pendente,
-                    COALESCE(SUM(CASE WHEN status = 'vencido' THEN valor_total ELSE 0 END), 0) as total_vencido,
-                    COALESCE(SUM(CASE WHEN status = 'recebido' THEN valor_pago ELSE 0 END), 0) as total_recebido,
-                    COALESCE(SUM(valor_total), 0) as total_geral
-                FROM contas_receber
-                WHERE status != 'cancelado'
+                    COALESCE(SUM(CASE WHEN cr.status = 'pendente' THEN cr.valor_total ELSE 0 END), 0) as total_pendente,
+                    COALESCE(SUM(CASE WHEN cr.status = 'vencido' THEN cr.valor_total ELSE 0 END), 0) as total_vencido,
+                    COALESCE(SUM(CASE WHEN cr.status = 'recebido' THEN cr.valor_pago ELSE 0 END), 0) as total_recebido,
+                    COALESCE(SUM(CASE WHEN cr.status != 'cancelado' THEN cr.valor_total ELSE 0 END), 0) as total_geral,
+                    COUNT(*) as quantidade
+                FROM contas_receber cr
+                WHERE 1=1{filtro_sql}
             """
             
-            cursor.execute(query)
+            cursor.execute(query, params)
             return cursor.fetchone()
 
     @staticmethod
@@ -499,8 +752,11 @@ class ContaReceberModel:
                     WHERE id = %s
                 """
                 
-                cursor.execute(query, (motivo, conta_id))
+                with FatoFinanceiroModel.atualizando(conn, 'conta_receber', [conta_id]):
+                    cursor.execute(query, (motivo, conta_id))
+                Conciliacao.invalidar_sugestoes_sistema(conn, 'contas_receber', [conta_id])
                 conn.commit()
+                invalidar_tabelas('contas_receber', conn=conn)
                 
                 return {'success': True, 'message': 'Recebimento estornado com sucesso'}
                 
@@ -4,60 +4,85 @@ Calcula KPIs, indicadores e métricas estratégicas
 """
 
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from database import DatabaseManager
+from models.fato_financeiro import FatoFinanceiroModel
 
 class DashboardModel:
     """Modelo para dashboard financeiro com KPIs e indicadores"""
     
+    # Valor da conta considerando encargos e desconto
+    VALOR_CONTA = "(valor_total - valor_desconto + valor_juros + valor_multa)"
+    
     @staticmethod
-    def get_kpis_gerais():
+    def _agregar_contas(cursor, tabela, status_realizado, mes_inicio, mes_fim, hoje, limite_7_dias):
         """
-        Retorna KPIs gerais do sistema
+        Uma única varredura da tabela de contas com somas condicionais
+        
+        Produz os números do mês (vencimento no mês), dos próximos 7 dias e dos
+        vencidos/em aberto. Em aberto = pendente ou vencido; vencido = em aberto
+        com vencimento anterior a hoje.
+        """
+        v = DashboardModel.VALOR_CONTA
+        aberto = "status IN ('pendente', 'vencido')"
+        no_mes = "data_vencimento BETWEEN %(mes_inicio)s AND %(mes_fim)s"
+        
+        cursor.execute(f"""
+            SELECT
+                COALESCE(SUM({no_mes}), 0) as mes_quantidade,
+                COALESCE(SUM(CASE WHEN {no_mes} THEN {v} ELSE 0 END), 0) as mes_total,
+                COALESCE(SUM(CASE WHEN {no_mes} AND status = %(realizado)s THEN {v} ELSE 0 END), 0) as mes_realizado,
+                COALESCE(SUM(CASE WHEN {no_mes} AND {aberto} AND data_vencimento >= %(hoje)s THEN {v} ELSE 0 END), 0) as mes_pendente,
+                COALESCE(SUM(CASE WHEN {no_mes} AND {aberto} AND data_vencimento < %(hoje)s THEN {v} ELSE 0 END), 0) as mes_vencido,
+                COALESCE(SUM({aberto} AND data_vencimento BETWEEN %(hoje)s AND %(limite_7_dias)s), 0) as proximos_7_dias_quantidade,
+                COALESCE(SUM(CASE WHEN {aberto} AND data_vencimento BETWEEN %(hoje)s AND %(limite_7_dias)s THEN {v} ELSE 0 END), 0) as proximos_7_dias_valor,
+                COALESCE(SUM({aberto} AND data_vencimento < %(hoje)s), 0) as vencidas_quantidade,
+                COALESCE(SUM(CASE WHEN {aberto} AND data_vencimento < %(hoje)s THEN {v} ELSE 0 END), 0) as vencidas_valor,
+                COALESCE(SUM({aberto}), 0) as aberto_quantidade,
+                COALESCE(SUM(CASE WHEN {aberto} THEN {v} ELSE 0 END), 0) as aberto_valor
+            FROM {tabela}
+            WHERE {no_mes} OR {aberto}
+        """, {
+            'mes_inicio': mes_inicio,
+            'mes_fim': mes_fim,
+            'realizado': status_realizado,
+            'hoje': hoje,
+            'limite_7_dias': limite_7_dias
+        })
+        row = cursor.fetchone()
+        
+        return {
+            chave: (int(valor) if chave.endswith('_quantidade') else Decimal(str(valor)))
+            for chave, valor in row.items()
+        }
+    
+    @staticmethod
+    def get_agregados():
+        """
+        Agregação consolidada usada por get_kpis_gerais e get_inadimplencia
+        
+        Cada tabela grande é lida uma única vez; a rota do dashboard calcula este
+        resultado uma vez por requisição e o repassa aos dois métodos.
         
         Returns:
-            dict: Métricas gerais (receitas, despesas, saldo, etc)
+            dict: Agregados de contas a receber, contas a pagar, lançamentos e bancos
         """
+        hoje = datetime.now().date()
+        mes_inicio = hoje.replace(day=1)
+        mes_fim = DashboardModel._primeiro_dia_mes(hoje, 1) - timedelta(days=1)
+        limite_7_dias = hoje + timedelta(days=7)
+        
         db = DatabaseManager()
         
         with db.get_connection() as conn:
             cursor = conn.cursor(dictionary=True)
             
-            hoje = datetime.now().date()
-            mes_atual_inicio = hoje.replace(day=1)
-            
-            # Último dia do mês
-            if hoje.month == 12:
-                mes_atual_fim = hoje.replace(day=31)
-            else:
-                proximo_mes = hoje.replace(month=hoje.month + 1, day=1)
-                mes_atual_fim = proximo_mes - timedelta(days=1)
-            
-            # Contas a Receber - Mês Atual (vencimento no mês)
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_contas,
-                    COALESCE(SUM(valor_total - valor_desconto + valor_juros + valor_multa), 0) as valor_total,
-                    COALESCE(SUM(CASE WHEN status = 'recebida' THEN (valor_total - valor_desconto + valor_juros + valor_multa) ELSE 0 END), 0) as recebido,
-                    COALESCE(SUM(CASE WHEN status = 'pendente' THEN (valor_total - valor_desconto + valor_juros + valor_multa) ELSE 0 END), 0) as pendente,
-                    COALESCE(SUM(CASE WHEN status = 'vencida' THEN (valor_total - valor_desconto + valor_juros + valor_multa) ELSE 0 END), 0) as vencido
-                FROM contas_receber
-                WHERE data_vencimento >= %s AND data_vencimento <= %s
-            """, (mes_atual_inicio, mes_atual_fim))
-            contas_receber_mes = cursor.fetchone()
-            
-            # Contas a Pagar - Mês Atual (vencimento no mês)
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_contas,
-                    COALESCE(SUM(valor_total - valor_desconto + valor_juros + valor_multa), 0) as valor_total,
-                    COALESCE(SUM(CASE WHEN status = 'paga' THEN (valor_total - valor_desconto + valor_juros + valor_multa) ELSE 0 END), 0) as pago,
-                    COALESCE(SUM(CASE WHEN status = 'pendente' THEN (valor_total - valor_desconto + valor_juros + valor_multa) ELSE 0 END), 0) as pendente,
-                    COALESCE(SUM(CASE WHEN status = 'vencida' THEN (valor_total - valor_desconto + valor_juros + valor_multa) ELSE 0 END), 0) as vencido
-                FROM contas_pagar
-                WHERE data_vencimento >= %s AND data_vencimento <= %s
-            """, (mes_atual_inicio, mes_atual_fim))
-            contas_pagar_mes = cursor.fetchone()
+            contas_receber = DashboardModel._agregar_contas(
+                cursor, 'contas_receber', 'recebido', mes_inicio, mes_fim, hoje, limite_7_dias
+            )
+            contas_pagar = DashboardModel._agregar_contas(
+                cursor, 'contas_pagar', 'pago', mes_inicio, mes_fim, hoje, limite_7_dias
+            )
             
             # Lançamentos Manuais - Mês Atual
             cursor.execute("""
@@ -67,7 +92,7 @@ class DashboardModel:
                 FROM lancamentos_manuais
                 WHERE data_lancamento >= %s AND data_lancamento <= %s
                   AND status = 'ativo'
-            """, (mes_atual_inicio, mes_atual_fim))
+            """, (mes_inicio, mes_fim))
             lancamentos = cursor.fetchone()
             
             # Saldo em Contas Bancárias
@@ -77,198 +102,142 @@ class DashboardModel:
                 WHERE ativo = 1
             """)
             saldo_bancos = cursor.fetchone()
-            
-            # Contas a Receber Vencendo Próximos 7 dias
-            proximos_7_dias = hoje + timedelta(days=7)
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as quantidade,
-                    COALESCE(SUM(valor_total - valor_desconto + valor_juros + valor_multa), 0) as valor
-                FROM contas_receber
-                WHERE status IN ('pendente', 'vencida')
-                  AND data_vencimento BETWEEN %s AND %s
-            """, (hoje, proximos_7_dias))
-            receber_7dias = cursor.fetchone()
-            
-            # Contas a Pagar Vencendo Próximos 7 dias
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as quantidade,
-                    COALESCE(SUM(valor_total - valor_desconto + valor_juros + valor_multa), 0) as valor
-                FROM contas_pagar
-                WHERE status IN ('pendente', 'vencida')
-                  AND data_vencimento BETWEEN %s AND %s
-            """, (hoje, proximos_7_dias))
-            pagar_7dias = cursor.fetchone()
-            
-            # Calcular totais (considerando apenas valores realizados)
-            total_receitas = Decimal(str(contas_receber_mes['recebido'])) + Decimal(str(lancamentos['receitas']))
-            total_despesas = Decimal(str(contas_pagar_mes['pago'])) + Decimal(str(lancamentos['despesas']))
-            
-            return {
-                'contas_receber': {
-                    'total': Decimal(str(contas_receber_mes['valor_total'])),
-                    'recebido': Decimal(str(contas_receber_mes['recebido'])),
-                    'pendente': Decimal(str(contas_receber_mes['pendente'])),
-                    'vencido': Decimal(str(contas_receber_mes['vencido'])),
-                    'quantidade': contas_receber_mes['total_contas'],
-                    'vencendo_7dias': {
-                        'quantidade': receber_7dias['quantidade'],
-                        'valor': Decimal(str(receber_7dias['valor']))
-                    }
-                },
-                'contas_pagar': {
-                    'total': Decimal(str(contas_pagar_mes['valor_total'])),
-                    'pago': Decimal(str(contas_pagar_mes['pago'])),
-                    'pendente': Decimal(str(contas_pagar_mes['pendente'])),
-                    'vencido': Decimal(str(contas_pagar_mes['vencido'])),
-                    'quantidade': contas_pagar_mes['total_contas'],
-                    'vencendo_7dias': {
-                        'quantidade': pagar_7dias['quantidade'],
-                        'valor': Decimal(str(pagar_7dias['valor']))
-                    }
-                },
-                'lancamentos': {
-                    'receitas': Decimal(str(lancamentos['receitas'])),
-                    'despesas': Decimal(str(lancamentos['despesas']))
-                },
-                'resumo': {
-                    'total_receitas': total_receitas,
-                    'total_despesas': total_despesas,
-                    'saldo_periodo': total_receitas - total_despesas,
-                    'saldo_bancos': Decimal(str(saldo_bancos['saldo_total']))
+        
+        return {
+            'contas_receber': contas_receber,
+            'contas_pagar': contas_pagar,
+            'lancamentos': {
+                'receitas': Decimal(str(lancamentos['receitas'])),
+                'despesas': Decimal(str(lancamentos['despesas']))
+            },
+            'saldo_bancos': Decimal(str(saldo_bancos['saldo_total']))
+        }
+    
+    @staticmethod
+    def get_kpis_gerais(agregados=None):
+        """
+        Retorna KPIs gerais do sistema
+        
+        Args:
+            agregados (dict, opcional): Resultado de get_agregados() já calculado na requisição
+        
+        Returns:
+            dict: Métricas gerais (receitas, despesas, saldo, etc)
+        """
+        agregados = agregados or DashboardModel.get_agregados()
+        receber = agregados['contas_receber']
+        pagar = agregados['contas_pagar']
+        lancamentos = agregados['lancamentos']
+        
+        # Calcular totais (considerando apenas valores realizados)
+        total_receitas = receber['mes_realizado'] + lancamentos['receitas']
+        total_despesas = pagar['mes_realizado'] + lancamentos['despesas']
+        
+        return {
+            'contas_receber': {
+                'total': receber['mes_total'],
+                'recebido': receber['mes_realizado'],
+                'pendente': receber['mes_pendente'],
+                'vencido': receber['mes_vencido'],
+                'quantidade': receber['mes_quantidade'],
+                'vencendo_7dias': {
+                    'quantidade': receber['proximos_7_dias_quantidade'],
+                    'valor': receber['proximos_7_dias_valor']
+                }
+            },
+            'contas_pagar': {
+                'total': pagar['mes_total'],
+                'pago': pagar['mes_realizado'],
+                'pendente': pagar['mes_pendente'],
+                'vencido': pagar['mes_vencido'],
+                'quantidade': pagar['mes_quantidade'],
+                'vencendo_7dias': {
+                    'quantidade': pagar['proximos_7_dias_quantidade'],
+                    'valor': pagar['proximos_7_dias_valor']
                 }
+            },
+            'lancamentos': {
+                'receitas': lancamentos['receitas'],
+                'despesas': lancamentos['despesas']
+            },
+            'resumo': {
+                'total_receitas': total_receitas,
+                'total_despesas': total_despesas,
+                'saldo_periodo': total_receitas - total_despesas,
+                'saldo_bancos': agregados['saldo_bancos']
             }
+        }
     
     @staticmethod
-    def get_inadimplencia():
+    def get_inadimplencia(agregados=None):
         """
         Calcula taxa de inadimplência
         
+        Args:
+            agregados (dict, opcional): Resultado de get_agregados() já calculado na requisição
+        
         Returns:
             dict: Dados de inadimplência
         """
-        db = DatabaseManager()
+        agregados = agregados or DashboardModel.get_agregados()
+        receber = agregados['contas_receber']
         
-        with db.get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            
-            hoje = datetime.now().date()
-            
-            # Contas a Receber Vencidas
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as quantidade,
-                    COALESCE(SUM(valor_total - valor_desconto + valor_juros + valor_multa), 0) as valor_total
-                FROM contas_receber
-                WHERE status = 'vencida' AND data_vencimento < %s
-            """, (hoje,))
-            vencidas = cursor.fetchone()
-            
-            # Total de Contas a Receber
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as quantidade,
-                    COALESCE(SUM(valor_total - valor_desconto + valor_juros + valor_multa), 0) as valor_total
-                FROM contas_receber
-                WHERE status IN ('pendente', 'vencida')
-            """)
-            total = cursor.fetchone()
-            
-            valor_vencido = Decimal(str(vencidas['valor_total']))
-            valor_total = Decimal(str(total['valor_total']))
-            
-            taxa_inadimplencia = (valor_vencido / valor_total * 100) if valor_total > 0 else Decimal('0')
-            
-            return {
-                'quantidade_vencidas': vencidas['quantidade'],
-                'valor_vencido': valor_vencido,
-                'valor_total': valor_total,
-                'taxa_inadimplencia': taxa_inadimplencia
-            }
+        valor_vencido = receber['vencidas_valor']
+        valor_total = receber['aberto_valor']
+        
+        taxa_inadimplencia = (valor_vencido / valor_total * 100) if valor_total > 0 else Decimal('0')
+        
+        return {
+            'quantidade_vencidas': receber['vencidas_quantidade'],
+            'valor_vencido': valor_vencido,
+            'valor_total': valor_total,
+            'taxa_inadimplencia': taxa_inadimplencia
+        }
+    
+    @staticmethod
+    def _primeiro_dia_mes(ref, deslocamento=0):
+        """Primeiro dia do mês de ref deslocado em N meses (negativo volta no tempo)"""
+        indice = ref.year * 12 + (ref.month - 1) + deslocamento
+        return date(indice // 12, indice % 12 + 1, 1)
     
     @staticmethod
-    def get_evolucao_mensal(meses=6):
+    def get_evolucao_mensal(meses=6, filial_id=None, mes_final=None):
         """
         Retorna evolução de receitas e despesas nos últimos meses
         
+        Lê o realizado da tabela fato_financeiro_diario agrupado por ano/mês;
+        meses sem movimento entram zerados.
+        
         Args:
-            meses (int): Quantidade de meses a retornar
+            meses (int): Quantidade de meses a retornar (ex: 12, 36, 60)
+            filial_id (int, opcional): Restringe à filial
+            mes_final (date, opcional): Último mês da janela (padrão: mês atual)
         
         Returns:
             list: Dados mensais de receitas e despesas
         """
-        db = DatabaseManager()
+        meses = max(int(meses or 1), 1)
+        ultimo_mes = DashboardModel._primeiro_dia_mes(mes_final or datetime.now().date())
+        inicio = DashboardModel._primeiro_dia_mes(ultimo_mes, -(meses - 1))
+        fim = DashboardModel._primeiro_dia_mes(ultimo_mes, 1)  # exclusivo
         
-        with db.get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            
-            evolucao = []
-            hoje = datetime.now().date()
-            
-            for i in range(meses - 1, -1, -1):
-                # Calcular primeiro e último dia do mês
-                mes_ref = hoje - timedelta(days=30 * i)
-                primeiro_dia = mes_ref.replace(day=1)
-                
-                # Último dia do mês
-                if mes_ref.month == 12:
-                    ultimo_dia = mes_ref.replace(day=31)
-                else:
-                    proximo_mes = mes_ref.replace(month=mes_ref.month + 1, day=1)
-                    ultimo_dia = proximo_mes - timedelta(days=1)
-                
-                # Receitas do mês
-                cursor.execute("""
-                    SELECT COALESCE(SUM(valor_total - valor_desconto + valor_juros + valor_multa), 0) as total
-                    FROM contas_receber
-                    WHERE status = 'recebida' 
-                      AND data_recebimento >= %s 
-                      AND data_recebimento <= %s
-                """, (primeiro_dia, ultimo_dia))
-                receitas_receber = cursor.fetchone()['total']
-                
-                cursor.execute("""
-                    SELECT COALESCE(SUM(valor), 0) as total
-                    FROM lancamentos_manuais
-                    WHERE tipo = 'receita'
-                      AND status = 'ativo'
-                      AND data_lancamento >= %s 
-                      AND data_lancamento <= %s
-                """, (primeiro_dia, ultimo_dia))
-                receitas_lancamentos = cursor.fetchone()['total']
-                
-                # Despesas do mês
-                cursor.execute("""
-                    SELECT COALESCE(SUM(valor_total - valor_desconto + valor_juros + valor_multa), 0) as total
-                    FROM contas_pagar
-                    WHERE status = 'paga' 
-                      AND data_pagamento >= %s 
-                      AND data_pagamento <= %s
-                """, (primeiro_dia, ultimo_dia))
-                despesas_pagar = cursor.fetchone()['total']
-                
-                cursor.execute("""
-                    SELECT COALESCE(SUM(valor), 0) as total
-                    FROM lancamentos_manuais
-                    WHERE tipo = 'despesa'
-                      AND status = 'ativo'
-                      AND data_lancamento >= %s 
-                      AND data_lancamento <= %s
-                """, (primeiro_dia, ultimo_dia))
-                despesas_lancamentos = cursor.fetchone()['total']
-                
-                total_receitas = Decimal(str(receitas_receber)) + Decimal(str(receitas_lancamentos))
-                total_despesas = Decimal(str(despesas_pagar)) + Decimal(str(despesas_lancamentos))
-                
-                evolucao.append({
-                    'mes': primeiro_dia.strftime('%b/%y'),
-                    'receitas': total_receitas,
-                    'despesas': total_despesas,
-                    'saldo': total_receitas - total_despesas
-                })
-            
-            return evolucao
+        por_mes = FatoFinanceiroModel.get_por_mes(inicio, fim, 'realizado', filial_id)
+        
+        evolucao = []
+        for i in range(meses):
+            primeiro_dia = DashboardModel._primeiro_dia_mes(inicio, i)
+            mes = por_mes.get((primeiro_dia.year, primeiro_dia.month))
+            total_receitas = mes['entradas'] if mes else Decimal('0')
+            total_despesas = mes['saidas'] if mes else Decimal('0')
+            
+            evolucao.append({
+                'mes': primeiro_dia.strftime('%b/%y'),
+                'receitas': total_receitas,
+                'despesas': total_despesas,
+                'saldo': total_receitas - total_despesas
+            })
+        
+        return evolucao
     
     @staticmethod
     def get_top_clientes(limite=5):
@@ -295,7 +264,7 @@ class DashboardModel:
                     COALESCE(SUM(cr.valor_total - cr.valor_desconto + cr.valor_juros + cr.valor_multa), 0) as valor_total
                 FROM clientes c
                 INNER JOIN contas_receber cr ON c.id = cr.cliente_id
-                WHERE cr.status = 'recebida'
+                WHERE cr.status = 'recebido'
                 GROUP BY c.id, c.nome, c.razao_social
                 ORDER BY valor_total DESC
                 LIMIT %s
@@ -332,7 +301,7 @@ class DashboardModel:
                     COALESCE(SUM(cp.valor_total - cp.valor_desconto + cp.valor_juros + cp.valor_multa), 0) as valor_total
                 FROM fornecedores f
                 INNER JOIN contas_pagar cp ON f.id = cp.fornecedor_id
-                WHERE cp.status = 'paga'
+                WHERE cp.status = 'pago'
                 GROUP BY f.id, f.nome
                 ORDER BY valor_total DESC
                 LIMIT %s
@@ -368,7 +337,7 @@ class DashboardModel:
                     COALESCE(SUM(cp.valor_total - cp.valor_desconto + cp.valor_juros + cp.valor_multa), 0) as valor
                 FROM centro_custos cc
                 LEFT JOIN contas_pagar cp ON cc.id = cp.centro_custo_id 
-                    AND cp.status = 'paga'
+                    AND cp.status = 'pago'
                     AND cp.data_pagamento >= %s
                     AND cp.data_pagamento <= %s
                 WHERE cc.is_active = 1
@@ -0,0 +1,391 @@
+"""
+Model para a tabela fato_financeiro_diario
+Resumo diário materializado de contas a receber, contas a pagar e lançamentos manuais,
+mantido de forma incremental pelas escritas dos models e usado por Dashboard,
+Relatórios e Fluxo de Caixa
+"""
+
+from contextlib import contextmanager
+from decimal import Decimal
+from database import DatabaseManager
+
+
+class FatoFinanceiroModel:
+    """Manutenção incremental e consultas da tabela fato_financeiro_diario"""
+    
+    # Como cada linha de origem vira uma linha do fato (data, direção, natureza, valores)
+    ORIGENS = {
+        'conta_receber': {
+            'tabela': 'contas_receber',
+            'data': "CASE WHEN status = 'recebido' THEN COALESCE(data_recebimento, data_vencimento) ELSE data_vencimento END",
+            'direcao': "'entrada'",
+            'natureza': "CASE WHEN status = 'recebido' THEN 'realizado' ELSE 'projetado' END",
+            'conta_bancaria': "COALESCE(conta_bancaria_id, 0)",
+            'bruto': "valor_total",
+            'desconto': "COALESCE(valor_desconto, 0)",
+            'encargos': "COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)",
+            'filtro': "status IN ('recebido', 'pendente', 'vencido')"
+        },
+        'conta_pagar': {
+            'tabela': 'contas_pagar',
+            'data': "CASE WHEN status = 'pago' THEN COALESCE(data_pagamento, data_vencimento) ELSE data_vencimento END",
+            'direcao': "'saida'",
+            'natureza': "CASE WHEN status = 'pago' THEN 'realizado' ELSE 'projetado' END",
+            'conta_bancaria': "COALESCE(conta_bancaria_id, 0)",
+            'bruto': "valor_total",
+            'desconto': "COALESCE(valor_desconto, 0)",
+            'encargos': "COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)",
+            'filtro': "status IN ('pago', 'pendente', 'vencido')"
+        },
+        'lancamento_manual': {
+            'tabela': 'lancamentos_manuais',
+            'data': "data_lancamento",
+            'direcao': "CASE WHEN tipo = 'receita' THEN 'entrada' ELSE 'saida' END",
+            'natureza': "'realizado'",
+            'conta_bancaria': "0",
+            'bruto': "valor",
+            'desconto': "0",
+            'encargos': "0",
+            'filtro': "status = 'ativo'"
+        }
+    }
+    
+    @staticmethod
+    def _aplicar(conn, origem, ids, sinal):
+        """
+        Soma (sinal=1) ou subtrai (sinal=-1) do fato o estado atual das linhas de origem
+        
+        Set-based: um único INSERT ... SELECT ... ON DUPLICATE KEY UPDATE, na mesma
+        transação da escrita que o chamou. ids=None aplica a tabela inteira (rebuild).
+        
+        Linhas realizadas em mês já fechado invalidam os checkpoints de saldo
+        (saldos_fluxo_mensais) daquele mês em diante; o DELETE vem antes da escrita no
+        fato para travar as tabelas na mesma ordem que SaldoFluxoModel.gerar_checkpoints.
+        """
+        o = FatoFinanceiroModel.ORIGENS[origem]
+        
+        where = o['filtro']
+        params_ids = []
+        if ids is not None:
+            ids = [int(i) for i in ids if i is not None]
+            if not ids:
+                return 0
+            where += f" AND id IN ({', '.join(['%s'] * len(ids))})"
+            params_ids = ids
+        
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            DELETE FROM saldos_fluxo_mensais
+            WHERE mes >= (
+                SELECT DATE_SUB(MIN(data), INTERVAL DAY(MIN(data)) - 1 DAY)
+                FROM (
+                    SELECT {o['data']} as data FROM {o['tabela']}
+                    WHERE {where} AND {o['natureza']} = 'realizado'
+                ) realizadas
+            )
+        """, params_ids)
+        
+        cursor.execute(f"""
+            INSERT INTO fato_financeiro_diario
+                (data, direcao, natureza, origem, filial_id, conta_bancaria_id,
+                 centro_custo_id, conta_contabil_id,
+                 valor_bruto, valor_desconto, valor_encargos, valor_liquido, quantidade)
+            SELECT
+                {o['data']},
+                {o['direcao']},
+                {o['natureza']},
+                '{origem}',
+                COALESCE(filial_id, 0),
+                {o['conta_bancaria']},
+                COALESCE(centro_custo_id, 0),
+                COALESCE(conta_contabil_id, 0),
+                %s * SUM({o['bruto']}),
+                %s * SUM({o['desconto']}),
+                %s * SUM({o['encargos']}),
+                %s * SUM({o['bruto']} - {o['desconto']} + {o['encargos']}),
+                %s * COUNT(*)
+            FROM {o['tabela']}
+            WHERE {where}
+            GROUP BY 1, 2, 3, 4, 5, 6, 7, 8
+            ON DUPLICATE KEY UPDATE
+                valor_bruto = valor_bruto + VALUES(valor_bruto),
+                valor_desconto = valor_desconto + VALUES(valor_desconto),
+                valor_encargos = valor_encargos + VALUES(valor_encargos),
+                valor_liquido = valor_liquido + VALUES(valor_liquido),
+                quantidade = quantidade + VALUES(quantidade)
+        """, [sinal] * 5 + params_ids)
+        linhas = cursor.rowcount
+        cursor.close()
+        return linhas
+    
+    @staticmethod
+    def adicionar(conn, origem, ids):
+        """Soma ao fato as linhas de origem informadas (após insert/update)"""
+        return FatoFinanceiroModel._aplicar(conn, origem, ids, 1)
+    
+    @staticmethod
+    def remover(conn, origem, ids):
+        """Subtrai do fato as linhas de origem informadas (antes de update/cancelamento)"""
+        return FatoFinanceiroModel._aplicar(conn, origem, ids, -1)
+    
+    @staticmethod
+    @contextmanager
+    def atualizando(conn, origem, ids):
+        """
+        Envolve uma escrita nas linhas de origem: subtrai o estado anterior e soma o novo
+        
+        Deve ser usado antes do commit, para fato e origem mudarem na mesma transação.
+        
+        Usage:
+            with FatoFinanceiroModel.atualizando(conn, 'conta_pagar', [conta_id]):
+                cursor.execute("UPDATE contas_pagar SET status = 'pago' ... WHERE id = %s", (conta_id,))
+            conn.commit()
+        """
+        FatoFinanceiroModel.remover(conn, origem, ids)
+        yield
+        FatoFinanceiroModel.adicionar(conn, origem, ids)
+    
+    @staticmethod
+    def reconstruir():
+        """
+        Recalcula o fato inteiro a partir das tabelas de origem (reparo)
+        
+        Os checkpoints de saldo também são apagados; regerar com SaldoFluxoModel.gerar_checkpoints.
+        
+        Returns:
+            dict: Quantidade de linhas do fato por origem
+        """
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            # DELETE (e não TRUNCATE) para que limpeza e recarga fiquem na mesma transação
+            cursor.execute("DELETE FROM fato_financeiro_diario")
+            cursor.execute("DELETE FROM saldos_fluxo_mensais")
+            
+            for origem in FatoFinanceiroModel.ORIGENS:
+                FatoFinanceiroModel._aplicar(conn, origem, None, 1)
+            
+            cursor.execute("""
+                SELECT origem, COUNT(*) FROM fato_financeiro_diario GROUP BY origem
+            """)
+            resumo = {origem: total for origem, total in cursor.fetchall()}
+            conn.commit()
+        
+        return resumo
+    
+    @staticmethod
+    def _filtros(filial_id=None, conta_bancaria_id=None):
+        """
+        Filtros comuns das consultas
+        
+        Lançamentos manuais não têm conta bancária e continuam entrando quando o
+        filtro de conta é usado (mesmo comportamento das consultas sobre as origens).
+        """
+        sql = ""
+        params = []
+        if filial_id:
+            sql += " AND filial_id = %s"
+            params.append(filial_id)
+        if conta_bancaria_id:
+            sql += " AND (conta_bancaria_id = %s OR origem = 'lancamento_manual')"
+            params.append(conta_bancaria_id)
+        return sql, params
+    
+    @staticmethod
+    def _agrupamento(agrupar_por):
+        """
+        Expressões SQL (chave, comum) de uma série por filial ou conta bancária
+        
+        comum marca os lançamentos manuais ao agrupar por conta: eles entram em todas as
+        contas, como no filtro de conta (ver _filtros).
+        """
+        chave = {'filial': 'filial_id', 'conta_bancaria': 'conta_bancaria_id'}.get(agrupar_por, "0")
+        comum = "origem = 'lancamento_manual'" if agrupar_por == 'conta_bancaria' else "0"
+        return chave, comum
+    
+    @staticmethod
+    def get_totais(data_inicio, data_fim, natureza='realizado', filial_id=None, conta_bancaria_id=None):
+        """
+        Totais do período por direção e origem
+        
+        Returns:
+            dict: {(direcao, origem): {'bruto', 'desconto', 'encargos', 'liquido', 'quantidade'}}
+        """
+        filtro, params_filtro = FatoFinanceiroModel._filtros(filial_id, conta_bancaria_id)
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+                SELECT direcao, origem,
+                       SUM(valor_bruto) as bruto,
+                       SUM(valor_desconto) as desconto,
+                       SUM(valor_encargos) as encargos,
+                       SUM(valor_liquido) as liquido,
+                       SUM(quantidade) as quantidade
+                FROM fato_financeiro_diario
+                WHERE natureza = %s AND data BETWEEN %s AND %s{filtro}
+                GROUP BY direcao, origem
+            """, [natureza, data_inicio, data_fim] + params_filtro)
+            
+            return {
+                (row['direcao'], row['origem']): {
+                    'bruto': Decimal(str(row['bruto'])),
+                    'desconto': Decimal(str(row['desconto'])),
+                    'encargos': Decimal(str(row['encargos'])),
+                    'liquido': Decimal(str(row['liquido'])),
+                    'quantidade': int(row['quantidade'])
+                }
+                for row in cursor.fetchall()
+            }
+    
+    @staticmethod
+    def get_saldo_realizado_ate(data_referencia, filial_id=None, conta_bancaria_id=None, data_inicio=None):
+        """
+        Entradas menos saídas realizadas ANTES da data de referência
+        
+        data_inicio limita a soma a partir dessa data (delta após um checkpoint de
+        SaldoFluxoModel); sem ela, soma todo o histórico.
+        """
+        filtro, params_filtro = FatoFinanceiroModel._filtros(filial_id, conta_bancaria_id)
+        if data_inicio:
+            filtro = " AND data >= %s" + filtro
+            params_filtro = [data_inicio] + params_filtro
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+                SELECT COALESCE(SUM(CASE WHEN direcao = 'entrada' THEN valor_liquido ELSE -valor_liquido END), 0) as saldo
+                FROM fato_financeiro_diario
+                WHERE natureza = 'realizado' AND data < %s{filtro}
+            """, [data_referencia] + params_filtro)
+            
+            return Decimal(str(cursor.fetchone()['saldo']))
+    
+    @staticmethod
+    def get_saldos_realizados_ate(data_referencia, agrupar_por=None, filial_id=None, conta_bancaria_id=None,
+                                  data_inicio=None):
+        """
+        get_saldo_realizado_ate de todas as filiais / contas bancárias em uma query
+        
+        Returns:
+            list: Tuplas (chave, comum, saldo), com chave e comum como em get_por_dia_centavos
+        """
+        chave, comum = FatoFinanceiroModel._agrupamento(agrupar_por)
+        filtro, params_filtro = FatoFinanceiroModel._filtros(filial_id, conta_bancaria_id)
+        if data_inicio:
+            filtro = " AND data >= %s" + filtro
+            params_filtro = [data_inicio] + params_filtro
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {chave} as chave, {comum} as comum,
+                       SUM(CASE WHEN direcao = 'entrada' THEN valor_liquido ELSE -valor_liquido END)
+                FROM fato_financeiro_diario
+                WHERE natureza = 'realizado' AND data < %s{filtro}
+                GROUP BY 1, 2
+            """, [data_referencia] + params_filtro)
+            
+            return [(row[0], row[1], Decimal(str(row[2]))) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def get_por_dia(data_inicio, data_fim, filial_id=None, conta_bancaria_id=None, natureza=None):
+        """
+        Entradas e saídas por dia (realizado + projetado, ou só a natureza informada)
+        
+        Returns:
+            dict: {data: {'entradas': Decimal, 'saidas': Decimal}}
+        """
+        filtro, params_filtro = FatoFinanceiroModel._filtros(filial_id, conta_bancaria_id)
+        params = [data_inicio, data_fim]
+        if natureza:
+            filtro += " AND natureza = %s"
+            params.append(natureza)
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+                SELECT data,
+                       SUM(CASE WHEN direcao = 'entrada' THEN valor_liquido ELSE 0 END) as entradas,
+                       SUM(CASE WHEN direcao = 'saida' THEN valor_liquido ELSE 0 END) as saidas
+                FROM fato_financeiro_diario
+                WHERE data BETWEEN %s AND %s{filtro}
+                GROUP BY data
+            """, params + params_filtro)
+            
+            return {
+                row['data']: {
+                    'entradas': Decimal(str(row['entradas'])),
+                    'saidas': Decimal(str(row['saidas']))
+                }
+                for row in cursor.fetchall()
+            }
+    
+    @staticmethod
+    def get_por_dia_centavos(data_inicio, data_fim, agrupar_por=None, filial_id=None, conta_bancaria_id=None):
+        """
+        Entradas e saídas por dia em centavos inteiros, para o motor de projeção
+        
+        Soma o valor bruto (valor_total / valor), como as listas e o resumo de
+        FluxoCaixaModel.get_movimentacoes ao lado da projeção; o saldo inicial continua
+        líquido (get_saldo_realizado_ate), como sempre foi.
+        
+        Args:
+            agrupar_por: None, 'filial' ou 'conta_bancaria' (uma série por valor da dimensão)
+        
+        Returns:
+            list: Tuplas (data, chave, comum, entradas_centavos, saidas_centavos). comum=1
+            marca lançamentos manuais ao agrupar por conta: eles entram em todas as contas,
+            como no filtro de conta das demais consultas.
+        """
+        chave, comum = FatoFinanceiroModel._agrupamento(agrupar_por)
+        filtro, params_filtro = FatoFinanceiroModel._filtros(filial_id, conta_bancaria_id)
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT data, {chave} as chave, {comum} as comum,
+                       CAST(ROUND(SUM(CASE WHEN direcao = 'entrada' THEN valor_bruto ELSE 0 END) * 100) AS SIGNED),
+                       CAST(ROUND(SUM(CASE WHEN direcao = 'saida' THEN valor_bruto ELSE 0 END) * 100) AS SIGNED)
+                FROM fato_financeiro_diario
+                WHERE data BETWEEN %s AND %s{filtro}
+                GROUP BY 1, 2, 3
+            """, [data_inicio, data_fim] + params_filtro)
+            
+            return cursor.fetchall()
+    
+    @staticmethod
+    def get_por_mes(data_inicio, data_fim_exclusivo, natureza='realizado', filial_id=None):
+        """
+        Entradas e saídas por mês
+        
+        Returns:
+            dict: {(ano, mes): {'entradas': Decimal, 'saidas': Decimal}}
+        """
+        filtro, params_filtro = FatoFinanceiroModel._filtros(filial_id)
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+                SELECT YEAR(data) as ano, MONTH(data) as mes,
+                       SUM(CASE WHEN direcao = 'entrada' THEN valor_liquido ELSE 0 END) as entradas,
+                       SUM(CASE WHEN direcao = 'saida' THEN valor_liquido ELSE 0 END) as saidas
+                FROM fato_financeiro_diario
+                WHERE natureza = %s AND data >= %s AND data < %s{filtro}
+                GROUP BY ano, mes
+            """, [natureza, data_inicio, data_fim_exclusivo] + params_filtro)
+            
+            return {
+                (row['ano'], row['mes']): {
+                    'entradas': Decimal(str(row['entradas'])),
+                    'saidas': Decimal(str(row['saidas']))
+                }
+                for row in cursor.fetchall()
+            }
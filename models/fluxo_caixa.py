@@ -7,10 +7,179 @@ para visualização de entradas, saídas e projeções
 from decimal import Decimal
 from datetime import datetime, timedelta
 from database import DatabaseManager
+from models.saldo_fluxo import SaldoFluxoModel
+from services.projecao_fluxo import ProjecaoFluxoService
 
 class FluxoCaixaModel:
     """Modelo para análise de fluxo de caixa"""
     
+    # Blocos do UNION ALL de movimentações: (tabela, direção, status, data, filtro, tem_conta)
+    # A ordem dos blocos desempata as linhas do mesmo dia (como a antiga concatenação das listas)
+    _BLOCOS_MOVIMENTACOES = (
+        ('conta_receber', 'entrada', 'realizado', 'cr.data_recebimento', "cr.status = 'recebido'", True),
+        ('conta_receber', 'entrada', 'projetado', 'cr.data_vencimento', "cr.status IN ('pendente', 'vencido')", True),
+        ('lancamento_manual', 'entrada', 'realizado', 'lm.data_lancamento', "lm.tipo = 'receita' AND lm.status = 'ativo'", False),
+        ('conta_pagar', 'saida', 'realizado', 'cp.data_pagamento', "cp.status = 'pago'", True),
+        ('conta_pagar', 'saida', 'projetado', 'cp.data_vencimento', "cp.status IN ('pendente', 'vencido')", True),
+        ('lancamento_manual', 'saida', 'realizado', 'lm.data_lancamento', "lm.tipo = 'despesa' AND lm.status = 'ativo'", False)
+    )
+    
+    @staticmethod
+    def _sql_movimentacoes(data_inicio, data_fim, filial_id=None, conta_bancaria_id=None,
+                           detalhado=True, apos=None):
+        """
+        Monta o UNION ALL das seis origens de movimentação
+        
+        Args:
+            detalhado (bool): Inclui descrição e os nomes de cliente, fornecedor e filial
+                              (joins); False traz só o necessário para totalizar
+            apos (tuple): (data, bloco, id) da última linha já lida; os blocos já
+                          descartam as datas anteriores
+        
+        Returns:
+            tuple: (sql, params)
+        """
+        tabelas = {
+            'conta_receber': ('contas_receber', 'cr', 'valor_total'),
+            'conta_pagar': ('contas_pagar', 'cp', 'valor_total'),
+            'lancamento_manual': ('lancamentos_manuais', 'lm', 'valor')
+        }
+        
+        blocos = []
+        params = []
+        for bloco, (tipo, direcao, status, coluna_data, filtro, tem_conta) in enumerate(
+                FluxoCaixaModel._BLOCOS_MOVIMENTACOES, start=1):
+            tabela, alias, coluna_valor = tabelas[tipo]
+            
+            if detalhado:
+                # Entradas trazem o cliente; saídas, o fornecedor
+                if direcao == 'entrada':
+                    nomes = "c.nome as cliente, NULL as fornecedor"
+                    join_nome = f" LEFT JOIN clientes c ON {alias}.cliente_id = c.id"
+                else:
+                    nomes = "NULL as cliente, fo.nome as fornecedor"
+                    join_nome = f" LEFT JOIN fornecedores fo ON {alias}.fornecedor_id = fo.id"
+                colunas = (f"{bloco} as bloco, {alias}.id, {alias}.descricao, {alias}.{coluna_valor} as valor, "
+                           f"{coluna_data} as data, '{tipo}' as tipo, '{status}' as status, "
+                           f"'{direcao}' as direcao, {nomes}, f.nome as filial")
+                joins = join_nome + f" LEFT JOIN filiais f ON {alias}.filial_id = f.id"
+            else:
+                colunas = (f"{bloco} as bloco, {alias}.{coluna_valor} as valor, "
+                           f"'{status}' as status, '{direcao}' as direcao")
+                joins = ""
+            
+            sql = (f"SELECT {colunas} FROM {tabela} {alias}{joins}"
+                   f" WHERE {filtro} AND {coluna_data} BETWEEN %s AND %s")
+            params.extend([apos[0] if apos else data_inicio, data_fim])
+            
+            if filial_id:
+                sql += f" AND {alias}.filial_id = %s"
+                params.append(filial_id)
+            
+            # Lançamentos manuais não têm conta bancária: o filtro de conta não se aplica
+            if conta_bancaria_id and tem_conta:
+                sql += f" AND {alias}.conta_bancaria_id = %s"
+                params.append(conta_bancaria_id)
+            
+            blocos.append(sql)
+        
+        return " UNION ALL ".join(blocos), params
+    
+    @staticmethod
+    def iter_movimentacoes(data_inicio, data_fim, filial_id=None, conta_bancaria_id=None,
+                           apos=None, limite=None):
+        """
+        Percorre as movimentações do período em ordem de data, sem carregar tudo na memória
+        
+        Uma única query ordenada (data, bloco, id) lida por um cursor não bufferizado
+        em conexão própria (a conexão da requisição continua livre para os demais models).
+        
+        Args:
+            data_inicio (date): Data inicial do período
+            data_fim (date): Data final do período
+            filial_id (int): Filtrar por filial (opcional)
+            conta_bancaria_id (int): Filtrar por conta bancária (opcional)
+            apos (tuple): (data, bloco, id) da última linha da página anterior
+            limite (int): Máximo de linhas (opcional)
+        
+        Yields:
+            dict: bloco, id, descricao, valor, data, tipo, status, direcao, cliente,
+                  fornecedor e filial
+        """
+        sql_union, params = FluxoCaixaModel._sql_movimentacoes(
+            data_inicio, data_fim, filial_id, conta_bancaria_id, apos=apos
+        )
+        
+        condicao = ""
+        if apos:
+            condicao = (" WHERE (data > %s OR (data = %s AND bloco > %s)"
+                        " OR (data = %s AND bloco = %s AND id > %s))")
+            params.extend([apos[0], apos[0], apos[1], apos[0], apos[1], apos[2]])
+        
+        sql = f"SELECT * FROM ({sql_union}) movimentos{condicao} ORDER BY data, bloco, id"
+        if limite:
+            sql += " LIMIT %s"
+            params.append(int(limite))
+        
+        db = DatabaseManager()
+        with db.get_connection(isolated=True) as conn:
+            cursor = conn.cursor(dictionary=True, buffered=False)
+            cursor.execute(sql, params)
+            
+            while True:
+                linhas = cursor.fetchmany(500)
+                if not linhas:
+                    break
+                yield from linhas
+    
+    @staticmethod
+    def get_resumo_movimentacoes(data_inicio, data_fim, filial_id=None, conta_bancaria_id=None):
+        """
+        Totalizadores das movimentações do período, somados no banco
+        
+        Returns:
+            dict: Totais realizados/projetados de entradas e saídas, saldos e quantidades
+        """
+        sql_union, params = FluxoCaixaModel._sql_movimentacoes(
+            data_inicio, data_fim, filial_id, conta_bancaria_id, detalhado=False
+        )
+        
+        db = DatabaseManager()
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+                SELECT direcao, status, COALESCE(SUM(valor), 0) as total, COUNT(*) as quantidade
+                FROM ({sql_union}) movimentos
+                GROUP BY direcao, status
+            """, params)
+            totais = {(row['direcao'], row['status']): row for row in cursor.fetchall()}
+        
+        def total(direcao, status):
+            row = totais.get((direcao, status))
+            return Decimal(str(row['total'])) if row else Decimal('0')
+        
+        def quantidade(direcao):
+            return sum(int(row['quantidade']) for (d, _s), row in totais.items() if d == direcao)
+        
+        total_entradas_realizadas = total('entrada', 'realizado')
+        total_entradas_projetadas = total('entrada', 'projetado')
+        total_saidas_realizadas = total('saida', 'realizado')
+        total_saidas_projetadas = total('saida', 'projetado')
+        
+        return {
+            'total_entradas_realizadas': total_entradas_realizadas,
+            'total_entradas_projetadas': total_entradas_projetadas,
+            'total_entradas': total_entradas_realizadas + total_entradas_projetadas,
+            'total_saidas_realizadas': total_saidas_realizadas,
+            'total_saidas_projetadas': total_saidas_projetadas,
+            'total_saidas': total_saidas_realizadas + total_saidas_projetadas,
+            'saldo_realizado': total_entradas_realizadas - total_saidas_realizadas,
+            'saldo_projetado': (total_entradas_realizadas + total_entradas_projetadas) -
+                               (total_saidas_realizadas + total_saidas_projetadas),
+            'quantidade_entradas': quantidade('entrada'),
+            'quantidade_saidas': quantidade('saida')
+        }
+    
     @staticmethod
     def get_movimentacoes(data_inicio, data_fim, filial_id=None, conta_bancaria_id=None):
         """
@@ -29,219 +198,21 @@ class FluxoCaixaModel:
                 'resumo': {}     # Resumo totalizador
             }
         """
-        db = DatabaseManager()
+        entradas = []
+        saidas = []
         
-        with db.get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            
-            entradas = []
-            saidas = []
-            
-            # 1. CONTAS A RECEBER (pagas)
-            sql_receber = """
-                SELECT 
-                    cr.id,
-                    cr.descricao,
-                    cr.valor_total as valor,
-                    cr.data_recebimento as data,
-                    'conta_receber' as tipo,
-                    'realizado' as status,
-                    c.nome as cliente,
-                    f.nome as filial
-                FROM contas_receber cr
-                LEFT JOIN clientes c ON cr.cliente_id = c.id
-                LEFT JOIN filiais f ON cr.filial_id = f.id
-                WHERE cr.status = 'recebido'
-                  AND cr.data_recebimento BETWEEN %s AND %s
-            """
-            params = [data_inicio, data_fim]
-            
-            if filial_id:
-                sql_receber += " AND cr.filial_id = %s"
-                params.append(filial_id)
-            
-            if conta_bancaria_id:
-                sql_receber += " AND cr.conta_bancaria_id = %s"
-                params.append(conta_bancaria_id)
-            
-            cursor.execute(sql_receber, params)
-            entradas.extend(cursor.fetchall())
-            
-            # 2. CONTAS A RECEBER (a receber - projetado)
-            sql_receber_projetado = """
-                SELECT 
-                    cr.id,
-                    cr.descricao,
-                    cr.valor_total as valor,
-                    cr.data_vencimento as data,
-                    'conta_receber' as tipo,
-                    'projetado' as status,
-                    c.nome as cliente,
-                    f.nome as filial
-                FROM contas_receber cr
-                LEFT JOIN clientes c ON cr.cliente_id = c.id
-                LEFT JOIN filiais f ON cr.filial_id = f.id
-                WHERE cr.status IN ('pendente', 'vencido')
-                  AND cr.data_vencimento BETWEEN %s AND %s
-            """
-            params = [data_inicio, data_fim]
-            
-            if filial_id:
-                sql_receber_projetado += " AND cr.filial_id = %s"
-                params.append(filial_id)
-            
-            if conta_bancaria_id:
-                sql_receber_projetado += " AND cr.conta_bancaria_id = %s"
-                params.append(conta_bancaria_id)
-            
-            cursor.execute(sql_receber_projetado, params)
-            entradas.extend(cursor.fetchall())
-            
-            # 3. LANÇAMENTOS MANUAIS - RECEITAS
-            sql_lancamentos_receita = """
-                SELECT 
-                    lm.id,
-                    lm.descricao,
-                    lm.valor,
-                    lm.data_lancamento as data,
-                    'lancamento_manual' as tipo,
-                    'realizado' as status,
-                    c.nome as cliente,
-                    f.nome as filial
-                FROM lancamentos_manuais lm
-                LEFT JOIN clientes c ON lm.cliente_id = c.id
-                LEFT JOIN filiais f ON lm.filial_id = f.id
-                WHERE lm.tipo = 'receita'
-                  AND lm.status = 'ativo'
-                  AND lm.data_lancamento BETWEEN %s AND %s
-            """
-            params = [data_inicio, data_fim]
-            
-            if filial_id:
-                sql_lancamentos_receita += " AND lm.filial_id = %s"
-                params.append(filial_id)
-            
-            cursor.execute(sql_lancamentos_receita, params)
-            entradas.extend(cursor.fetchall())
-            
-            # 4. CONTAS A PAGAR (pagas)
-            sql_pagar = """
-                SELECT 
-                    cp.id,
-                    cp.descricao,
-                    cp.valor_total as valor,
-                    cp.data_pagamento as data,
-                    'conta_pagar' as tipo,
-                    'realizado' as status,
-                    fo.nome as fornecedor,
-                    f.nome as filial
-                FROM contas_pagar cp
-                LEFT JOIN fornecedores fo ON cp.fornecedor_id = fo.id
-                LEFT JOIN filiais f ON cp.filial_id = f.id
-                WHERE cp.status = 'pago'
-                  AND cp.data_pagamento BETWEEN %s AND %s
-            """
-            params = [data_inicio, data_fim]
-            
-            if filial_id:
-                sql_pagar += " AND cp.filial_id = %s"
-                params.append(filial_id)
-            
-            if conta_bancaria_id:
-                sql_pagar += " AND cp.conta_bancaria_id = %s"
-                params.append(conta_bancaria_id)
-            
-            cursor.execute(sql_pagar, params)
-            saidas.extend(cursor.fetchall())
-            
-            # 5. CONTAS A PAGAR (a pagar - projetado)
-            sql_pagar_projetado = """
-                SELECT 
-                    cp.id,
-                    cp.descricao,
-                    cp.valor_total as valor,
-                    cp.data_vencimento as data,
-                    'conta_pagar' as tipo,
-                    'projetado' as status,
-                    fo.nome as fornecedor,
-                    f.nome as filial
-                FROM contas_pagar cp
-                LEFT JOIN fornecedores fo ON cp.fornecedor_id = fo.id
-                LEFT JOIN filiais f ON cp.filial_id = f.id
-                WHERE cp.status IN ('pendente', 'vencido')
-                  AND cp.data_vencimento BETWEEN %s AND %s
-            """
-            params = [data_inicio, data_fim]
-            
-            if filial_id:
-                sql_pagar_projetado += " AND cp.filial_id = %s"
-                params.append(filial_id)
-            
-            if conta_bancaria_id:
-                sql_pagar_projetado += " AND cp.conta_bancaria_id = %s"
-                params.append(conta_bancaria_id)
-            
-            cursor.execute(sql_pagar_projetado, params)
-            saidas.extend(cursor.fetchall())
-            
-            # 6. LANÇAMENTOS MANUAIS - DESPESAS
-            sql_lancamentos_despesa = """
-                SELECT 
-                    lm.id,
-                    lm.descricao,
-                    lm.valor,
-                    lm.data_lancamento as data,
-                    'lancamento_manual' as tipo,
-                    'realizado' as status,
-                    fo.nome as fornecedor,
-                    f.nome as filial
-                FROM lancamentos_manuais lm
-                LEFT JOIN fornecedores fo ON lm.fornecedor_id = fo.id
-                LEFT JOIN filiais f ON lm.filial_id = f.id
-                WHERE lm.tipo = 'despesa'
-                  AND lm.status = 'ativo'
-                  AND lm.data_lancamento BETWEEN %s AND %s
-            """
-            params = [data_inicio, data_fim]
-            
-            if filial_id:
-                sql_lancamentos_despesa += " AND lm.filial_id = %s"
-                params.append(filial_id)
-            
-            cursor.execute(sql_lancamentos_despesa, params)
-            saidas.extend(cursor.fetchall())
-            
-            # Calcular totalizadores
-            total_entradas_realizadas = sum(
-                Decimal(str(e['valor'])) for e in entradas if e['status'] == 'realizado'
-            )
-            total_entradas_projetadas = sum(
-                Decimal(str(e['valor'])) for e in entradas if e['status'] == 'projetado'
-            )
-            total_saidas_realizadas = sum(
-                Decimal(str(s['valor'])) for s in saidas if s['status'] == 'realizado'
-            )
-            total_saidas_projetadas = sum(
-                Decimal(str(s['valor'])) for s in saidas if s['status'] == 'projetado'
-            )
-            
-            resumo = {
-                'total_entradas_realizadas': total_entradas_realizadas,
-                'total_entradas_projetadas': total_entradas_projetadas,
-                'total_entradas': total_entradas_realizadas + total_entradas_projetadas,
-                'total_saidas_realizadas': total_saidas_realizadas,
-                'total_saidas_projetadas': total_saidas_projetadas,
-                'total_saidas': total_saidas_realizadas + total_saidas_projetadas,
-                'saldo_realizado': total_entradas_realizadas - total_saidas_realizadas,
-                'saldo_projetado': (total_entradas_realizadas + total_entradas_projetadas) - 
-                                   (total_saidas_realizadas + total_saidas_projetadas)
-            }
-            
-            return {
-                'entradas': sorted(entradas, key=lambda x: x['data']),
-                'saidas': sorted(saidas, key=lambda x: x['data']),
-                'resumo': resumo
-            }
+        # Já vêm ordenadas por data: nada a ordenar aqui
+        for movimento in FluxoCaixaModel.iter_movimentacoes(data_inicio, data_fim, filial_id, conta_bancaria_id):
+            if movimento['direcao'] == 'entrada':
+                entradas.append(movimento)
+            else:
+                saidas.append(movimento)
+        
+        return {
+            'entradas': entradas,
+            'saidas': saidas,
+            'resumo': FluxoCaixaModel.get_resumo_movimentacoes(data_inicio, data_fim, filial_id, conta_bancaria_id)
+        }
     
     @staticmethod
     def get_saldo_inicial(data_referencia, filial_id=None, conta_bancaria_id=None):
@@ -257,76 +228,9 @@ class FluxoCaixaModel:
         Returns:
             Decimal: Saldo inicial na data de referência
         """
-        db = DatabaseManager()
-        
-        with db.get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            
-            # Calcular movimentações ANTES da data de referência
-            # Contas recebidas antes da data
-            sql_recebimentos = """
-                SELECT COALESCE(SUM(valor_total - COALESCE(valor_desconto, 0) + COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)), 0) as total
-                FROM contas_receber
-                WHERE status = 'recebido' AND data_recebimento < %s
-            """
-            params_mov = [data_referencia]
-            
-            if filial_id:
-                sql_recebimentos += " AND filial_id = %s"
-                params_mov.append(filial_id)
-            
-            if conta_bancaria_id:
-                sql_recebimentos += " AND conta_bancaria_id = %s"
-                params_mov.append(conta_bancaria_id)
-            
-            cursor.execute(sql_recebimentos, params_mov)
-            recebimentos_anteriores = Decimal(str(cursor.fetchone()['total']))
-            
-            # Contas pagas antes da data
-            params_mov = [data_referencia]
-            if filial_id:
-                params_mov.append(filial_id)
-            if conta_bancaria_id:
-                params_mov.append(conta_bancaria_id)
-                
-            sql_pagamentos = """
-                SELECT COALESCE(SUM(valor_total - COALESCE(valor_desconto, 0) + COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)), 0) as total
-                FROM contas_pagar
-                WHERE status = 'pago' AND data_pagamento < %s
-            """
-            
-            if filial_id:
-                sql_pagamentos += " AND filial_id = %s"
-            
-            if conta_bancaria_id:
-                sql_pagamentos += " AND conta_bancaria_id = %s"
-            
-            cursor.execute(sql_pagamentos, params_mov)
-            pagamentos_anteriores = Decimal(str(cursor.fetchone()['total']))
-            
-            # Lançamentos manuais antes da data
-            params_mov = [data_referencia]
-            if filial_id:
-                params_mov.append(filial_id)
-                
-            sql_lancamentos = """
-                SELECT COALESCE(SUM(CASE WHEN tipo = 'entrada' THEN valor ELSE -valor END), 0) as total
-                FROM lancamentos_manuais
-                WHERE data_lancamento < %s
-            """
-            
-            if filial_id:
-                sql_lancamentos += " AND filial_id = %s"
-            
-            cursor.execute(sql_lancamentos, params_mov)
-            lancamentos_anteriores = Decimal(str(cursor.fetchone()['total']))
-            
-            cursor.close()
-            
-            # Saldo inicial = Recebimentos anteriores - Pagamentos anteriores + Lançamentos anteriores
-            saldo_inicial = recebimentos_anteriores - pagamentos_anteriores + lancamentos_anteriores
-            
-            return saldo_inicial
+        # Recebimentos - pagamentos + lançamentos manuais ativos realizados antes da data:
+        # checkpoint do mês anterior + realizado do próprio mês
+        return SaldoFluxoModel.get_saldo_inicial(data_referencia, filial_id, conta_bancaria_id)
     
     @staticmethod
     def get_projecao_diaria(data_inicio, data_fim, filial_id=None, conta_bancaria_id=None):
@@ -342,40 +246,7 @@ class FluxoCaixaModel:
         Returns:
             list: Lista de dicionários com data e saldo projetado
         """
-        movimentacoes = FluxoCaixaModel.get_movimentacoes(data_inicio, data_fim, filial_id, conta_bancaria_id)
-        saldo_atual = FluxoCaixaModel.get_saldo_inicial(data_inicio, filial_id, conta_bancaria_id)
-        
-        # Agrupar movimentações por data
-        mov_por_data = {}
-        
-        for entrada in movimentacoes['entradas']:
-            data = entrada['data']
-            if data not in mov_por_data:
-                mov_por_data[data] = {'entradas': Decimal('0'), 'saidas': Decimal('0')}
-            mov_por_data[data]['entradas'] += Decimal(str(entrada['valor']))
-        
-        for saida in movimentacoes['saidas']:
-            data = saida['data']
-            if data not in mov_por_data:
-                mov_por_data[data] = {'entradas': Decimal('0'), 'saidas': Decimal('0')}
-            mov_por_data[data]['saidas'] += Decimal(str(saida['valor']))
-        
-        # Gerar projeção diária
-        projecao = []
-        data_atual = data_inicio
-        
-        while data_atual <= data_fim:
-            if data_atual in mov_por_data:
-                saldo_atual += mov_por_data[data_atual]['entradas']
-                saldo_atual -= mov_por_data[data_atual]['saidas']
-            
-            projecao.append({
-                'data': data_atual,
-                'saldo': saldo_atual,
-                'entradas': mov_por_data.get(data_atual, {}).get('entradas', Decimal('0')),
-                'saidas': mov_por_data.get(data_atual, {}).get('saidas', Decimal('0'))
-            })
-            
-            data_atual += timedelta(days=1)
-        
-        return projecao
+        # Motor vetorizado (centavos inteiros + cumsum); mesma série do antigo laço dia a dia
+        return ProjecaoFluxoService.projetar(
+            data_inicio, data_fim, 'dia', filial_id=filial_id, conta_bancaria_id=conta_bancaria_id
+        )[None]
@@ -5,6 +5,9 @@ from typing import List, Dict, Optional
 from datetime import date
 from decimal import Decimal
 from database import DatabaseManager
+from utils.cache import invalidar_tabelas
+from models.fato_financeiro import FatoFinanceiroModel
+from models.conciliacao import Conciliacao
 
 class LancamentoManualModel:
     """Classe para gerenciar operacoes de Lancamentos Manuais"""
@@ -58,9 +61,13 @@ class LancamentoManualModel:
                 dados.get('observacoes'),
                 dados.get('created_by')
             ))
+            lancamento_id = cursor.lastrowid
+            FatoFinanceiroModel.adicionar(conn, 'lancamento_manual', [lancamento_id])
+            Conciliacao.marcar_recalculo_sistema(conn, 'lancamento_manual', [lancamento_id])
             
             conn.commit()
-            return cursor.lastrowid
+            invalidar_tabelas('lancamentos_manuais', conn=conn)
+            return lancamento_id
     
     @staticmethod
     def get_all(tipo: Optional[str] = None,
@@ -171,25 +178,29 @@ class LancamentoManualModel:
                 WHERE id = %s
             """
             
-            cursor.execute(query, (
-                dados['tipo'],
-                dados['descricao'],
-                dados.get('filial_id'),
-                dados.get('tipo_servico_id'),
-                dados.get('centro_custo_id'),
-                dados.get('conta_contabil_id'),
-                dados.get('fornecedor_id'),
-                dados.get('cliente_id'),
-                dados['valor'],
-                dados['data_lancamento'],
-                dados.get('data_competencia'),
-                dados.get('numero_documento'),
-                dados.get('forma_pagamento'),
-                dados.get('observacoes'),
-                lancamento_id
-            ))
-            
+            with FatoFinanceiroModel.atualizando(conn, 'lancamento_manual', [lancamento_id]), \
+                    Conciliacao.recalculando(conn, 'lancamento_manual', [lancamento_id]):
+                cursor.execute(query, (
+                    dados['tipo'],
+                    dados['descricao'],
+                    dados.get('filial_id'),
+                    dados.get('tipo_servico_id'),
+                    dados.get('centro_custo_id'),
+                    dados.get('conta_contabil_id'),
+                    dados.get('fornecedor_id'),
+                    dados.get('cliente_id'),
+                    dados['valor'],
+                    dados['data_lancamento'],
+                    dados.get('data_competencia'),
+                    dados.get('numero_documento'),
+                    dados.get('forma_pagamento'),
+                    dados.get('observacoes'),
+                    lancamento_id
+                ))
+            
+            Conciliacao.invalidar_sugestoes_sistema(conn, 'lancamento_manual', [lancamento_id])
             conn.commit()
+            invalidar_tabelas('lancamentos_manuais', conn=conn)
             return cursor.rowcount > 0
     
     @staticmethod
@@ -199,8 +210,11 @@ class LancamentoManualModel:
         with db.get_connection() as conn:
             cursor = conn.cursor()
             query = "UPDATE lancamentos_manuais SET status = 'cancelado' WHERE id = %s"
-            cursor.execute(query, (lancamento_id,))
+            with FatoFinanceiroModel.atualizando(conn, 'lancamento_manual', [lancamento_id]):
+                cursor.execute(query, (lancamento_id,))
+            Conciliacao.invalidar_sugestoes_sistema(conn, 'lancamento_manual', [lancamento_id])
             conn.commit()
+            invalidar_tabelas('lancamentos_manuais', conn=conn)
             return cursor.rowcount > 0
     
     @staticmethod
@@ -0,0 +1,249 @@
+"""
+Model para a tabela movimentos_bancarios
+Razão (append-only) dos movimentos que alteram o saldo das contas bancárias, com
+checkpoints mensais em saldos_bancarios_mensais para consultar o saldo em qualquer data
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from database import DatabaseManager
+
+
+def _primeiro_dia_mes(data):
+    return data.replace(day=1)
+
+
+def _proximo_mes(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class MovimentoBancarioModel:
+    """Lançamento de movimentos, saldo por data e manutenção dos checkpoints mensais"""
+    
+    @staticmethod
+    def movimentar(conn, conta_id, valor, data_movimento=None, origem='manual',
+                   origem_id=None, descricao=None, exigir_ativa=True):
+        """
+        Aplica um movimento ao saldo da conta e grava no razão, na transação de conn
+        
+        O saldo é incrementado no próprio banco (saldo_atual = saldo_atual + valor):
+        a trava da linha serializa pagamentos concorrentes na mesma conta, sem a
+        janela de leitura-cálculo-escrita de antes.
+        
+        Args:
+            conn: Conexão da transação do chamador (o commit fica com ele)
+            conta_id (int): ID da conta bancária
+            valor (Decimal): Positivo para crédito, negativo para débito
+            data_movimento (date): Data financeira do movimento (padrão: hoje)
+            origem (str): conta_pagar, conta_receber, ajuste...
+            origem_id (int): ID do registro de origem, quando houver
+            descricao (str): Descrição livre
+            exigir_ativa (bool): Recusa contas inativas
+        
+        Returns:
+            tuple: (saldo_anterior, saldo_novo)
+        
+        Raises:
+            ValueError: Se a conta não existir (ou estiver inativa)
+        """
+        valor = Decimal(str(valor))
+        data_movimento = data_movimento or date.today()
+        if isinstance(data_movimento, str):
+            data_movimento = datetime.strptime(data_movimento, '%Y-%m-%d').date()
+        filtro_ativa = " AND ativo = 1" if exigir_ativa else ""
+        
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            f"UPDATE contas_bancarias SET saldo_atual = saldo_atual + %s WHERE id = %s{filtro_ativa}",
+            (valor, conta_id)
+        )
+        # A linha já está travada por esta transação: o valor lido é o que acabamos de gravar
+        cursor.execute(f"SELECT saldo_atual FROM contas_bancarias WHERE id = %s{filtro_ativa}", (conta_id,))
+        conta = cursor.fetchone()
+        
+        if not conta:
+            raise ValueError(f"Conta bancária {conta_id} não encontrada ou inativa")
+        
+        saldo_novo = Decimal(str(conta['saldo_atual']))
+        
+        cursor.execute("""
+            INSERT INTO movimentos_bancarios
+                (conta_bancaria_id, data_movimento, valor, saldo_apos, origem, origem_id, descricao)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, (conta_id, data_movimento, valor, saldo_novo, origem, origem_id, descricao))
+        
+        # Movimento retroativo: corrige os checkpoints dos meses já fechados a partir dele
+        cursor.execute("""
+            UPDATE saldos_bancarios_mensais
+            SET saldo_final = saldo_final + %s
+            WHERE conta_bancaria_id = %s AND mes >= %s
+        """, (valor, conta_id, _primeiro_dia_mes(data_movimento)))
+        
+        return saldo_novo - valor, saldo_novo
+    
+    @staticmethod
+    def registrar_abertura(conn, conta_id, saldo_inicial, data_movimento=None):
+        """Grava o movimento de abertura de uma conta recém-criada (saldo já está na conta)"""
+        saldo_inicial = Decimal(str(saldo_inicial or 0))
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO movimentos_bancarios
+                (conta_bancaria_id, data_movimento, valor, saldo_apos, origem, descricao)
+            VALUES (%s, %s, %s, %s, 'abertura', 'Saldo inicial da conta')
+        """, (conta_id, data_movimento or date.today(), saldo_inicial, saldo_inicial))
+    
+    @staticmethod
+    def saldo_em(conta_id, data_referencia):
+        """
+        Saldo da conta ao fim do dia informado
+        
+        Parte do último checkpoint mensal anterior ao mês da data (busca pela chave
+        primária) e soma só os movimentos posteriores a ele, em vez de todo o histórico.
+        
+        Returns:
+            Decimal: Saldo na data
+        """
+        if isinstance(data_referencia, str):
+            data_referencia = datetime.strptime(data_referencia, '%Y-%m-%d').date()
+        
+        db = DatabaseManager()
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            
+            cursor.execute("""
+                SELECT mes, saldo_final
+                FROM saldos_bancarios_mensais
+                WHERE conta_bancaria_id = %s AND mes < %s
+                ORDER BY mes DESC
+                LIMIT 1
+            """, (conta_id, _primeiro_dia_mes(data_referencia)))
+            checkpoint = cursor.fetchone()
+            
+            sql = """
+                SELECT COALESCE(SUM(valor), 0) as total
+                FROM movimentos_bancarios
+                WHERE conta_bancaria_id = %s AND data_movimento <= %s
+            """
+            params = [conta_id, data_referencia]
+            
+            base = Decimal('0')
+            if checkpoint:
+                base = Decimal(str(checkpoint['saldo_final']))
+                sql += " AND data_movimento >= %s"
+                params.append(_proximo_mes(checkpoint['mes']))
+            
+            cursor.execute(sql, params)
+            
+            return base + Decimal(str(cursor.fetchone()['total']))
+    
+    @staticmethod
+    def get_movimentos(conta_id, data_inicio, data_fim, limite=1000):
+        """
+        Extrato da conta no período, com o saldo anterior e o saldo após cada movimento
+        
+        Returns:
+            dict: {'saldo_anterior': Decimal, 'movimentos': [...], 'saldo_final': Decimal}
+        """
+        saldo = MovimentoBancarioModel.saldo_em(conta_id, data_inicio - timedelta(days=1))
+        saldo_anterior = saldo
+        
+        db = DatabaseManager()
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT id, data_movimento, valor, origem, origem_id, descricao, created_at
+                FROM movimentos_bancarios
+                WHERE conta_bancaria_id = %s
+                AND data_movimento BETWEEN %s AND %s
+                ORDER BY data_movimento, id
+                LIMIT %s
+            """, (conta_id, data_inicio, data_fim, limite))
+            movimentos = cursor.fetchall()
+        
+        # Saldo na ordem das datas (saldo_apos da tabela segue a ordem de gravação)
+        for movimento in movimentos:
+            saldo += Decimal(str(movimento['valor']))
+            movimento['saldo'] = saldo
+        
+        return {'saldo_anterior': saldo_anterior, 'movimentos': movimentos, 'saldo_final': saldo}
+    
+    @staticmethod
+    def gerar_checkpoints(hoje=None):
+        """
+        Grava o saldo de fim de mês de cada conta para os meses já encerrados
+        
+        Continua do último checkpoint da conta (ou do primeiro movimento). Roda no
+        agendador diário, então normalmente só o mês recém-fechado é calculado.
+        
+        Returns:
+            int: Quantidade de checkpoints gravados
+        """
+        mes_atual = _primeiro_dia_mes(hoje or date.today())
+        gravados = 0
+        
+        db = DatabaseManager()
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT id FROM contas_bancarias")
+            contas_ids = [row['id'] for row in cursor.fetchall()]
+        
+        for conta_id in contas_ids:
+            with db.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                # Trava a conta: nenhum movimento entra enquanto os meses são fechados
+                cursor.execute("SELECT id FROM contas_bancarias WHERE id = %s FOR UPDATE", (conta_id,))
+                
+                cursor.execute("""
+                    SELECT mes, saldo_final FROM saldos_bancarios_mensais
+                    WHERE conta_bancaria_id = %s
+                    ORDER BY mes DESC
+                    LIMIT 1
+                """, (conta_id,))
+                ultimo = cursor.fetchone()
+                
+                if ultimo:
+                    mes = _proximo_mes(ultimo['mes'])
+                    saldo = Decimal(str(ultimo['saldo_final']))
+                else:
+                    cursor.execute("""
+                        SELECT MIN(data_movimento) as primeira FROM movimentos_bancarios
+                        WHERE conta_bancaria_id = %s
+                    """, (conta_id,))
+                    primeira = cursor.fetchone()['primeira']
+                    if primeira is None:
+                        conn.rollback()
+                        continue
+                    mes = _primeiro_dia_mes(primeira)
+                    saldo = Decimal('0')
+                
+                if mes >= mes_atual:
+                    conn.rollback()
+                    continue
+                
+                # Totais por mês de todo o intervalo em aberto, em uma query
+                cursor.execute("""
+                    SELECT DATE_SUB(data_movimento, INTERVAL DAY(data_movimento) - 1 DAY) as mes,
+                           SUM(valor) as total
+                    FROM movimentos_bancarios
+                    WHERE conta_bancaria_id = %s
+                    AND data_movimento >= %s AND data_movimento < %s
+                    GROUP BY 1
+                """, (conta_id, mes, mes_atual))
+                totais = {row['mes']: Decimal(str(row['total'])) for row in cursor.fetchall()}
+                
+                checkpoints = []
+                while mes < mes_atual:
+                    saldo += totais.get(mes, Decimal('0'))
+                    checkpoints.append((conta_id, mes, saldo))
+                    mes = _proximo_mes(mes)
+                
+                cursor.executemany("""
+                    INSERT INTO saldos_bancarios_mensais (conta_bancaria_id, mes, saldo_final)
+                    VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE saldo_final = VALUES(saldo_final)
+                """, checkpoints)
+                conn.commit()
+                gravados += len(checkpoints)
+        
+        return gravados
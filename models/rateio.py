@@ -2,7 +2,7 @@
 Modelo para gerenciar Rateio de Contas a Receber entre Produtos de Cliente
 """
 from typing import List, Dict, Optional
-from database import DatabaseManager
+from database import DatabaseManager, inserir_em_lote
 
 class RateioModel:
     """Operações CRUD para rateio de receitas"""
@@ -45,7 +45,8 @@ class RateioModel:
                 # Limpar rateios anteriores (se houver)
                 cursor.execute("DELETE FROM contas_receber_rateio WHERE conta_receber_id = %s", (conta_receber_id,))
                 
-                # Inserir rateios
+                # Inserir rateios (um único INSERT com todas as linhas)
+                linhas = []
                 for r in rateios:
                     tipo = r.get('tipo_rateio', 'percentual')
                     percentual = r.get('percentual') if tipo == 'percentual' else None
@@ -57,11 +58,7 @@ class RateioModel:
                     else:
                         valor_rateado = float(valor_fixo)
                     
-                    cursor.execute("""
-                        INSERT INTO contas_receber_rateio 
-                        (conta_receber_id, cliente_produto_id, tipo_rateio, percentual, valor_fixo, valor_rateado, observacoes, created_by)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (
+                    linhas.append((
                         conta_receber_id,
                         r['cliente_produto_id'],
                         tipo,
@@ -72,6 +69,11 @@ class RateioModel:
                         created_by
                     ))
                 
+                inserir_em_lote(cursor, 'contas_receber_rateio', [
+                    'conta_receber_id', 'cliente_produto_id', 'tipo_rateio', 'percentual',
+                    'valor_fixo', 'valor_rateado', 'observacoes', 'created_by'
+                ], linhas)
+                
                 # Marcar conta como rateada
                 cursor.execute("UPDATE contas_receber SET is_rateada = TRUE WHERE id = %s", (conta_receber_id,))
                 
@@ -2,6 +2,8 @@
 Modelo para geração de relatórios financeiros
 """
 from database import DatabaseManager
+from models.fato_financeiro import FatoFinanceiroModel
+from models.saldo_fluxo import SaldoFluxoModel
 from datetime import datetime, timedelta
 from decimal import Decimal
 
@@ -21,8 +23,6 @@ class Relatorios:
         Returns:
             dict com estrutura do DRE
         """
-        db = DatabaseManager()
-        
         # Estrutura do DRE
         dre = {
             'periodo': {
@@ -58,76 +58,26 @@ class Relatorios:
             'lucro_liquido': Decimal('0')
         }
         
-        # 1. RECEITAS - Contas a Receber recebidas no período
-        with db.get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            
-            query_receitas = """
-                SELECT 
-                    SUM(cr.valor_total - COALESCE(cr.valor_desconto, 0) + COALESCE(cr.valor_juros, 0) + COALESCE(cr.valor_multa, 0)) as valor
-                FROM contas_receber cr
-                WHERE cr.status = 'recebido'
-                AND cr.data_recebimento BETWEEN %s AND %s
-            """
-            cursor.execute(query_receitas, (data_inicio, data_fim))
-            result_receitas = cursor.fetchone()
-            
-            if result_receitas and result_receitas['valor']:
-                dre['receitas_operacionais']['vendas_servicos'] = result_receitas['valor']
-            
-            # 2. DESCONTOS - Total de descontos concedidos
-            query_descontos = """
-                SELECT SUM(COALESCE(valor_desconto, 0)) as total_descontos
-                FROM contas_receber
-                WHERE status = 'recebido'
-                AND data_recebimento BETWEEN %s AND %s
-                AND valor_desconto > 0
-            """
-            cursor.execute(query_descontos, (data_inicio, data_fim))
-            result_descontos = cursor.fetchone()
-            if result_descontos and result_descontos['total_descontos']:
-                dre['deducoes_receita']['descontos'] = result_descontos['total_descontos']
-            
-            # 3. LANÇAMENTOS MANUAIS - Receitas
-            query_lancamentos_receita = """
-                SELECT SUM(valor) as total
-                FROM lancamentos_manuais
-                WHERE tipo = 'receita'
-                AND data_lancamento BETWEEN %s AND %s
-            """
-            cursor.execute(query_lancamentos_receita, (data_inicio, data_fim))
-            result_lanc_rec = cursor.fetchone()
-            if result_lanc_rec and result_lanc_rec['total']:
-                dre['receitas_operacionais']['outras_receitas'] += result_lanc_rec['total']
-            
-            # 4. DESPESAS - Contas a Pagar pagas no período
-            query_despesas = """
-                SELECT 
-                    SUM(cp.valor_total - COALESCE(cp.valor_desconto, 0) + COALESCE(cp.valor_juros, 0) + COALESCE(cp.valor_multa, 0)) as valor
-                FROM contas_pagar cp
-                WHERE cp.status = 'pago'
-                AND cp.data_pagamento BETWEEN %s AND %s
-            """
-            cursor.execute(query_despesas, (data_inicio, data_fim))
-            result_despesas = cursor.fetchone()
-            
-            if result_despesas and result_despesas['valor']:
-                # Classificar todas as despesas como operacionais
-                dre['despesas_operacionais']['outras'] = result_despesas['valor']
-            
-            # 5. LANÇAMENTOS MANUAIS - Despesas
-            query_lancamentos_despesa = """
-                SELECT SUM(valor) as total
-                FROM lancamentos_manuais
-                WHERE tipo = 'despesa'
-                AND data_lancamento BETWEEN %s AND %s
-            """
-            cursor.execute(query_lancamentos_despesa, (data_inicio, data_fim))
-            result_lanc_desp = cursor.fetchone()
-            if result_lanc_desp and result_lanc_desp['total']:
-                dre['despesas_operacionais']['outras'] += result_lanc_desp['total']
-            
-            cursor.close()
+        # Realizado do período, por direção e origem, lido do fato diário
+        totais = FatoFinanceiroModel.get_totais(data_inicio, data_fim, 'realizado')
+        vazio = {'bruto': Decimal('0'), 'desconto': Decimal('0'), 'encargos': Decimal('0'), 'liquido': Decimal('0')}
+        receber = totais.get(('entrada', 'conta_receber'), vazio)
+        
+        # 1. RECEITAS - Contas a Receber recebidas no período (valor bruto + encargos)
+        dre['receitas_operacionais']['vendas_servicos'] = receber['bruto'] + receber['encargos']
+        
+        # 2. DESCONTOS - Total de descontos concedidos
+        dre['deducoes_receita']['descontos'] = receber['desconto']
+        
+        # 3. LANÇAMENTOS MANUAIS - Receitas
+        dre['receitas_operacionais']['outras_receitas'] = totais.get(('entrada', 'lancamento_manual'), vazio)['liquido']
+        
+        # 4. DESPESAS - Contas a Pagar pagas no período + 5. Lançamentos manuais de despesa
+        # Classificar todas as despesas como operacionais
+        dre['despesas_operacionais']['outras'] = (
+            totais.get(('saida', 'conta_pagar'), vazio)['liquido'] +
+            totais.get(('saida', 'lancamento_manual'), vazio)['liquido']
+        )
         
         # CÁLCULOS
         dre['receitas_operacionais']['total'] = (
@@ -268,8 +218,6 @@ class Relatorios:
         Returns:
             dict com estrutura do DFC
         """
-        db = DatabaseManager()
-        
         dfc = {
             'periodo': {
                 'inicio': data_inicio,
@@ -291,94 +239,16 @@ class Relatorios:
             'saldo_final': Decimal('0')
         }
         
-        # 1. Saldo inicial (bancos no início do período)
-        # Para simplificar, vamos calcular retroativamente
-        with db.get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            
-            query_movimentos_anteriores = """
-                SELECT 
-                    COALESCE(SUM(CASE WHEN tipo = 'receita' THEN valor ELSE 0 END), 0) -
-                    COALESCE(SUM(CASE WHEN tipo = 'despesa' THEN valor ELSE 0 END), 0) as saldo_anterior
-                FROM lancamentos_manuais
-                WHERE data_lancamento < %s
-            """
-            cursor.execute(query_movimentos_anteriores, (data_inicio,))
-            result_anterior = cursor.fetchone()
-            
-            query_recebimentos_anteriores = """
-                SELECT COALESCE(SUM(valor_total - COALESCE(valor_desconto, 0) + COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)), 0) as total
-                FROM contas_receber
-                WHERE status = 'recebido'
-                AND data_recebimento < %s
-            """
-            cursor.execute(query_recebimentos_anteriores, (data_inicio,))
-            result_rec_anterior = cursor.fetchone()
-            
-            query_pagamentos_anteriores = """
-                SELECT COALESCE(SUM(valor_total - COALESCE(valor_desconto, 0) + COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)), 0) as total
-                FROM contas_pagar
-                WHERE status = 'pago'
-                AND data_pagamento < %s
-            """
-            cursor.execute(query_pagamentos_anteriores, (data_inicio,))
-            result_pag_anterior = cursor.fetchone()
-            
-            saldo_movimentos = result_anterior['saldo_anterior'] if result_anterior else Decimal('0')
-            saldo_recebimentos = result_rec_anterior['total'] if result_rec_anterior else Decimal('0')
-            saldo_pagamentos = result_pag_anterior['total'] if result_pag_anterior else Decimal('0')
-            
-            dfc['saldo_inicial'] = saldo_movimentos + saldo_recebimentos - saldo_pagamentos
-            
-            # 2. FLUXO OPERACIONAL - Recebimentos
-            query_recebimentos = """
-                SELECT COALESCE(SUM(valor_total - COALESCE(valor_desconto, 0) + COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)), 0) as total
-                FROM contas_receber
-                WHERE status = 'recebido'
-                AND data_recebimento BETWEEN %s AND %s
-            """
-            cursor.execute(query_recebimentos, (data_inicio, data_fim))
-            result_recebimentos = cursor.fetchone()
-            if result_recebimentos:
-                dfc['operacional']['recebimentos'] = result_recebimentos['total']
-            
-            # 3. Lançamentos manuais - Receitas
-            query_lanc_receitas = """
-                SELECT COALESCE(SUM(valor), 0) as total
-                FROM lancamentos_manuais
-                WHERE tipo = 'receita'
-                AND data_lancamento BETWEEN %s AND %s
-            """
-            cursor.execute(query_lanc_receitas, (data_inicio, data_fim))
-            result_lanc_rec = cursor.fetchone()
-            if result_lanc_rec:
-                dfc['operacional']['recebimentos'] += result_lanc_rec['total']
-            
-            # 4. FLUXO OPERACIONAL - Pagamentos
-            query_pagamentos = """
-                SELECT COALESCE(SUM(valor_total - COALESCE(valor_desconto, 0) + COALESCE(valor_juros, 0) + COALESCE(valor_multa, 0)), 0) as total
-                FROM contas_pagar
-                WHERE status = 'pago'
-                AND data_pagamento BETWEEN %s AND %s
-            """
-            cursor.execute(query_pagamentos, (data_inicio, data_fim))
-            result_pagamentos = cursor.fetchone()
-            if result_pagamentos:
-                dfc['operacional']['pagamentos'] = result_pagamentos['total']
-            
-            # 5. Lançamentos manuais - Despesas
-            query_lanc_despesas = """
-                SELECT COALESCE(SUM(valor), 0) as total
-                FROM lancamentos_manuais
-                WHERE tipo = 'despesa'
-                AND data_lancamento BETWEEN %s AND %s
-            """
-            cursor.execute(query_lanc_despesas, (data_inicio, data_fim))
-            result_lanc_desp = cursor.fetchone()
-            if result_lanc_desp:
-                dfc['operacional']['pagamentos'] += result_lanc_desp['total']
-            
-            cursor.close()
+        # 1. Saldo inicial: realizado acumulado antes do início do período
+        dfc['saldo_inicial'] = SaldoFluxoModel.get_saldo_inicial(data_inicio)
+        
+        # 2. FLUXO OPERACIONAL - Recebimentos e pagamentos (contas + lançamentos manuais)
+        totais = FatoFinanceiroModel.get_totais(data_inicio, data_fim, 'realizado')
+        for (direcao, _origem), valores in totais.items():
+            if direcao == 'entrada':
+                dfc['operacional']['recebimentos'] += valores['liquido']
+            else:
+                dfc['operacional']['pagamentos'] += valores['liquido']
         
         # CÁLCULOS
         dfc['operacional']['total'] = dfc['operacional']['recebimentos'] - dfc['operacional']['pagamentos']
@@ -0,0 +1,244 @@
+"""
+Model para a tabela saldos_fluxo_mensais
+Checkpoints mensais do saldo realizado (por filial, conta bancária e origem), usados
+como ponto de partida do saldo inicial do Fluxo de Caixa e do DFC
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from database import DatabaseManager
+from models.fato_financeiro import FatoFinanceiroModel
+
+
+def _primeiro_dia_mes(data):
+    return data.replace(day=1)
+
+
+def _proximo_mes(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _mes_anterior(mes):
+    return (mes - timedelta(days=1)).replace(day=1)
+
+
+class SaldoFluxoModel:
+    """Saldo realizado acumulado por mês fechado, gerado a partir de fato_financeiro_diario"""
+    
+    @staticmethod
+    def _saldo_checkpoint(mes, filial_id=None, conta_bancaria_id=None):
+        """
+        Saldo do checkpoint do mês com os filtros informados
+        
+        Returns:
+            Decimal, ou None quando o mês ainda não tem checkpoint
+        """
+        filtro, params_filtro = FatoFinanceiroModel._filtros(filial_id, conta_bancaria_id)
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            # COUNT sem filtro: um filtro sem linhas no mês ainda é um checkpoint válido (saldo 0)
+            cursor.execute(f"""
+                SELECT COUNT(*) as linhas,
+                       COALESCE(SUM(CASE WHEN 1=1{filtro} THEN saldo ELSE 0 END), 0) as saldo
+                FROM saldos_fluxo_mensais
+                WHERE mes = %s
+            """, params_filtro + [mes])
+            row = cursor.fetchone()
+            
+            if not row['linhas']:
+                return None
+            return Decimal(str(row['saldo']))
+    
+    @staticmethod
+    def _saldos_checkpoint(mes, agrupar_por=None, filial_id=None, conta_bancaria_id=None):
+        """
+        _saldo_checkpoint de todas as filiais / contas bancárias em uma query
+        
+        Returns:
+            list: Tuplas (chave, comum, saldo) como em FatoFinanceiroModel.get_saldos_realizados_ate,
+            ou None quando o mês ainda não tem checkpoint
+        """
+        chave, comum = FatoFinanceiroModel._agrupamento(agrupar_por)
+        filtro, params_filtro = FatoFinanceiroModel._filtros(filial_id, conta_bancaria_id)
+        db = DatabaseManager()
+        
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            # Agrupa sem filtrar no WHERE: um filtro sem linhas no mês ainda é um checkpoint válido
+            cursor.execute(f"""
+                SELECT {chave} as chave, {comum} as comum,
+                       COALESCE(SUM(CASE WHEN 1=1{filtro} THEN saldo ELSE 0 END), 0)
+                FROM saldos_fluxo_mensais
+                WHERE mes = %s
+                GROUP BY 1, 2
+            """, params_filtro + [mes])
+            rows = cursor.fetchall()
+            
+            if not rows:
+                return None
+            return [(row[0], row[1], Decimal(str(row[2]))) for row in rows]
+    
+    @staticmethod
+    def gerar_checkpoints(ate_mes=None):
+        """
+        Estende os checkpoints do último mês gravado até ate_mes (padrão: mês passado)
+        
+        Cada mês é o checkpoint anterior somado ao realizado do próprio mês, em um
+        INSERT ... SELECT por mês: normalmente só o mês recém-fechado, ou os meses
+        apagados por uma escrita retroativa (ver FatoFinanceiroModel._aplicar).
+        
+        Returns:
+            int: Quantidade de meses gravados
+        """
+        ultimo_fechado = _mes_anterior(_primeiro_dia_mes(date.today()))
+        ate_mes = min(ate_mes or ultimo_fechado, ultimo_fechado)
+        
+        db = DatabaseManager()
+        with db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            
+            # Trava o fim do prefixo: duas gerações simultâneas não gravam o mesmo mês
+            cursor.execute("SELECT mes FROM saldos_fluxo_mensais ORDER BY mes DESC LIMIT 1 FOR UPDATE")
+            ultimo = cursor.fetchone()
+            
+            if ultimo:
+                mes = _proximo_mes(ultimo['mes'])
+            else:
+                cursor.execute("""
+                    SELECT MIN(data) as primeira FROM fato_financeiro_diario
+                    WHERE natureza = 'realizado'
+                """)
+                primeira = cursor.fetchone()['primeira']
+                if primeira is None:
+                    conn.rollback()
+                    return 0
+                mes = _primeiro_dia_mes(primeira)
+            
+            gravados = 0
+            while mes <= ate_mes:
+                # A leitura do fato dentro do INSERT ... SELECT é travada (shared): uma
+                # escrita concorrente no mesmo mês espera este commit e então apaga o checkpoint
+                cursor.execute("""
+                    INSERT INTO saldos_fluxo_mensais (mes, filial_id, conta_bancaria_id, origem, saldo)
+                    SELECT %s, filial_id, conta_bancaria_id, origem, SUM(saldo)
+                    FROM (
+                        SELECT filial_id, conta_bancaria_id, origem, saldo
+                        FROM saldos_fluxo_mensais
+                        WHERE mes = %s
+                        UNION ALL
+                        SELECT filial_id, conta_bancaria_id, origem,
+                               SUM(CASE WHEN direcao = 'entrada' THEN valor_liquido ELSE -valor_liquido END)
+                        FROM fato_financeiro_diario
+                        WHERE natureza = 'realizado' AND data >= %s AND data < %s
+                        GROUP BY filial_id, conta_bancaria_id, origem
+                    ) movimentos
+                    GROUP BY filial_id, conta_bancaria_id, origem
+                    ON DUPLICATE KEY UPDATE saldo = VALUES(saldo)
+                """, (mes, _mes_anterior(mes), mes, _proximo_mes(mes)))
+                gravados += 1
+                mes = _proximo_mes(mes)
+            
+            conn.commit()
+        
+        return gravados
+    
+    @staticmethod
+    def _mes_checkpoint(data_referencia):
+        """Data de referência como date e o mês do checkpoint que serve de ponto de partida"""
+        if isinstance(data_referencia, datetime):
+            data_referencia = data_referencia.date()
+        elif isinstance(data_referencia, str):
+            data_referencia = datetime.strptime(data_referencia, '%Y-%m-%d').date()
+        
+        # Checkpoints só existem para meses fechados
+        mes_checkpoint = min(
+            _mes_anterior(_primeiro_dia_mes(data_referencia)),
+            _mes_anterior(_primeiro_dia_mes(date.today()))
+        )
+        return data_referencia, mes_checkpoint
+    
+    @staticmethod
+    def get_saldo_inicial(data_referencia, filial_id=None, conta_bancaria_id=None):
+        """
+        Entradas menos saídas realizadas ANTES da data de referência
+        
+        Parte do checkpoint do mês anterior ao da data (gerando os que faltarem) e soma
+        só o realizado do próprio mês, em vez de todo o histórico do fato.
+        
+        Args:
+            data_referencia (date): Data de referência
+            filial_id (int): Filtrar por filial (opcional)
+            conta_bancaria_id (int): Filtrar por conta bancária (opcional)
+        
+        Returns:
+            Decimal: Saldo realizado até o dia anterior à data de referência
+        """
+        data_referencia, mes_checkpoint = SaldoFluxoModel._mes_checkpoint(data_referencia)
+        
+        base = SaldoFluxoModel._saldo_checkpoint(mes_checkpoint, filial_id, conta_bancaria_id)
+        if base is None:
+            SaldoFluxoModel.gerar_checkpoints(mes_checkpoint)
+            base = SaldoFluxoModel._saldo_checkpoint(mes_checkpoint, filial_id, conta_bancaria_id)
+        
+        # Sem checkpoint (nada realizado até aquele mês): o histórico anterior é vazio
+        if base is None:
+            return FatoFinanceiroModel.get_saldo_realizado_ate(data_referencia, filial_id, conta_bancaria_id)
+        
+        return base + FatoFinanceiroModel.get_saldo_realizado_ate(
+            data_referencia, filial_id, conta_bancaria_id, data_inicio=_proximo_mes(mes_checkpoint)
+        )
+    
+    @staticmethod
+    def get_saldos_iniciais(data_referencia, agrupar_por, chaves, filial_id=None, conta_bancaria_id=None):
+        """
+        get_saldo_inicial de várias filiais / contas bancárias de uma vez
+        
+        Uma query de checkpoint e uma de realizado do mês, agrupadas pela dimensão, em
+        vez de duas por chave. O filtro da própria dimensão é substituído pela chave,
+        como em get_saldo_inicial(data, chave, conta) / (data, filial, chave).
+        
+        Args:
+            data_referencia (date): Data de referência
+            agrupar_por (str): None (saldo único), 'filial' ou 'conta_bancaria'
+            chaves (list): IDs das séries (uma chave vazia não filtra a dimensão)
+            filial_id (int): Filtrar por filial (opcional)
+            conta_bancaria_id (int): Filtrar por conta bancária (opcional)
+        
+        Returns:
+            dict: {chave: Decimal}
+        """
+        if agrupar_por == 'filial':
+            filial_id = None
+        elif agrupar_por == 'conta_bancaria':
+            conta_bancaria_id = None
+        
+        data_referencia, mes_checkpoint = SaldoFluxoModel._mes_checkpoint(data_referencia)
+        
+        base = SaldoFluxoModel._saldos_checkpoint(mes_checkpoint, agrupar_por, filial_id, conta_bancaria_id)
+        if base is None:
+            SaldoFluxoModel.gerar_checkpoints(mes_checkpoint)
+            base = SaldoFluxoModel._saldos_checkpoint(mes_checkpoint, agrupar_por, filial_id, conta_bancaria_id)
+        
+        if base is None:
+            linhas = FatoFinanceiroModel.get_saldos_realizados_ate(
+                data_referencia, agrupar_por, filial_id, conta_bancaria_id
+            )
+        else:
+            linhas = base + FatoFinanceiroModel.get_saldos_realizados_ate(
+                data_referencia, agrupar_por, filial_id, conta_bancaria_id, data_inicio=_proximo_mes(mes_checkpoint)
+            )
+        
+        total = sum((saldo for _, _, saldo in linhas), Decimal('0'))
+        comuns = sum((saldo for _, comum, saldo in linhas if comum), Decimal('0'))
+        proprios = {}
+        for chave, comum, saldo in linhas:
+            if not comum:
+                proprios[chave] = proprios.get(chave, Decimal('0')) + saldo
+        
+        # Lançamentos manuais (comum) entram no saldo de todas as contas bancárias
+        return {
+            chave: proprios.get(chave, Decimal('0')) + comuns if chave else total
+            for chave in chaves
+        }
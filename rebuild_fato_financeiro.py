@@ -0,0 +1,22 @@
+"""
+Reconstrói a tabela fato_financeiro_diario a partir de contas a receber,
+contas a pagar e lançamentos manuais, e regera os checkpoints mensais de saldo
+
+Uso: python rebuild_fato_financeiro.py
+"""
+import time
+from models.fato_financeiro import FatoFinanceiroModel
+from models.saldo_fluxo import SaldoFluxoModel
+
+print("=== RECONSTRUINDO fato_financeiro_diario ===\n")
+
+inicio = time.perf_counter()
+resumo = FatoFinanceiroModel.reconstruir()
+
+for origem, linhas in resumo.items():
+    print(f"   ✓ {origem}: {linhas} linhas")
+
+meses = SaldoFluxoModel.gerar_checkpoints()
+print(f"   ✓ saldos_fluxo_mensais: {meses} meses")
+
+print(f"\n✅ Fato reconstruído em {time.perf_counter() - inicio:.2f}s")
@@ -5,7 +5,9 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from models.conciliacao import Conciliacao
 from werkzeug.utils import secure_filename
 from utils.auditoria import auditar_agora
+from services.parsers_extrato import processar_extrato
 import os
+import time
 import functools
 from datetime import datetime
 
@@ -68,6 +70,19 @@ def index():
         return redirect(url_for('dashboard.index'))
 
 
+def _resposta_upload(categoria, mensagem, destino=None, status=None, **dados):
+    """
+    Resposta do upload: JSON para clientes que pedem (?formato=json ou
+    Accept: application/json), flash + redirect para o formulário
+    """
+    if request.args.get('formato') == 'json' or request.accept_mimetypes.best == 'application/json':
+        status = status or (200 if categoria == 'success' else 400)
+        return jsonify({'success': categoria == 'success', 'message': mensagem, **dados}), status
+    
+    flash(mensagem, categoria)
+    return redirect(destino or url_for('conciliacao.index'))
+
+
 @conciliacao_bp.route('/upload', methods=['POST'])
 @login_required
 def upload():
@@ -75,80 +90,73 @@ def upload():
     try:
         # Validar arquivo
         if 'arquivo' not in request.files:
-            flash('Nenhum arquivo foi enviado', 'error')
-            return redirect(url_for('conciliacao.index'))
+            return _resposta_upload('error', 'Nenhum arquivo foi enviado')
         
         arquivo = request.files['arquivo']
         
         if arquivo.filename == '':
-            flash('Nenhum arquivo foi selecionado', 'error')
-            return redirect(url_for('conciliacao.index'))
+            return _resposta_upload('error', 'Nenhum arquivo foi selecionado')
         
         if not allowed_file(arquivo.filename):
-            flash('Formato de arquivo não permitido. Use Excel (.xlsx)', 'error')
-            return redirect(url_for('conciliacao.index'))
+            return _resposta_upload('error', 'Formato de arquivo não permitido. Use Excel (.xlsx)')
         
         # Validar conta bancária
         conta_bancaria_id = request.form.get('conta_bancaria_id')
         if not conta_bancaria_id:
-            flash('Selecione uma conta bancária', 'error')
-            return redirect(url_for('conciliacao.index'))
+            return _resposta_upload('error', 'Selecione uma conta bancária')
         
         # Salvar arquivo
+        inicio = time.perf_counter()
         filename = secure_filename(arquivo.filename)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename_final = f"{timestamp}_{filename}"
         filepath = os.path.join(UPLOAD_FOLDER, filename_final)
         arquivo.save(filepath)
+        tempo_salvar = time.perf_counter() - inicio
         
-        # Importar parsers do sistema
-        import sys
-        sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-        from services.parsers_extrato import detectar_banco, criar_parser
-        
-        # Detectar banco e criar parser apropriado
-        banco_detectado = detectar_banco(filepath)
-        
-        if not banco_detectado:
-            flash('Não foi possível identificar o formato do arquivo. Certifique-se de usar um extrato do Itaú ou Banco do Brasil.', 'error')
+        # Abrir uma vez, detectar o banco, ler e normalizar os lançamentos
+        try:
+            extrato = processar_extrato(filepath)
+        except ValueError as e:
             os.remove(filepath)
-            return redirect(url_for('conciliacao.index'))
+            return _resposta_upload('error', str(e))
         
-        # Criar parser e processar arquivo
-        parser = criar_parser(filepath)
-        transacoes_parsed = parser.parse()
+        transacoes = extrato['transacoes']
+        tempos = {'salvar': tempo_salvar, **extrato['tempos']}
         
-        if not transacoes_parsed or len(transacoes_parsed) == 0:
-            flash('Nenhuma transação foi encontrada no arquivo', 'warning')
+        if not transacoes:
             os.remove(filepath)
-            return redirect(url_for('conciliacao.index'))
-        
-        # Converter para formato esperado pela conciliação
-        transacoes = []
-        for trans in transacoes_parsed:
-            transacoes.append({
-                'data_transacao': trans['data_lancamento'],
-                'descricao': trans['historico'],
-                'documento': trans.get('documento', ''),
-                'valor': abs(float(trans['valor'])),
-                'tipo': trans['tipo_movimento'],  # já vem como 'credito' ou 'debito'
-                'saldo_apos': float(trans.get('saldo_apos', 0)) if trans.get('saldo_apos') else None
-            })
-        
-        # Criar conciliação
-        conciliacao_id = Conciliacao.criar_conciliacao(
-            conta_bancaria_id=conta_bancaria_id,
-            nome_arquivo=filename,
-            transacoes=transacoes,
-            user_id=session.get('user_id')
+            return _resposta_upload('warning', 'Nenhuma transação foi encontrada no arquivo',
+                                    banco=extrato['banco'], tempos=tempos)
+        
+        # Criar conciliação (arquivo ou linhas já importados nesta conta: conflito, não erro do servidor)
+        inicio = time.perf_counter()
+        try:
+            resultado = Conciliacao.criar_conciliacao(
+                conta_bancaria_id=conta_bancaria_id,
+                nome_arquivo=filename,
+                transacoes=transacoes,
+                user_id=session.get('user_id'),
+                hash_arquivo=Conciliacao.hash_arquivo(filepath)
+            )
+        except ValueError as e:
+            os.remove(filepath)
+            return _resposta_upload('error', str(e), status=409, banco=extrato['banco'])
+        tempos['gravar'] = time.perf_counter() - inicio
+        tempos = {etapa: round(segundos, 3) for etapa, segundos in tempos.items()}
+        
+        mensagem = f'Extrato importado com sucesso! {resultado["importadas"]} transações processadas.'
+        if resultado['ignoradas']:
+            mensagem += f' {resultado["ignoradas"]} já importada(s) por outro extrato desta conta foram ignoradas.'
+        
+        return _resposta_upload(
+            'success', mensagem,
+            url_for('conciliacao.matching', conciliacao_id=resultado['conciliacao_id']),
+            banco=extrato['banco'], tempos=tempos, **resultado
         )
-        
-        flash(f'Extrato importado com sucesso! {len(transacoes)} transações processadas.', 'success')
-        return redirect(url_for('conciliacao.matching', conciliacao_id=conciliacao_id))
     
     except Exception as e:
-        flash(f'Erro ao processar arquivo: {str(e)}', 'error')
-        return redirect(url_for('conciliacao.index'))
+        return _resposta_upload('error', f'Erro ao processar arquivo: {str(e)}', status=500)
 
 
 @conciliacao_bp.route('/matching/<int:conciliacao_id>')
@@ -163,8 +171,8 @@ def matching(conciliacao_id):
             flash('Conciliação não encontrada', 'error')
             return redirect(url_for('conciliacao.index'))
         
-        # Buscar matches automáticos
-        matches = Conciliacao.buscar_matches_automaticos(conciliacao_id)
+        # Sugestões gravadas; só as linhas novas ou afetadas são recalculadas
+        matches = Conciliacao.get_matches(conciliacao_id, recalcular=bool(request.args.get('recalcular')))
         
         # Agrupar matches por transação do extrato
         matches_por_transacao = {}
@@ -177,9 +185,9 @@ def matching(conciliacao_id):
                 matches_por_transacao[trans_id] = []
             matches_por_transacao[trans_id].append(match)
         
-        # Ordenar matches dentro de cada transação por similaridade
+        # Ordenar matches dentro de cada transação: o par sugerido primeiro, depois por similaridade
         for trans_id in matches_por_transacao:
-            matches_por_transacao[trans_id].sort(key=lambda x: x['similaridade'], reverse=True)
+            matches_por_transacao[trans_id].sort(key=lambda x: (x['sugerido'], x['similaridade']), reverse=True)
         
         # Separar transações COM e SEM matches
         transacoes_com_match = []
@@ -246,6 +254,39 @@ def conciliar():
         return redirect(url_for('conciliacao.matching', conciliacao_id=conciliacao_id))
 
 
+@conciliacao_bp.route('/conciliar_lote', methods=['POST'])
+@login_required
+def conciliar_lote():
+    """Aceita todos os pares sugeridos acima do percentual informado"""
+    conciliacao_id = request.form.get('conciliacao_id', type=int)
+    try:
+        similaridade_minima = request.form.get('similaridade_minima', 95, type=float)
+        
+        if not conciliacao_id:
+            flash('Conciliação não informada', 'error')
+            return redirect(url_for('conciliacao.index'))
+        
+        if not 60 <= similaridade_minima <= 100:
+            flash('O percentual mínimo deve estar entre 60 e 100', 'error')
+            return redirect(url_for('conciliacao.matching', conciliacao_id=conciliacao_id))
+        
+        resultado = Conciliacao.conciliar_lote(conciliacao_id, similaridade_minima, session.get('user_id'))
+        
+        if resultado['conciliadas']:
+            auditar_agora('conciliacoes_bancarias', conciliacao_id, 'update', {
+                'acao': 'conciliacao_lote',
+                'similaridade_minima': similaridade_minima,
+                'conciliadas': resultado['conciliadas']
+            })
+        
+        flash(resultado['message'], 'success' if resultado['conciliadas'] else 'info')
+        return redirect(url_for('conciliacao.matching', conciliacao_id=conciliacao_id))
+    
+    except Exception as e:
+        flash(f'Erro ao conciliar em lote: {str(e)}', 'error')
+        return redirect(url_for('conciliacao.matching', conciliacao_id=conciliacao_id))
+
+
 @conciliacao_bp.route('/desconciliar', methods=['POST'])
 @login_required
 def desconciliar():
@@ -332,3 +373,31 @@ def api_matches(conciliacao_id):
     
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
+
+
+@conciliacao_bp.route('/api/sugestoes/<int:conciliacao_id>')
+@login_required
+def api_sugestoes(conciliacao_id):
+    """Retorna em JSON os pares sugeridos sem conflito (um por linha e por transação do sistema)"""
+    try:
+        tolerancia_dias = request.args.get('tolerancia_dias', 3, type=int)
+        tolerancia_valor = request.args.get('tolerancia_valor', 0.01, type=float)
+        
+        sugestoes = Conciliacao.get_sugestoes(
+            conciliacao_id,
+            tolerancia_dias=tolerancia_dias,
+            tolerancia_valor=tolerancia_valor
+        )
+        
+        return jsonify([
+            {
+                'transacao_extrato_id': sugestao['transacao_extrato_id'],
+                'tipo_transacao': sugestao['transacao_sistema_tipo'],
+                'transacao_id': sugestao['transacao_sistema_id'],
+                'similaridade': sugestao['similaridade']
+            }
+            for sugestao in sugestoes
+        ])
+    
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
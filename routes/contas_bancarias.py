@@ -5,8 +5,11 @@ Gerencia contas correntes, poupança e caixa
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from models.conta_bancaria import ContaBancariaModel
+from models.movimento_bancario import MovimentoBancarioModel
 from models.filial import FilialModel
 from decimal import Decimal
+from datetime import date, datetime
+from utils.paginacao import linha_json
 from utils.auditoria import auditar_agora
 
 contas_bancarias_bp = Blueprint('contas_bancarias', __name__, url_prefix='/contas_bancarias')
@@ -169,3 +172,45 @@ def ajustar_saldo(conta_id):
         flash(f'Erro: {str(e)}', 'error')
     
     return redirect(url_for('contas_bancarias.detalhes', conta_id=conta_id))
+
+@contas_bancarias_bp.route('/api/<int:conta_id>/saldo')
+def api_saldo(conta_id):
+    """
+    Saldo da conta ao fim de uma data (?data=AAAA-MM-DD, padrão: hoje)
+    Calculado a partir do último checkpoint mensal e dos movimentos posteriores
+    """
+    try:
+        data_str = request.args.get('data')
+        data_referencia = datetime.strptime(data_str, '%Y-%m-%d').date() if data_str else date.today()
+    except ValueError:
+        return jsonify({'error': 'Data inválida (use AAAA-MM-DD)'}), 400
+    
+    if not ContaBancariaModel.get_by_id(conta_id):
+        return jsonify({'error': 'Conta bancária não encontrada'}), 404
+    
+    saldo = ContaBancariaModel.saldo_em(conta_id, data_referencia)
+    return jsonify({
+        'conta_bancaria_id': conta_id,
+        'data': data_referencia.isoformat(),
+        'saldo': float(saldo)
+    })
+
+@contas_bancarias_bp.route('/api/<int:conta_id>/movimentos')
+def api_movimentos(conta_id):
+    """Extrato de movimentos da conta (?data_inicio=&data_fim=, padrão: mês atual)"""
+    try:
+        hoje = date.today()
+        data_inicio = request.args.get('data_inicio')
+        data_fim = request.args.get('data_fim')
+        data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d').date() if data_inicio else hoje.replace(day=1)
+        data_fim = datetime.strptime(data_fim, '%Y-%m-%d').date() if data_fim else hoje
+    except ValueError:
+        return jsonify({'error': 'Data inválida (use AAAA-MM-DD)'}), 400
+    
+    extrato = MovimentoBancarioModel.get_movimentos(conta_id, data_inicio, data_fim)
+    return jsonify({
+        'conta_bancaria_id': conta_id,
+        'saldo_anterior': float(extrato['saldo_anterior']),
+        'saldo_final': float(extrato['saldo_final']),
+        'movimentos': [linha_json(movimento) for movimento in extrato['movimentos']]
+    })
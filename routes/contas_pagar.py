@@ -11,7 +11,9 @@ from models.tipo_servico import TipoServicoModel
 from models.centro_custo import CentroCustoModel
 from models.plano_conta import PlanoContaModel
 from models.filial import FilialModel
-from utils.auditoria import auditar_agora
+from utils.auditoria import auditar_agora, auditar_lote_agora
+from database import db
+from utils.paginacao import ORDENACOES, ORDEM_PADRAO, TAMANHOS_PAGINA, LIMITE_PADRAO, linha_json
 
 contas_pagar_bp = Blueprint('contas_pagar', __name__, url_prefix='/contas-pagar')
 
@@ -40,58 +42,84 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def _filtros_da_requisicao():
+    """Filtros da listagem lidos da query string (página e API)"""
+    data_inicio = request.args.get('data_inicio')
+    data_fim = request.args.get('data_fim')
+    
+    return {
+        'fornecedor_id': request.args.get('fornecedor_id', type=int),
+        'filial_id': request.args.get('filial_id', type=int),
+        'centro_custo_id': request.args.get('centro_custo_id', type=int),
+        'status': request.args.get('status') or None,
+        'data_inicio': datetime.strptime(data_inicio, '%Y-%m-%d').date() if data_inicio else None,
+        'data_fim': datetime.strptime(data_fim, '%Y-%m-%d').date() if data_fim else None
+    }
+
 @contas_pagar_bp.route('/')
 @login_required
 @login_required
 def lista():
-    # Filtros
-    fornecedor_id = request.args.get('fornecedor_id', type=int)
-    filial_id = request.args.get('filial_id', type=int)
-    centro_custo_id = request.args.get('centro_custo_id', type=int)
-    status = request.args.get('status')
-    data_inicio = request.args.get('data_inicio')
-    data_fim = request.args.get('data_fim')
-    
-    # Converter datas
-    data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date() if data_inicio else None
-    data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date() if data_fim else None
-    
-    # Buscar contas
-    contas = ContaPagarModel.get_all(
-        fornecedor_id=fornecedor_id,
-        filial_id=filial_id,
-        centro_custo_id=centro_custo_id,
-        status=status,
-        data_inicio=data_inicio_obj,
-        data_fim=data_fim_obj
+    filtros = _filtros_da_requisicao()
+    
+    # Página atual (keyset) e totalizadores de todas as linhas filtradas
+    pagina = ContaPagarModel.get_pagina(
+        filtros,
+        cursor=request.args.get('cursor'),
+        limite=request.args.get('limite', LIMITE_PADRAO, type=int),
+        ordem=request.args.get('ordem', ORDEM_PADRAO)
     )
+    totalizadores = ContaPagarModel.get_totalizadores(filtros)
     
     # Buscar dados para filtros
     fornecedores = FornecedorModel.get_all()
     filiais = FilialModel.get_all()
     centros_custos = CentroCustoModel.get_all()
     
-    # Totalizadores
-    totalizadores = ContaPagarModel.get_totalizadores({
-        'fornecedor_id': fornecedor_id,
-        'filial_id': filial_id,
-        'centro_custo_id': centro_custo_id
-    })
-    
     return render_template('contas_pagar/lista.html', 
-                         contas=contas,
+                         contas=pagina['itens'],
+                         pagina=pagina,
+                         ordenacoes=ORDENACOES,
+                         tamanhos_pagina=TAMANHOS_PAGINA,
                          fornecedores=fornecedores,
                          filiais=filiais,
                          centros_custos=centros_custos,
                          totalizadores=totalizadores,
-                         filtros={
-                             'fornecedor_id': fornecedor_id,
-                             'filial_id': filial_id,
-                             'centro_custo_id': centro_custo_id,
-                             'status': status,
-                             'data_inicio': data_inicio,
-                             'data_fim': data_fim
-                         })
+                         filtros=filtros)
+
+@contas_pagar_bp.route('/api/contas')
+@login_required
+def api_contas():
+    """
+    Listagem paginada em JSON, com os mesmos filtros, ordenação e cursor da página
+    
+    Os totalizadores só são calculados na primeira página (sem cursor), já que
+    não mudam ao navegar.
+    """
+    try:
+        filtros = _filtros_da_requisicao()
+        cursor = request.args.get('cursor')
+        
+        pagina = ContaPagarModel.get_pagina(
+            filtros,
+            cursor=cursor,
+            limite=request.args.get('limite', LIMITE_PADRAO, type=int),
+            ordem=request.args.get('ordem', ORDEM_PADRAO)
+        )
+        
+        resposta = {
+            'contas': [linha_json(conta) for conta in pagina['itens']],
+            'proximo_cursor': pagina['proximo_cursor'],
+            'cursor_anterior': pagina['cursor_anterior'],
+            'limite': pagina['limite'],
+            'ordem': pagina['ordem']
+        }
+        if not cursor:
+            resposta['totalizadores'] = linha_json(ContaPagarModel.get_totalizadores(filtros))
+        
+        return jsonify(resposta)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 @contas_pagar_bp.route('/nova', methods=['GET', 'POST'])
 @login_required
@@ -166,10 +194,22 @@ def baixar(conta_id):
                 'valor_desconto': valor_desconto
             }
             
-            # Registrar baixa na conta a pagar
-            resultado = ContaPagarModel.baixar(conta_id, dados_baixa)
-            
-            if resultado['success']:
+            # Baixa, débito bancário e auditoria na mesma transação
+            from models.conta_bancaria import ContaBancariaModel
+            with db.unit_of_work():
+                resultado = ContaPagarModel.baixar(conta_id, dados_baixa)
+                if not resultado['success']:
+                    raise ValueError(resultado['message'])
+                
+                # Movimentar conta bancária (debitar)
+                ContaBancariaModel.debitar(
+                    dados_baixa['conta_bancaria_id'],
+                    Decimal(str(resultado['valor_pago'])),
+                    data_movimento=dados_baixa['data_pagamento'],
+                    origem='conta_pagar',
+                    origem_id=conta_id
+                )
+                
                 # Auditoria
                 auditar_agora('contas_pagar', conta_id, 'update', {
                     'acao': 'baixa_pagamento',
@@ -178,20 +218,11 @@ def baixar(conta_id):
                     'valor_pago': str(resultado['valor_pago']),
                     'valor_desconto': dados_baixa['valor_desconto']
                 })
-                
-                # Movimentar conta bancária (debitar)
-                from models.conta_bancaria import ContaBancariaModel
-                try:
-                    ContaBancariaModel.debitar(
-                        dados_baixa['conta_bancaria_id'],
-                        Decimal(str(resultado['valor_pago']))
-                    )
-                    flash(f"✅ {resultado['message']} Saldo da conta bancária atualizado.", 'success')
-                except ValueError as e:
-                    flash(f"⚠️ Pagamento registrado, mas erro ao atualizar saldo: {str(e)}", 'warning')
-            else:
-                flash(f"Erro ao registrar pagamento: {resultado['message']}", 'error')
             
+            flash(f"✅ {resultado['message']} Saldo da conta bancária atualizado.", 'success')
+            
+        except ValueError as e:
+            flash(f"Erro ao registrar pagamento: {str(e)}", 'error')
         except Exception as e:
             flash(f"Erro ao processar pagamento: {str(e)}", 'error')
         
@@ -213,6 +244,127 @@ def baixar(conta_id):
                          contas_bancarias=contas_bancarias,
                          today=date.today().strftime('%Y-%m-%d'))
 
+# Limite de contas por lote (mantém a transação e o FOR UPDATE curtos)
+MAXIMO_BAIXA_LOTE = 500
+
+def _executar_baixa_lote(contas_ids, dados_baixa):
+    """
+    Baixa, débito bancário e auditoria do lote na mesma transação
+    
+    Raises:
+        ValueError: Se alguma conta do lote não puder ser baixada (nada é gravado)
+    """
+    if len(contas_ids) > MAXIMO_BAIXA_LOTE:
+        raise ValueError(f'Selecione no máximo {MAXIMO_BAIXA_LOTE} contas por lote')
+    
+    from models.conta_bancaria import ContaBancariaModel
+    with db.unit_of_work():
+        resultado = ContaPagarModel.baixar_lote(contas_ids, dados_baixa)
+        if not resultado['success']:
+            raise ValueError(resultado['message'])
+        
+        # Um débito por conta bancária com o total do lote
+        for conta_bancaria_id, total in resultado['por_conta_bancaria'].items():
+            ContaBancariaModel.debitar(
+                conta_bancaria_id, total,
+                data_movimento=dados_baixa['data_pagamento'],
+                origem='conta_pagar_lote',
+                descricao=f"Baixa em lote de {resultado['quantidade']} conta(s) a pagar"
+            )
+        
+        # Auditoria de todas as contas em um único INSERT
+        auditar_lote_agora('contas_pagar', 'update', [
+            (baixa['id'], {
+                'acao': 'baixa_pagamento_lote',
+                'conta_bancaria_id': dados_baixa['conta_bancaria_id'],
+                'data_pagamento': dados_baixa['data_pagamento'],
+                'valor_pago': str(baixa['valor_pago'])
+            })
+            for baixa in resultado['contas']
+        ])
+    
+    return resultado
+
+@contas_pagar_bp.route('/baixar-lote', methods=['GET', 'POST'])
+@login_required
+def baixar_lote():
+    """Baixa de várias contas selecionadas na listagem"""
+    contas_ids = request.values.getlist('ids', type=int)
+    if not contas_ids:
+        flash('Selecione ao menos uma conta para dar baixa.', 'warning')
+        return redirect(url_for('contas_pagar.lista'))
+    
+    if request.method == 'POST':
+        try:
+            if not request.form.get('conta_bancaria_id'):
+                raise ValueError('Conta bancária é obrigatória para registrar pagamento!')
+            
+            dados_baixa = {
+                'conta_bancaria_id': int(request.form['conta_bancaria_id']),
+                'data_pagamento': request.form.get('data_pagamento')
+            }
+            resultado = _executar_baixa_lote(contas_ids, dados_baixa)
+            
+            flash(f"✅ {resultado['message']}. Saldo da conta bancária atualizado.", 'success')
+        except ValueError as e:
+            flash(f"Erro ao registrar pagamentos: {str(e)}", 'error')
+        except Exception as e:
+            flash(f"Erro ao processar pagamentos: {str(e)}", 'error')
+        
+        return redirect(url_for('contas_pagar.lista'))
+    
+    # GET - confirmar as contas selecionadas
+    contas = ContaPagarModel.get_by_ids(contas_ids[:MAXIMO_BAIXA_LOTE])
+    
+    from models.conta_bancaria import ContaBancariaModel
+    contas_bancarias = ContaBancariaModel.get_all({'ativo': True})
+    
+    total_original = sum(conta['valor_total'] for conta in contas if conta['status'] in ('pendente', 'vencido'))
+    
+    return render_template('contas_pagar/baixar_lote.html',
+                         contas=contas,
+                         contas_bancarias=contas_bancarias,
+                         total_original=total_original,
+                         today=date.today().strftime('%Y-%m-%d'))
+
+@contas_pagar_bp.route('/api/baixar-lote', methods=['POST'])
+@login_required
+def api_baixar_lote():
+    """
+    Baixa em lote via JSON
+    
+    Body: {"ids": [1, 2, 3], "conta_bancaria_id": 1, "data_pagamento": "2026-10-17"}
+    """
+    dados = request.get_json(silent=True) or {}
+    try:
+        contas_ids = [int(i) for i in dados.get('ids') or []]
+        if not dados.get('conta_bancaria_id'):
+            raise ValueError('Conta bancária é obrigatória')
+        
+        data_pagamento = dados.get('data_pagamento') or date.today().strftime('%Y-%m-%d')
+        try:
+            datetime.strptime(data_pagamento, '%Y-%m-%d')
+        except (ValueError, TypeError):
+            raise ValueError('Data de pagamento inválida (use AAAA-MM-DD)')
+        
+        dados_baixa = {
+            'conta_bancaria_id': int(dados['conta_bancaria_id']),
+            'data_pagamento': data_pagamento
+        }
+        resultado = _executar_baixa_lote(contas_ids, dados_baixa)
+        
+        return jsonify({
+            'success': True,
+            'message': resultado['message'],
+            'quantidade': resultado['quantidade'],
+            'total_pago': float(resultado['total_pago']),
+            'contas': [linha_json(baixa) for baixa in resultado['contas']]
+        })
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao registrar pagamentos: {str(e)}'}), 500
+
 @contas_pagar_bp.route('/cancelar/<int:conta_id>', methods=['POST'])
 @login_required
 @login_required
@@ -11,7 +11,9 @@ from models.tipo_servico import TipoServicoModel
 from models.centro_custo import CentroCustoModel
 from models.plano_conta import PlanoContaModel
 from models.filial import FilialModel
-from utils.auditoria import auditar_agora
+from utils.auditoria import auditar_agora, auditar_lote_agora
+from database import db
+from utils.paginacao import ORDENACOES, ORDEM_PADRAO, TAMANHOS_PAGINA, LIMITE_PADRAO, linha_json
 import mysql.connector
 
 contas_receber_bp = Blueprint('contas_receber', __name__, url_prefix='/contas-receber')
@@ -40,54 +42,84 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def _filtros_da_requisicao():
+    """Filtros da listagem lidos da query string (página e API)"""
+    data_inicio = request.args.get('data_inicio')
+    data_fim = request.args.get('data_fim')
+    
+    return {
+        'cliente_id': request.args.get('cliente_id', type=int),
+        'filial_id': request.args.get('filial_id', type=int),
+        'centro_custo_id': request.args.get('centro_custo_id', type=int),
+        'status': request.args.get('status') or None,
+        'data_inicio': datetime.strptime(data_inicio, '%Y-%m-%d').date() if data_inicio else None,
+        'data_fim': datetime.strptime(data_fim, '%Y-%m-%d').date() if data_fim else None
+    }
+
 @contas_receber_bp.route('/')
 @login_required
 @login_required
 def lista():
-    # Filtros
-    cliente_id = request.args.get('cliente_id', type=int)
-    filial_id = request.args.get('filial_id', type=int)
-    centro_custo_id = request.args.get('centro_custo_id', type=int)
-    status = request.args.get('status')
-    data_inicio = request.args.get('data_inicio')
-    data_fim = request.args.get('data_fim')
-    
-    # Converter datas
-    data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date() if data_inicio else None
-    data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date() if data_fim else None
-    
-    # Buscar contas
-    contas = ContaReceberModel.get_all(
-        cliente_id=cliente_id,
-        filial_id=filial_id,
-        centro_custo_id=centro_custo_id,
-        status=status,
-        data_inicio=data_inicio_obj,
-        data_fim=data_fim_obj
+    filtros = _filtros_da_requisicao()
+    
+    # Página atual (keyset) e totalizadores de todas as linhas filtradas
+    pagina = ContaReceberModel.get_pagina(
+        filtros,
+        cursor=request.args.get('cursor'),
+        limite=request.args.get('limite', LIMITE_PADRAO, type=int),
+        ordem=request.args.get('ordem', ORDEM_PADRAO)
     )
+    totalizadores = ContaReceberModel.get_totalizadores(filtros)
     
     # Buscar dados para filtros
     clientes = ClienteModel.get_all()
     filiais = FilialModel.get_all()
     centros_custos = CentroCustoModel.get_all()
     
-    # Calcular totalizadores
-    totalizadores = ContaReceberModel.get_totalizadores()
-    
-    return render_template('contas_receber/lista.html',
-                         contas=contas,
+    return render_template('contas_receber/lista.html', 
+                         contas=pagina['itens'],
+                         pagina=pagina,
+                         ordenacoes=ORDENACOES,
+                         tamanhos_pagina=TAMANHOS_PAGINA,
                          clientes=clientes,
                          filiais=filiais,
                          centros_custos=centros_custos,
                          totalizadores=totalizadores,
-                         filtros={
-                             'cliente_id': cliente_id,
-                             'filial_id': filial_id,
-                             'centro_custo_id': centro_custo_id,
-                             'status': status,
-                             'data_inicio': data_inicio,
-                             'data_fim': data_fim
-                         })
+                         filtros=filtros)
+
+@contas_receber_bp.route('/api/contas')
+@login_required
+def api_contas():
+    """
+    Listagem paginada em JSON, com os mesmos filtros, ordenação e cursor da página
+    
+    Os totalizadores só são calculados na primeira página (sem cursor), já que
+    não mudam ao navegar.
+    """
+    try:
+        filtros = _filtros_da_requisicao()
+        cursor = request.args.get('cursor')
+        
+        pagina = ContaReceberModel.get_pagina(
+            filtros,
+            cursor=cursor,
+            limite=request.args.get('limite', LIMITE_PADRAO, type=int),
+            ordem=request.args.get('ordem', ORDEM_PADRAO)
+        )
+        
+        resposta = {
+            'contas': [linha_json(conta) for conta in pagina['itens']],
+            'proximo_cursor': pagina['proximo_cursor'],
+            'cursor_anterior': pagina['cursor_anterior'],
+            'limite': pagina['limite'],
+            'ordem': pagina['ordem']
+        }
+        if not cursor:
+            resposta['totalizadores'] = linha_json(ContaReceberModel.get_totalizadores(filtros))
+        
+        return jsonify(resposta)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 @contas_receber_bp.route('/nova', methods=['GET', 'POST'])
 @login_required
@@ -217,30 +249,32 @@ def receber(conta_id):
                 'valor_desconto': valor_desconto
             }
             
-            # Registrar recebimento
-            ContaReceberModel.receber(conta_id, dados_recebimento)
-            
-            # Auditoria
-            auditar_agora('contas_receber', conta_id, 'update', {
-                'acao': 'recebimento',
-                'conta_bancaria_id': dados_recebimento['conta_bancaria_id'],
-                'data_recebimento': dados_recebimento['data_recebimento'].strftime('%Y-%m-%d'),
-                'valor_pago': str(valor_pago),
-                'valor_juros': str(valor_juros),
-                'valor_multa': str(valor_multa),
-                'valor_desconto': str(valor_desconto)
-            })
-            
-            # Movimentar conta bancária (creditar)
+            # Recebimento, crédito bancário e auditoria na mesma transação
             from models.conta_bancaria import ContaBancariaModel
-            try:
+            with db.unit_of_work():
+                ContaReceberModel.receber(conta_id, dados_recebimento)
+                
+                # Movimentar conta bancária (creditar)
                 ContaBancariaModel.creditar(
                     dados_recebimento['conta_bancaria_id'],
-                    valor_pago
+                    valor_pago,
+                    data_movimento=dados_recebimento['data_recebimento'],
+                    origem='conta_receber',
+                    origem_id=conta_id
                 )
-                flash(f'✅ Recebimento registrado com sucesso! Saldo da conta bancária atualizado.', 'success')
-            except ValueError as e:
-                flash(f'⚠️ Recebimento registrado, mas erro ao atualizar saldo: {str(e)}', 'warning')
+                
+                # Auditoria
+                auditar_agora('contas_receber', conta_id, 'update', {
+                    'acao': 'recebimento',
+                    'conta_bancaria_id': dados_recebimento['conta_bancaria_id'],
+                    'data_recebimento': dados_recebimento['data_recebimento'].strftime('%Y-%m-%d'),
+                    'valor_pago': str(valor_pago),
+                    'valor_juros': str(valor_juros),
+                    'valor_multa': str(valor_multa),
+                    'valor_desconto': str(valor_desconto)
+                })
+            
+            flash(f'✅ Recebimento registrado com sucesso! Saldo da conta bancária atualizado.', 'success')
             
             return redirect(url_for('contas_receber.lista'))
             
@@ -256,6 +290,75 @@ def receber(conta_id):
                          contas_bancarias=contas_bancarias,
                          today=date.today().strftime('%Y-%m-%d'))
 
+# Limite de itens por lote (mantém a transação e o FOR UPDATE curtos)
+MAXIMO_RECEBIMENTO_LOTE = 1000
+
+@contas_receber_bp.route('/api/receber-lote', methods=['POST'])
+@login_required
+def api_receber_lote():
+    """
+    Recebimento em lote via JSON (ex.: retorno bancário de boletos)
+    
+    Body: {
+        "conta_bancaria_id": 1,
+        "itens": [
+            {"id": 10, "data_recebimento": "2026-10-17", "valor_juros": 1.5, "valor_desconto": 0},
+            {"id": 11, "data_recebimento": "2026-10-16", "conta_bancaria_id": 2}
+        ]
+    }
+    
+    Itens inválidos são ignorados e voltam no relatório com o motivo.
+    """
+    dados = request.get_json(silent=True) or {}
+    itens = dados.get('itens') or []
+    
+    if not isinstance(itens, list) or not itens:
+        return jsonify({'success': False, 'message': 'Informe os itens do lote'}), 400
+    if len(itens) > MAXIMO_RECEBIMENTO_LOTE:
+        return jsonify({'success': False, 'message': f'Máximo de {MAXIMO_RECEBIMENTO_LOTE} itens por lote'}), 400
+    if not all(isinstance(item, dict) for item in itens):
+        return jsonify({'success': False, 'message': 'Cada item deve ser um objeto com "id"'}), 400
+    
+    try:
+        # Recebimentos, créditos bancários e auditoria na mesma transação
+        from models.conta_bancaria import ContaBancariaModel
+        with db.unit_of_work():
+            resultado = ContaReceberModel.receber_lote(itens, dados.get('conta_bancaria_id'))
+            
+            # Um crédito por conta bancária e data de recebimento com o total recebido
+            for (conta_bancaria_id, data_recebimento), (total, quantidade) in resultado['creditos'].items():
+                ContaBancariaModel.creditar(
+                    conta_bancaria_id, total,
+                    data_movimento=data_recebimento,
+                    origem='conta_receber_lote',
+                    descricao=f'Recebimento em lote de {quantidade} conta(s) a receber'
+                )
+            
+            # Auditoria de todos os recebimentos em um único INSERT
+            auditar_lote_agora('contas_receber', 'update', [
+                (recebido['id'], {
+                    'acao': 'recebimento_lote',
+                    'conta_bancaria_id': recebido['conta_bancaria_id'],
+                    'data_recebimento': recebido['data_recebimento'].strftime('%Y-%m-%d'),
+                    'valor_pago': str(recebido['valor_pago']),
+                    'valor_juros': str(recebido['valor_juros']),
+                    'valor_multa': str(recebido['valor_multa']),
+                    'valor_desconto': str(recebido['valor_desconto'])
+                })
+                for recebido in resultado['recebidos']
+            ])
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao registrar recebimentos: {str(e)}'}), 500
+    
+    return jsonify({
+        'success': resultado['success'],
+        'message': resultado['message'],
+        'quantidade': resultado['quantidade'],
+        'total_recebido': float(resultado['total_recebido']),
+        'por_conta_bancaria': {str(conta): float(total) for conta, total in resultado['por_conta_bancaria'].items()},
+        'itens': [linha_json(item) for item in resultado['itens']]
+    }), 200 if resultado['success'] else 422
+
 @contas_receber_bp.route('/<int:conta_id>/cancelar', methods=['POST'])
 @login_required
 @login_required
@@ -5,6 +5,7 @@ Rotas para Dashboard Financeiro
 from flask import Blueprint, render_template, jsonify, request, session, redirect, url_for
 from functools import wraps
 from models.dashboard import DashboardModel
+from utils.cache import cache_resposta
 from decimal import Decimal
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
@@ -23,8 +24,10 @@ def index():
     """Página principal do dashboard"""
     try:
         # Buscar dados do dashboard
-        kpis = DashboardModel.get_kpis_gerais()
-        inadimplencia = DashboardModel.get_inadimplencia()
+        # Agregação única por tabela, compartilhada pelos KPIs e pela inadimplência
+        agregados = DashboardModel.get_agregados()
+        kpis = DashboardModel.get_kpis_gerais(agregados)
+        inadimplencia = DashboardModel.get_inadimplencia(agregados)
         evolucao = DashboardModel.get_evolucao_mensal(meses=6)
         top_clientes = DashboardModel.get_top_clientes(limite=5)
         top_fornecedores = DashboardModel.get_top_fornecedores(limite=5)
@@ -45,6 +48,7 @@ def index():
 
 @dashboard_bp.route('/api/kpis')
 @login_required
+@cache_resposta('contas_receber', 'contas_pagar', 'lancamentos_manuais', 'contas_bancarias')
 def api_kpis():
     """API para buscar KPIs gerais"""
     try:
@@ -66,11 +70,13 @@ def api_kpis():
 
 @dashboard_bp.route('/api/evolucao')
 @login_required
+@cache_resposta('contas_receber', 'contas_pagar', 'lancamentos_manuais')
 def api_evolucao():
     """API para buscar evolução mensal"""
     try:
-        meses = request.args.get('meses', 6, type=int)
-        evolucao = DashboardModel.get_evolucao_mensal(meses=meses)
+        meses = min(max(request.args.get('meses', 6, type=int), 1), 120)
+        filial_id = request.args.get('filial_id', type=int)
+        evolucao = DashboardModel.get_evolucao_mensal(meses=meses, filial_id=filial_id)
         
         # Converter para formato JSON
         dados = {
@@ -104,6 +110,7 @@ def api_inadimplencia():
 
 @dashboard_bp.route('/api/top-clientes')
 @login_required
+@cache_resposta('contas_receber')
 def api_top_clientes():
     """API para buscar top clientes"""
     try:
@@ -3,9 +3,13 @@ Rotas para Fluxo de Caixa
 Visualização consolidada de entradas e saídas financeiras
 """
 
-from flask import Blueprint, render_template, request, jsonify
+import base64
+import json
+from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context
 from models.fluxo_caixa import FluxoCaixaModel
 from models.filial import FilialModel
+from services.projecao_fluxo import ProjecaoFluxoService, PERIODOS, AGRUPAMENTOS
+from utils.cache import cache_resposta
 from datetime import datetime, timedelta
 from decimal import Decimal
 
@@ -63,6 +67,7 @@ def index():
     )
 
 @fluxo_caixa_bp.route('/api/projecao')
+@cache_resposta('contas_receber', 'contas_pagar', 'lancamentos_manuais', 'contas_bancarias')
 def api_projecao():
     """API para retornar dados de projeção em JSON (para gráficos)"""
     
@@ -98,6 +103,141 @@ def api_projecao():
     
     return jsonify(dados)
 
+@fluxo_caixa_bp.route('/api/projecao/series')
+@cache_resposta('contas_receber', 'contas_pagar', 'lancamentos_manuais', 'contas_bancarias')
+def api_projecao_series():
+    """
+    API com várias séries de projeção de uma vez (uma por filial ou conta bancária)
+    
+    Parâmetros: data_inicio, data_fim, periodo (dia|semana|mes), agrupar_por
+    (filial|conta_bancaria, opcional), chaves (IDs separados por vírgula, opcional),
+    filial_id e conta_bancaria_id
+    """
+    
+    hoje = datetime.now().date()
+    
+    try:
+        data_inicio_str = request.args.get('data_inicio')
+        data_fim_str = request.args.get('data_fim')
+        data_inicio = datetime.strptime(data_inicio_str, '%Y-%m-%d').date() if data_inicio_str else hoje - timedelta(days=15)
+        data_fim = datetime.strptime(data_fim_str, '%Y-%m-%d').date() if data_fim_str else hoje + timedelta(days=15)
+        filial_id = int(request.args['filial_id']) if request.args.get('filial_id') else None
+        conta_bancaria_id = int(request.args['conta_bancaria_id']) if request.args.get('conta_bancaria_id') else None
+        chaves = request.args.get('chaves')
+        chaves = [int(chave) for chave in chaves.split(',') if chave.strip()] if chaves else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos'}), 400
+    
+    periodo = request.args.get('periodo', 'dia')
+    agrupar_por = request.args.get('agrupar_por') or None
+    if periodo not in PERIODOS or (agrupar_por and agrupar_por not in AGRUPAMENTOS):
+        return jsonify({'success': False, 'message': 'Período ou agrupamento inválido'}), 400
+    if data_fim < data_inicio:
+        return jsonify({'success': False, 'message': 'Data final anterior à inicial'}), 400
+    
+    resultado = ProjecaoFluxoService.projetar(
+        data_inicio, data_fim, periodo, agrupar_por, chaves, filial_id, conta_bancaria_id
+    )
+    
+    series = []
+    for chave, pontos in resultado.items():
+        series.append({
+            'chave': chave,
+            'datas': [p['data'].isoformat() for p in pontos],
+            'saldos': [float(p['saldo']) for p in pontos],
+            'entradas': [float(p['entradas']) for p in pontos],
+            'saidas': [float(p['saidas']) for p in pontos]
+        })
+    
+    return jsonify({'periodo': periodo, 'agrupar_por': agrupar_por, 'series': series})
+
+LIMITE_PAGINA_MOVIMENTACOES = 500
+
+
+def _codificar_cursor_movimentacao(movimento):
+    """Cursor opaco com (data, bloco, id) da última movimentação da página"""
+    texto = json.dumps([movimento['data'].isoformat(), movimento['bloco'], movimento['id']])
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor_movimentacao(cursor):
+    """Lê o cursor; None quando vazio ou inválido (volta para o início)"""
+    if not cursor:
+        return None
+    try:
+        data, bloco, movimento_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+        return datetime.strptime(data, '%Y-%m-%d').date(), int(bloco), int(movimento_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _movimentacao_json(movimento):
+    """Converte Decimal/date da movimentação para tipos serializáveis em JSON"""
+    return {
+        chave: float(valor) if isinstance(valor, Decimal)
+        else valor.isoformat() if hasattr(valor, 'isoformat')
+        else valor
+        for chave, valor in movimento.items()
+        if chave != 'bloco'
+    }
+
+
+@fluxo_caixa_bp.route('/api/movimentacoes')
+def api_movimentacoes():
+    """
+    API com as movimentações do período, sem montar a lista inteira na memória
+    
+    formato=ndjson: uma movimentação por linha, transmitida enquanto é lida do banco
+    (a primeira linha traz o resumo). Sem formato: página JSON com cursor (parâmetros
+    cursor e limite) e proximo_cursor para a página seguinte.
+    """
+    
+    hoje = datetime.now().date()
+    
+    try:
+        data_inicio_str = request.args.get('data_inicio')
+        data_fim_str = request.args.get('data_fim')
+        data_inicio = datetime.strptime(data_inicio_str, '%Y-%m-%d').date() if data_inicio_str else hoje - timedelta(days=15)
+        data_fim = datetime.strptime(data_fim_str, '%Y-%m-%d').date() if data_fim_str else hoje + timedelta(days=15)
+        filial_id = int(request.args['filial_id']) if request.args.get('filial_id') else None
+        conta_bancaria_id = int(request.args['conta_bancaria_id']) if request.args.get('conta_bancaria_id') else None
+        limite = int(request.args.get('limite', LIMITE_PAGINA_MOVIMENTACOES))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parâmetros inválidos'}), 400
+    
+    limite = max(1, min(limite, LIMITE_PAGINA_MOVIMENTACOES))
+    
+    if request.args.get('formato') == 'ndjson':
+        resumo = FluxoCaixaModel.get_resumo_movimentacoes(data_inicio, data_fim, filial_id, conta_bancaria_id)
+        
+        def gerar():
+            yield json.dumps({'resumo': _movimentacao_json(resumo)}) + '\n'
+            for movimento in FluxoCaixaModel.iter_movimentacoes(data_inicio, data_fim, filial_id, conta_bancaria_id):
+                yield json.dumps(_movimentacao_json(movimento)) + '\n'
+        
+        return Response(stream_with_context(gerar()), mimetype='application/x-ndjson')
+    
+    cursor = _decodificar_cursor_movimentacao(request.args.get('cursor'))
+    movimentos = list(FluxoCaixaModel.iter_movimentacoes(
+        data_inicio, data_fim, filial_id, conta_bancaria_id, apos=cursor, limite=limite + 1
+    ))
+    
+    tem_mais = len(movimentos) > limite
+    movimentos = movimentos[:limite]
+    
+    resposta = {
+        'itens': [_movimentacao_json(movimento) for movimento in movimentos],
+        'proximo_cursor': _codificar_cursor_movimentacao(movimentos[-1]) if tem_mais else None,
+        'limite': limite
+    }
+    # Totais só na primeira página: as seguintes não precisam refazer a agregação
+    if cursor is None:
+        resposta['resumo'] = _movimentacao_json(
+            FluxoCaixaModel.get_resumo_movimentacoes(data_inicio, data_fim, filial_id, conta_bancaria_id)
+        )
+    
+    return jsonify(resposta)
+
 @fluxo_caixa_bp.route('/api/resumo')
 def api_resumo():
     """API para retornar resumo do período em JSON"""
@@ -120,10 +260,9 @@ def api_resumo():
     
     filial_id = int(filial_id) if filial_id else None
     
-    movimentacoes = FluxoCaixaModel.get_movimentacoes(data_inicio, data_fim, filial_id)
+    resumo = FluxoCaixaModel.get_resumo_movimentacoes(data_inicio, data_fim, filial_id)
     saldo_inicial = FluxoCaixaModel.get_saldo_inicial(data_inicio, filial_id)
     
-    resumo = movimentacoes['resumo']
     resumo['saldo_inicial'] = float(saldo_inicial)
     resumo['saldo_final'] = float(saldo_inicial + resumo['saldo_realizado'])
     
@@ -3,6 +3,7 @@ Rotas para relatórios financeiros
 """
 from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
 from models.relatorios import Relatorios
+from utils.cache import cache_resposta
 from datetime import datetime, timedelta
 from decimal import Decimal
 import functools
@@ -151,6 +152,7 @@ def analise_vertical():
 # APIs JSON para consultas via AJAX
 @relatorios_bp.route('/api/dre')
 @login_required
+@cache_resposta('contas_receber', 'contas_pagar', 'lancamentos_manuais')
 def api_dre():
     """API JSON para DRE"""
     data_inicio = request.args.get('data_inicio')
@@ -0,0 +1,115 @@
+"""
+Agendador de tarefas diárias
+Roda em uma thread daemon do próprio processo: executa as tarefas na inicialização
+e depois uma vez por dia no horário configurado (Config.AGENDADOR_HORARIO)
+"""
+import threading
+from datetime import datetime, timedelta
+from config import Config
+
+
+def atualizar_status_vencidas():
+    """Marca como vencidas as contas a pagar e a receber pendentes com vencimento passado"""
+    from models.conta_pagar import ContaPagarModel
+    from models.conta_receber import ContaReceberModel
+    
+    pagar = ContaPagarModel.atualizar_status_vencidas()
+    receber = ContaReceberModel.atualizar_status_vencidas()
+    print(f"[agendador] Contas vencidas atualizadas: {pagar} a pagar, {receber} a receber")
+
+
+def gerar_checkpoints_saldo():
+    """Fecha os saldos mensais das contas bancárias para os meses encerrados"""
+    from models.movimento_bancario import MovimentoBancarioModel
+    
+    gravados = MovimentoBancarioModel.gerar_checkpoints()
+    if gravados:
+        print(f"[agendador] Checkpoints de saldo bancário gravados: {gravados}")
+
+
+def gerar_checkpoints_fluxo():
+    """Fecha o saldo realizado mensal (fluxo de caixa / DFC) dos meses encerrados"""
+    from models.saldo_fluxo import SaldoFluxoModel
+    
+    gravados = SaldoFluxoModel.gerar_checkpoints()
+    if gravados:
+        print(f"[agendador] Checkpoints de saldo do fluxo gravados: {gravados}")
+
+
+# Tarefas executadas na inicialização e diariamente
+TAREFAS_DIARIAS = [atualizar_status_vencidas, gerar_checkpoints_saldo, gerar_checkpoints_fluxo]
+
+
+def _segundos_ate_proxima_execucao(horario, agora=None):
+    """Segundos até a próxima ocorrência de horario (HH:MM)"""
+    agora = agora or datetime.now()
+    hora, minuto = (int(parte) for parte in horario.split(':'))
+    proxima = agora.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+    if proxima <= agora:
+        proxima += timedelta(days=1)
+    return (proxima - agora).total_seconds()
+
+
+class Agendador:
+    """Executa TAREFAS_DIARIAS agora e depois a cada dia no horário informado"""
+    
+    def __init__(self, horario='00:05', tarefas=None):
+        self.horario = horario
+        self.tarefas = tarefas if tarefas is not None else TAREFAS_DIARIAS
+        self._timer = None
+        self._lock = threading.Lock()
+        self._parado = False
+    
+    def executar_tarefas(self):
+        """Executa todas as tarefas; a falha de uma não impede as demais nem o reagendamento"""
+        for tarefa in self.tarefas:
+            try:
+                tarefa()
+            except Exception as e:
+                print(f"[agendador] Erro em {tarefa.__name__}: {e}")
+    
+    def _agendar(self, segundos):
+        with self._lock:
+            if self._parado:
+                return
+            self._timer = threading.Timer(segundos, self._disparar)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def _disparar(self):
+        self.executar_tarefas()
+        self._agendar(_segundos_ate_proxima_execucao(self.horario))
+    
+    def iniciar(self):
+        """Executa as tarefas em segundo plano (sem atrasar a subida do app) e agenda as próximas"""
+        self._agendar(0)
+    
+    def parar(self):
+        with self._lock:
+            self._parado = True
+            if self._timer:
+                self._timer.cancel()
+
+
+_agendador = None
+_agendador_lock = threading.Lock()
+
+
+def iniciar_agendador():
+    """
+    Inicia o agendador do processo (uma única vez)
+    
+    As tarefas são idempotentes, então rodar em mais de um processo não causa
+    problema, só trabalho repetido. Com vários workers, AGENDADOR_ATIVO=false
+    nos demais evita a repetição.
+    """
+    global _agendador
+    if not Config.AGENDADOR_ATIVO or _agendador is not None:
+        return _agendador
+    
+    # Chamado a cada requisição: as primeiras, simultâneas, não iniciam duas threads
+    with _agendador_lock:
+        if _agendador is None:
+            _agendador = Agendador(horario=Config.AGENDADOR_HORARIO)
+            _agendador.iniciar()
+    return _agendador
@@ -0,0 +1,217 @@
+"""
+Atribuição um-para-um das sugestões de conciliação
+Cada linha do extrato e cada transação do sistema entram em no máximo um par: os pares
+pontuados formam um grafo bipartido, separado em componentes conexos, e cada componente
+é resolvido pelo algoritmo húngaro (ou guloso com reparo, quando é grande demais)
+"""
+import numpy as np
+
+# Componentes com mais linhas ou colunas que isso usam o guloso com reparo (húngaro é O(n³))
+LIMITE_HUNGARO = 200
+
+# Passadas máximas de reparo do guloso
+PASSADAS_REPARO = 5
+
+
+class _UniaoBusca:
+    """Union-find com compressão de caminho e união por tamanho"""
+    
+    def __init__(self):
+        self.pai = {}
+        self.tamanho = {}
+    
+    def encontrar(self, x):
+        if x not in self.pai:
+            self.pai[x] = x
+            self.tamanho[x] = 1
+            return x
+        raiz = x
+        while self.pai[raiz] != raiz:
+            raiz = self.pai[raiz]
+        while self.pai[x] != raiz:
+            self.pai[x], x = raiz, self.pai[x]
+        return raiz
+    
+    def unir(self, a, b):
+        a, b = self.encontrar(a), self.encontrar(b)
+        if a == b:
+            return
+        if self.tamanho[a] < self.tamanho[b]:
+            a, b = b, a
+        self.pai[b] = a
+        self.tamanho[a] += self.tamanho[b]
+
+
+def hungaro(pesos):
+    """
+    Emparelhamento de peso máximo em uma matriz de pesos (0 = par inexistente)
+    
+    Algoritmo húngaro com potenciais (O(n²·m)), com o laço interno vetorizado em numpy.
+    
+    Args:
+        pesos: Matriz (linhas x colunas) de pesos não negativos
+    
+    Returns:
+        list: Pares (linha, coluna) escolhidos com peso > 0
+    """
+    pesos = np.asarray(pesos, dtype=float)
+    transposta = pesos.shape[0] > pesos.shape[1]
+    if transposta:
+        pesos = pesos.T
+    n, m = pesos.shape
+    if n == 0:
+        return []
+    
+    # Minimiza o custo -peso; par inexistente custa 0, o mesmo que deixar sem par
+    custo = -pesos
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)    # p[j]: linha (1..n) atribuída à coluna j
+    caminho = np.zeros(m + 1, dtype=np.int64)
+    
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        usada = np.zeros(m + 1, dtype=bool)
+        
+        while True:
+            usada[j0] = True
+            i0 = p[j0]
+            livres = ~usada[1:]
+            atual = custo[i0 - 1] - u[i0] - v[1:]
+            melhora = livres & (atual < minv[1:])
+            minv[1:][melhora] = atual[melhora]
+            caminho[1:][melhora] = j0
+            
+            candidatos = np.where(livres, minv[1:], np.inf)
+            j1 = int(np.argmin(candidatos)) + 1
+            delta = candidatos[j1 - 1]
+            
+            u[p[usada]] += delta
+            v[usada] -= delta
+            minv[1:][livres] -= delta
+            
+            j0 = j1
+            if p[j0] == 0:
+                break
+        
+        while j0:
+            j1 = caminho[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    
+    pares = [(int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j] and pesos[p[j] - 1, j - 1] > 0]
+    if transposta:
+        pares = [(coluna, linha) for linha, coluna in pares]
+    return pares
+
+
+def guloso_com_reparo(arestas):
+    """
+    Emparelhamento guloso (maior peso primeiro) seguido de trocas que aumentam o total
+    
+    O reparo procura, para cada linha sem par, a coluna já ocupada cujo dono possa
+    migrar para outra coluna livre com ganho total positivo (caminho aumentante curto).
+    
+    Args:
+        arestas: Lista de (linha, coluna, peso)
+    
+    Returns:
+        list: Pares (linha, coluna) escolhidos
+    """
+    por_linha = {}
+    for linha, coluna, peso in arestas:
+        por_linha.setdefault(linha, {})[coluna] = peso
+    
+    linha_da_coluna = {}
+    coluna_da_linha = {}
+    for linha, coluna, peso in sorted(arestas, key=lambda aresta: -aresta[2]):
+        if linha not in coluna_da_linha and coluna not in linha_da_coluna:
+            coluna_da_linha[linha] = coluna
+            linha_da_coluna[coluna] = linha
+    
+    for _ in range(PASSADAS_REPARO):
+        trocou = False
+        for linha, opcoes in por_linha.items():
+            if linha in coluna_da_linha:
+                continue
+            melhor = None
+            for coluna, peso in opcoes.items():
+                dono = linha_da_coluna.get(coluna)
+                if dono is None:
+                    if melhor is None or peso > melhor[0]:
+                        melhor = (peso, coluna, None, None)
+                    continue
+                for outra, peso_outra in por_linha[dono].items():
+                    if outra == coluna or outra in linha_da_coluna:
+                        continue
+                    ganho = peso + peso_outra - por_linha[dono][coluna]
+                    if ganho > 0 and (melhor is None or ganho > melhor[0]):
+                        melhor = (ganho, coluna, dono, outra)
+            if melhor is None:
+                continue
+            _ganho, coluna, dono, outra = melhor
+            if dono is not None:
+                coluna_da_linha[dono] = outra
+                linha_da_coluna[outra] = dono
+            coluna_da_linha[linha] = coluna
+            linha_da_coluna[coluna] = linha
+            trocou = True
+        if not trocou:
+            break
+    
+    return list(coluna_da_linha.items())
+
+
+def atribuir(pares, limite_hungaro=LIMITE_HUNGARO):
+    """
+    Escolhe um conjunto de pares sem conflito (cada linha e cada coluna no máximo uma vez)
+    
+    Args:
+        pares: Lista de (linha, coluna, peso); linha e coluna são chaves quaisquer
+               (ex.: id da linha do extrato e (tipo, id) da transação do sistema)
+        limite_hungaro (int): Tamanho máximo de componente resolvido pelo húngaro
+    
+    Returns:
+        set: Índices (em pares) dos pares escolhidos
+    """
+    # Maior peso por (linha, coluna), caso o mesmo par venha repetido
+    melhores = {}
+    for indice, (linha, coluna, peso) in enumerate(pares):
+        atual = melhores.get((linha, coluna))
+        if peso > 0 and (atual is None or peso > pares[atual][2]):
+            melhores[(linha, coluna)] = indice
+    
+    conjuntos = _UniaoBusca()
+    for linha, coluna in melhores:
+        conjuntos.unir(('l', linha), ('c', coluna))
+    
+    componentes = {}
+    for (linha, coluna), indice in melhores.items():
+        componentes.setdefault(conjuntos.encontrar(('l', linha)), []).append(indice)
+    
+    escolhidos = set()
+    for indices in componentes.values():
+        # Componente de um par só (o caso mais comum): nada a decidir
+        if len(indices) == 1:
+            escolhidos.update(indices)
+            continue
+        
+        linhas = sorted({pares[i][0] for i in indices}, key=repr)
+        colunas = sorted({pares[i][1] for i in indices}, key=repr)
+        posicao_linha = {linha: k for k, linha in enumerate(linhas)}
+        posicao_coluna = {coluna: k for k, coluna in enumerate(colunas)}
+        indice_do_par = {(posicao_linha[pares[i][0]], posicao_coluna[pares[i][1]]): i for i in indices}
+        
+        if max(len(linhas), len(colunas)) <= limite_hungaro:
+            pesos = np.zeros((len(linhas), len(colunas)))
+            for (l, c), i in indice_do_par.items():
+                pesos[l, c] = pares[i][2]
+            resultado = hungaro(pesos)
+        else:
+            resultado = guloso_com_reparo([(l, c, pares[i][2]) for (l, c), i in indice_do_par.items()])
+        
+        escolhidos.update(indice_do_par[par] for par in resultado)
+    
+    return escolhidos
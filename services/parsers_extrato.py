@@ -1,23 +1,56 @@
 """
 Parsers para extratos bancários
 Cada banco tem seu formato específico de extrato
+
+As planilhas são lidas em streaming (openpyxl em modo somente leitura): as linhas
+são percorridas uma a uma e os lançamentos saem por um gerador, com memória
+constante mesmo para extratos de vários anos. processar_extrato abre o arquivo uma
+única vez para detectar o banco e ler os lançamentos.
 """
-import pandas as pd
-from datetime import datetime
-from decimal import Decimal
-from typing import List, Dict
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterator, List
 import re
+from openpyxl import load_workbook
+
+
+def abrir_planilha(arquivo_path: str):
+    """Abre a pasta de trabalho em modo somente leitura, com os valores (não fórmulas)"""
+    return load_workbook(arquivo_path, read_only=True, data_only=True)
+
+
+def planilha_completa(wb, nome: str):
+    """
+    Planilha da pasta aberta por abrir_planilha, lida até a última linha real
+    
+    No modo somente leitura o openpyxl confia na dimensão gravada no arquivo, e alguns
+    exportadores gravam uma faixa menor que a usada: a leitura pararia no meio do extrato.
+    """
+    ws = wb[nome]
+    ws.reset_dimensions()
+    return ws
+
 
 class ParserExtratoBase:
     """Classe base para parsers de extrato"""
     
-    def __init__(self, arquivo_path: str):
+    # Planilha com os lançamentos (definida em cada banco)
+    planilha = None
+    
+    def __init__(self, arquivo_path: str, workbook=None):
+        """
+        Args:
+            arquivo_path: Caminho do arquivo
+            workbook: Pasta de trabalho já aberta (abrir_planilha); quem abriu fecha
+        """
         self.arquivo_path = arquivo_path
         self.nome_arquivo = arquivo_path.split('\\')[-1].split('/')[-1]
+        self.workbook = workbook
     
     def parse(self) -> List[Dict]:
         """
-        Método abstrato que deve ser implementado por cada parser específico
+        Lê o extrato inteiro
         
         Returns:
             List[Dict]: Lista de lançamentos processados com estrutura padrão:
@@ -29,13 +62,47 @@ class ParserExtratoBase:
                 - complemento: str (opcional)
                 - saldo_apos: Decimal (opcional)
         """
+        return list(self.iter_lancamentos())
+    
+    def iter_lancamentos(self) -> Iterator[Dict]:
+        """Lançamentos do extrato, um a um, na estrutura descrita em parse()"""
+        if self.workbook is not None:
+            yield from self.processar_linhas(planilha_completa(self.workbook, self.planilha))
+            return
+        
+        wb = abrir_planilha(self.arquivo_path)
+        try:
+            yield from self.processar_linhas(planilha_completa(wb, self.planilha))
+        finally:
+            wb.close()
+    
+    def processar_linhas(self, ws) -> Iterator[Dict]:
+        """
+        Método abstrato que deve ser implementado por cada parser específico
+        
+        Args:
+            ws: Planilha aberta em modo somente leitura
+        """
         raise NotImplementedError()
     
+    @staticmethod
+    def texto(celula) -> str:
+        """Valor da célula como texto ('' para célula vazia; números inteiros sem '.0')"""
+        if celula is None:
+            return ''
+        if isinstance(celula, float) and celula.is_integer():
+            return str(int(celula))
+        return str(celula).strip()
+    
     def limpar_valor(self, valor_str) -> Decimal:
-        """Converte string de valor para Decimal"""
-        if pd.isna(valor_str) or valor_str is None or valor_str == '':
+        """Converte o valor da célula (número ou texto no formato 1.234,56) para Decimal"""
+        if valor_str is None or valor_str == '':
             return Decimal('0')
         
+        # Célula numérica: o valor já vem pronto (o ponto é o separador decimal)
+        if isinstance(valor_str, (int, float, Decimal)) and not isinstance(valor_str, bool):
+            return Decimal(str(valor_str))
+        
         # Remove espaços e converte para string
         valor_str = str(valor_str).strip()
         
@@ -47,14 +114,20 @@ class ParserExtratoBase:
         
         try:
             return Decimal(valor_str)
-        except:
+        except InvalidOperation:
             return Decimal('0')
     
-    def converter_data(self, data_str) -> datetime:
-        """Converte string de data para datetime"""
-        if pd.isna(data_str):
+    def converter_data(self, data_str) -> date:
+        """Converte o valor da célula (data do Excel ou texto) para date"""
+        if data_str is None:
             return None
         
+        # Célula de data: openpyxl já entrega datetime
+        if isinstance(data_str, datetime):
+            return data_str.date()
+        if isinstance(data_str, date):
+            return data_str
+        
         # Tentar diferentes formatos
         formatos = ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y']
         
@@ -63,7 +136,7 @@ class ParserExtratoBase:
         for formato in formatos:
             try:
                 return datetime.strptime(data_str, formato).date()
-            except:
+            except ValueError:
                 continue
         
         return None
@@ -72,39 +145,38 @@ class ParserExtratoBase:
 class ParserItau(ParserExtratoBase):
     """Parser para extratos do Itaú"""
     
-    def parse(self) -> List[Dict]:
-        # Ler arquivo Excel pulando cabeçalho
-        df = pd.read_excel(self.arquivo_path, sheet_name='Lançamentos', skiprows=6)
-        
-        lancamentos = []
+    planilha = 'Lançamentos'
+    
+    # Cabeçalho do relatório: a tabela de lançamentos começa depois da linha "Data"
+    LINHA_INICIAL = 8
+    
+    def processar_linhas(self, ws) -> Iterator[Dict]:
+        linhas = ws.iter_rows(min_row=self.LINHA_INICIAL, values_only=True)
         
         # A partir da linha que tem "Data" como primeiro campo, são os lançamentos
-        inicio_dados = None
-        for idx, row in df.iterrows():
-            if str(row.iloc[0]).strip() == 'Data':
-                inicio_dados = idx + 1
+        for row in linhas:
+            if row and self.texto(row[0]) == 'Data':
                 break
-        
-        if inicio_dados is None:
-            return []
+        else:
+            return
         
         # Processar lançamentos
-        for idx in range(inicio_dados, len(df)):
-            row = df.iloc[idx]
+        for row in linhas:
+            row = tuple(row) + (None,) * (6 - len(row))
             
             # Pular linhas vazias ou totalizadoras
-            if pd.isna(row.iloc[0]) or str(row.iloc[0]).strip() in ['', 'Periodo:', 'Lançamentos']:
+            if self.texto(row[0]) in ['', 'Periodo:', 'Lançamentos']:
                 continue
             
-            data = self.converter_data(row.iloc[0])
+            data = self.converter_data(row[0])
             if data is None:
                 continue
             
-            lancamento_tipo = str(row.iloc[1]) if not pd.isna(row.iloc[1]) else ''
-            razao_social = str(row.iloc[2]) if not pd.isna(row.iloc[2]) else ''
-            cpf_cnpj = str(row.iloc[3]) if not pd.isna(row.iloc[3]) else ''
-            valor = self.limpar_valor(row.iloc[4])
-            saldo = self.limpar_valor(row.iloc[5]) if len(row) > 5 else None
+            lancamento_tipo = self.texto(row[1])
+            razao_social = self.texto(row[2])
+            cpf_cnpj = self.texto(row[3])
+            valor = self.limpar_valor(row[4])
+            saldo = self.limpar_valor(row[5]) if row[5] is not None else None
             
             # Determinar tipo de movimento (valor negativo = débito)
             tipo_movimento = 'debito' if valor < 0 else 'credito'
@@ -112,116 +184,164 @@ class ParserItau(ParserExtratoBase):
             
             # Montar histórico
             historico = f"{lancamento_tipo}"
-            if razao_social and razao_social != 'nan':
+            if razao_social:
                 historico += f" - {razao_social}"
             
-            complemento = f"CPF/CNPJ: {cpf_cnpj}" if cpf_cnpj and cpf_cnpj != 'nan' else None
+            complemento = f"CPF/CNPJ: {cpf_cnpj}" if cpf_cnpj else None
             
-            lancamentos.append({
+            yield {
                 'data_lancamento': data,
                 'historico': historico.strip(),
                 'valor': valor_abs,
                 'tipo_movimento': tipo_movimento,
-                'documento': cpf_cnpj if cpf_cnpj != 'nan' else None,
+                'documento': cpf_cnpj or None,
                 'complemento': complemento,
                 'saldo_apos': saldo,
                 'banco_origem': 'ITAU'
-            })
-        
-        return lancamentos
+            }
 
 
 class ParserBancoBrasil(ParserExtratoBase):
     """Parser para extratos do Banco do Brasil"""
     
-    def parse(self) -> List[Dict]:
-        # Ler arquivo Excel pulando cabeçalho
-        df = pd.read_excel(self.arquivo_path, sheet_name='Extrato', skiprows=2)
+    planilha = 'Extrato'
+    
+    # Linha com os nomes das colunas (as duas primeiras são o título do relatório)
+    LINHA_CABECALHO = 3
+    
+    COLUNAS = {
+        'data': 'Data',
+        'historico': 'Historico',
+        'valor': 'Valor R$',
+        'inf': 'Inf.',
+        'detalhamento': 'Detalhamento Hist.',
+        'documento': 'Numero Documento',
+        'codigo_historico': 'Cod. Historico'
+    }
+    
+    def processar_linhas(self, ws) -> Iterator[Dict]:
+        linhas = ws.iter_rows(min_row=self.LINHA_CABECALHO, values_only=True)
         
-        lancamentos = []
+        cabecalho = next(linhas, None)
+        if not cabecalho:
+            return
         
-        for idx, row in df.iterrows():
+        # Posição de cada coluna pelo nome (sem depender de espaços sobrando no cabeçalho)
+        nomes = [self.texto(celula) for celula in cabecalho]
+        posicao = {
+            chave: nomes.index(nome) if nome in nomes else None
+            for chave, nome in self.COLUNAS.items()
+        }
+        if posicao['data'] is None:
+            return
+        
+        def coluna(row, chave):
+            indice = posicao[chave]
+            return row[indice] if indice is not None and indice < len(row) else None
+        
+        for row in linhas:
+            historico = self.texto(coluna(row, 'historico'))
+            
             # Pular saldo anterior e linhas vazias
-            if pd.isna(row['Data']) or 'Saldo Anterior' in str(row.get('Historico', '')):
+            if coluna(row, 'data') is None or 'Saldo Anterior' in historico:
                 continue
             
             # Pular linha de SALDO final
-            if 'S A L D O' in str(row.get('Historico', '')):
+            if 'S A L D O' in historico:
                 continue
             
-            data = self.converter_data(row['Data'])
+            data = self.converter_data(coluna(row, 'data'))
             if data is None:
                 continue
             
-            historico = str(row.get('Historico', '')) if not pd.isna(row.get('Historico')) else ''
-            valor_str = str(row.get('Valor R$ ', '0'))
-            tipo_str = str(row.get('Inf.', '')).strip().upper()
-            detalhamento = str(row.get('Detalhamento Hist.', '')) if not pd.isna(row.get('Detalhamento Hist.')) else ''
-            documento = str(row.get('Numero Documento', '')) if not pd.isna(row.get('Numero Documento')) else ''
-            codigo_hist = str(row.get('Cod. Historico', '')) if not pd.isna(row.get('Cod. Historico')) else ''
+            tipo_str = self.texto(coluna(row, 'inf')).upper()
+            detalhamento = self.texto(coluna(row, 'detalhamento'))
+            documento = self.texto(coluna(row, 'documento'))
+            codigo_hist = self.texto(coluna(row, 'codigo_historico'))
             
-            valor = self.limpar_valor(valor_str)
+            valor = self.limpar_valor(coluna(row, 'valor'))
             
             # Determinar tipo de movimento (C = crédito, D = débito)
             tipo_movimento = 'credito' if tipo_str == 'C' else 'debito'
             
             # Complemento com detalhamento
             complemento_parts = []
-            if detalhamento and detalhamento != 'nan':
+            if detalhamento:
                 complemento_parts.append(detalhamento)
-            if codigo_hist and codigo_hist != 'nan':
+            if codigo_hist:
                 complemento_parts.append(f"Cód: {codigo_hist}")
             
             complemento = ' | '.join(complemento_parts) if complemento_parts else None
             
-            lancamentos.append({
+            yield {
                 'data_lancamento': data,
-                'historico': historico.strip(),
+                'historico': historico,
                 'valor': valor,
                 'tipo_movimento': tipo_movimento,
-                'documento': documento if documento != 'nan' else None,
+                'documento': documento or None,
                 'complemento': complemento,
                 'saldo_apos': None,  # BB não fornece saldo por linha neste formato
                 'banco_origem': 'BANCO DO BRASIL',
-                'codigo_historico': codigo_hist if codigo_hist != 'nan' else None
-            })
-        
-        return lancamentos
+                'codigo_historico': codigo_hist or None
+            }
 
 
-def detectar_banco(arquivo_path: str) -> str:
+def detectar_banco_planilha(wb) -> str:
     """
-    Detecta qual banco baseado no conteúdo do arquivo
+    Detecta o banco pelos nomes das planilhas e pelo título, na pasta já aberta
     
     Returns:
         str: 'itau', 'banco_brasil', ou 'desconhecido'
     """
     try:
-        # Tentar ler as primeiras linhas
-        xl = pd.ExcelFile(arquivo_path)
-        
         # Itaú tem planilha "Lançamentos"
-        if 'Lançamentos' in xl.sheet_names:
+        if 'Lançamentos' in wb.sheetnames:
             return 'itau'
         
         # Banco do Brasil tem planilha "Extrato"
-        if 'Extrato' in xl.sheet_names:
-            # Ler primeiras linhas para confirmar
-            df = pd.read_excel(arquivo_path, sheet_name='Extrato', nrows=5)
-            if 'Extrato Conta Corrente' in df.columns:
+        if 'Extrato' in wb.sheetnames:
+            # Conferir o título na primeira linha
+            primeira = next(planilha_completa(wb, 'Extrato').iter_rows(min_row=1, max_row=1, values_only=True), ())
+            if 'Extrato Conta Corrente' in [ParserExtratoBase.texto(celula) for celula in primeira]:
                 return 'banco_brasil'
         
         return 'desconhecido'
-    except:
+    except Exception:
         return 'desconhecido'
 
 
-def criar_parser(arquivo_path: str) -> ParserExtratoBase:
+def detectar_banco(arquivo_path: str) -> str:
+    """
+    Detecta qual banco baseado no conteúdo do arquivo
+    
+    Returns:
+        str: 'itau', 'banco_brasil', ou 'desconhecido'
+    """
+    try:
+        wb = abrir_planilha(arquivo_path)
+    except Exception:
+        return 'desconhecido'
+    
+    try:
+        return detectar_banco_planilha(wb)
+    finally:
+        wb.close()
+
+
+PARSERS = {
+    'itau': ParserItau,
+    'banco_brasil': ParserBancoBrasil
+}
+
+
+def criar_parser(arquivo_path: str, workbook=None, banco: str = None) -> ParserExtratoBase:
     """
     Cria o parser apropriado baseado no tipo de banco
     
     Args:
         arquivo_path: Caminho do arquivo
+        workbook: Pasta de trabalho já aberta, repassada ao parser
+        banco: Banco já detectado (evita detectar de novo)
     
     Returns:
         ParserExtratoBase: Parser específico do banco
@@ -229,11 +349,68 @@ def criar_parser(arquivo_path: str) -> ParserExtratoBase:
     Raises:
         ValueError: Se o banco não for reconhecido
     """
-    banco = detectar_banco(arquivo_path)
+    if banco is None:
+        banco = detectar_banco_planilha(workbook) if workbook is not None else detectar_banco(arquivo_path)
     
-    if banco == 'itau':
-        return ParserItau(arquivo_path)
-    elif banco == 'banco_brasil':
-        return ParserBancoBrasil(arquivo_path)
-    else:
+    if banco not in PARSERS:
         raise ValueError(f"Formato de extrato não reconhecido. Banco: {banco}")
+    
+    return PARSERS[banco](arquivo_path, workbook=workbook)
+
+
+def normalizar_lancamentos(lancamentos: List[Dict]) -> List[Dict]:
+    """Converte os lançamentos dos parsers para o formato das transações da conciliação"""
+    return [
+        {
+            'data_transacao': lanc['data_lancamento'],
+            'descricao': lanc['historico'],
+            'documento': lanc.get('documento', ''),
+            'valor': abs(float(lanc['valor'])),
+            'tipo': lanc['tipo_movimento'],  # já vem como 'credito' ou 'debito'
+            'saldo_apos': float(lanc['saldo_apos']) if lanc.get('saldo_apos') else None
+        }
+        for lanc in lancamentos
+    ]
+
+
+def processar_extrato(arquivo_path: str) -> Dict:
+    """
+    Abre o extrato uma única vez, detecta o banco nessa mesma pasta de trabalho,
+    lê os lançamentos e normaliza para a conciliação
+    
+    Returns:
+        dict: {'banco', 'transacoes', 'tempos'}, com o tempo de cada etapa em
+        segundos (abrir, detectar, ler, normalizar)
+    
+    Raises:
+        ValueError: Se o arquivo não puder ser aberto ou o banco não for reconhecido
+    """
+    tempos = {}
+    
+    inicio = time.perf_counter()
+    try:
+        wb = abrir_planilha(arquivo_path)
+    except Exception as e:
+        raise ValueError(f"Não foi possível abrir o arquivo como planilha Excel: {e}")
+    tempos['abrir'] = time.perf_counter() - inicio
+    
+    try:
+        inicio = time.perf_counter()
+        banco = detectar_banco_planilha(wb)
+        tempos['detectar'] = time.perf_counter() - inicio
+        
+        if banco not in PARSERS:
+            raise ValueError('Não foi possível identificar o formato do arquivo. Certifique-se de usar '
+                             'um extrato do Itaú ou Banco do Brasil.')
+        
+        inicio = time.perf_counter()
+        lancamentos = criar_parser(arquivo_path, workbook=wb, banco=banco).parse()
+        tempos['ler'] = time.perf_counter() - inicio
+    finally:
+        wb.close()
+    
+    inicio = time.perf_counter()
+    transacoes = normalizar_lancamentos(lancamentos)
+    tempos['normalizar'] = time.perf_counter() - inicio
+    
+    return {'banco': banco, 'transacoes': transacoes, 'tempos': tempos}
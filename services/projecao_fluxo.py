@@ -0,0 +1,170 @@
+"""
+Motor de projeção de fluxo de caixa
+Carrega as movimentações diárias em arrays de centavos inteiros e calcula, com
+bincount/cumsum, as séries de saldo de várias contas bancárias ou filiais de uma vez
+"""
+from decimal import Decimal
+
+import numpy as np
+
+from models.fato_financeiro import FatoFinanceiroModel
+from models.saldo_fluxo import SaldoFluxoModel
+
+PERIODOS = ('dia', 'semana', 'mes')
+AGRUPAMENTOS = ('filial', 'conta_bancaria')
+
+
+def _centavos(valor):
+    return int((Decimal(str(valor)) * 100).to_integral_value())
+
+
+def _reais(centavos):
+    return Decimal(int(centavos)) / 100
+
+
+def _somar_por_posicao(posicoes, valores, tamanho):
+    """
+    Soma os valores por posição (bincount)
+    
+    bincount acumula em float64, que é exato para inteiros até 2^53 centavos (~90 trilhões
+    de reais); o arredondamento final só desfaz a representação em float.
+    """
+    if not len(posicoes):
+        return np.zeros(tamanho, dtype=np.int64)
+    return np.rint(np.bincount(posicoes, weights=valores, minlength=tamanho)).astype(np.int64)
+
+
+class ProjecaoFluxoService:
+    """Séries diárias, semanais ou mensais de entradas, saídas e saldo projetado"""
+    
+    @staticmethod
+    def calcular_series(data_inicio, data_fim, linhas, saldos_iniciais, periodo='dia'):
+        """
+        Calcula as séries a partir das movimentações já carregadas (sem acesso ao banco)
+        
+        Args:
+            data_inicio (date): Primeiro dia da projeção
+            data_fim (date): Último dia da projeção
+            linhas: Iterável de (data, indice_serie, entradas_centavos, saidas_centavos);
+                indice_serie None soma a linha em todas as séries
+            saldos_iniciais: Saldo inicial de cada série, em centavos
+            periodo (str): 'dia', 'semana' (iniciada na segunda-feira) ou 'mes'
+        
+        Returns:
+            dict: {'datas': array de datetime64[D] com o início de cada período,
+                   'entradas', 'saidas', 'saldos': matrizes int64 (série x período) em centavos}
+        """
+        if periodo not in PERIODOS:
+            raise ValueError(f"Período inválido: {periodo}")
+        
+        n_series = len(saldos_iniciais)
+        dias = np.arange(np.datetime64(data_inicio, 'D'), np.datetime64(data_fim, 'D') + 1)
+        n_dias = len(dias)
+        
+        linhas = list(linhas)
+        offsets = np.array([(linha[0] - data_inicio).days for linha in linhas], dtype=np.int64)
+        indices = np.array([-1 if linha[1] is None else linha[1] for linha in linhas], dtype=np.int64)
+        entradas = np.array([linha[2] for linha in linhas], dtype=np.int64)
+        saidas = np.array([linha[3] for linha in linhas], dtype=np.int64)
+        
+        dentro = (offsets >= 0) & (offsets < n_dias)
+        proprias = dentro & (indices >= 0)
+        comuns = dentro & (indices < 0)
+        
+        # Matriz (série x dia): cada série ocupa uma faixa de n_dias posições
+        posicoes = indices[proprias] * n_dias + offsets[proprias]
+        tamanho = n_series * n_dias
+        entradas_dia = _somar_por_posicao(posicoes, entradas[proprias], tamanho).reshape(n_series, n_dias)
+        saidas_dia = _somar_por_posicao(posicoes, saidas[proprias], tamanho).reshape(n_series, n_dias)
+        
+        if comuns.any():
+            entradas_dia += _somar_por_posicao(offsets[comuns], entradas[comuns], n_dias)
+            saidas_dia += _somar_por_posicao(offsets[comuns], saidas[comuns], n_dias)
+        
+        saldos_dia = (np.asarray(saldos_iniciais, dtype=np.int64)[:, None]
+                      + np.cumsum(entradas_dia - saidas_dia, axis=1))
+        
+        if periodo == 'dia':
+            return {'datas': dias, 'entradas': entradas_dia, 'saidas': saidas_dia, 'saldos': saldos_dia}
+        
+        if periodo == 'mes':
+            rotulos = dias.astype('datetime64[M]')
+        else:
+            # 1970-01-01 foi uma quinta-feira: (dia + 3) // 7 numera as semanas de segunda a domingo
+            rotulos = (dias.astype(np.int64) + 3) // 7
+        
+        inicios = np.flatnonzero(np.r_[True, rotulos[1:] != rotulos[:-1]])
+        fins = np.r_[inicios[1:] - 1, n_dias - 1]
+        
+        return {
+            'datas': dias[inicios],
+            'entradas': np.add.reduceat(entradas_dia, inicios, axis=1),
+            'saidas': np.add.reduceat(saidas_dia, inicios, axis=1),
+            'saldos': saldos_dia[:, fins]
+        }
+    
+    @staticmethod
+    def projetar(data_inicio, data_fim, periodo='dia', agrupar_por=None, chaves=None,
+                 filial_id=None, conta_bancaria_id=None):
+        """
+        Projeção de saldo para o período, total ou por filial / conta bancária
+        
+        Cada série tem os mesmos valores de FluxoCaixaModel.get_projecao_diaria com o
+        filtro da sua chave (lançamentos manuais entram em todas as contas bancárias).
+        
+        Args:
+            data_inicio (date): Data inicial
+            data_fim (date): Data final
+            periodo (str): 'dia', 'semana' ou 'mes'
+            agrupar_por (str): None (série única), 'filial' ou 'conta_bancaria'
+            chaves (list): IDs das séries; padrão: os que têm movimentação no período
+            filial_id (int): Filtrar por filial (opcional)
+            conta_bancaria_id (int): Filtrar por conta bancária (opcional)
+        
+        Returns:
+            dict: {chave: [{'data', 'entradas', 'saidas', 'saldo'}, ...]} com valores
+            Decimal; a chave é None quando não há agrupamento
+        """
+        if agrupar_por is not None and agrupar_por not in AGRUPAMENTOS:
+            raise ValueError(f"Agrupamento inválido: {agrupar_por}")
+        
+        linhas = FatoFinanceiroModel.get_por_dia_centavos(
+            data_inicio, data_fim, agrupar_por, filial_id, conta_bancaria_id
+        )
+        
+        if agrupar_por is None:
+            chaves = [None]
+        elif chaves is None:
+            # Sem filial / sem conta (0) não é uma série: o filtro 0 não filtra nada
+            chaves = sorted({linha[1] for linha in linhas if linha[1] and not linha[2]})
+        else:
+            chaves = [int(chave) for chave in chaves]
+        
+        posicao = {chave: i for i, chave in enumerate(chaves)}
+        if agrupar_por is None:
+            movimentos = ((linha[0], 0, linha[3], linha[4]) for linha in linhas)
+        else:
+            movimentos = (
+                (linha[0], None if linha[2] else posicao[linha[1]], linha[3], linha[4])
+                for linha in linhas
+                if linha[2] or linha[1] in posicao
+            )
+        
+        saldos = SaldoFluxoModel.get_saldos_iniciais(data_inicio, agrupar_por, chaves, filial_id, conta_bancaria_id)
+        saldos_iniciais = [_centavos(saldos[chave]) for chave in chaves]
+        
+        series = ProjecaoFluxoService.calcular_series(data_inicio, data_fim, movimentos, saldos_iniciais, periodo)
+        
+        datas = series['datas'].astype(object)
+        return {
+            chave: [
+                {
+                    'data': datas[j],
+                    'entradas': _reais(series['entradas'][i, j]),
+                    'saidas': _reais(series['saidas'][i, j]),
+                    'saldo': _reais(series['saldos'][i, j])
+                }
+                for j in range(len(datas))
+            ]
+            for i, chave in enumerate(chaves)
+        }
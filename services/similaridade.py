@@ -0,0 +1,185 @@
+"""
+Similaridade de textos para a conciliação bancária
+Substitui o difflib.SequenceMatcher (quadrático por par) por coeficientes de Dice sobre
+conjuntos de tokens e de trigramas de caracteres, calculados sobre textos normalizados
+e preparados uma única vez
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+import numpy as np
+
+from config import Config
+
+# Abaixo disso o laço simples é mais rápido que montar os arrays do modo em lote
+LOTE_MINIMO = 32
+
+_RE_NAO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e só com letras/dígitos separados por um espaço"""
+    texto = unicodedata.normalize('NFKD', str(texto or '').lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _RE_NAO_ALFANUMERICO.sub(' ', texto).strip()
+
+
+class TextoPreparado:
+    """Texto normalizado com seus tokens e trigramas (e os hashes usados no modo em lote)"""
+    
+    __slots__ = ('texto', 'tokens', 'trigramas', '_hashes')
+    
+    def __init__(self, texto):
+        self.texto = normalizar(texto)
+        self.tokens = frozenset(self.texto.split())
+        # Espaços nas pontas: início e fim de palavra também viram trigramas
+        acolchoado = f"  {self.texto} "
+        self.trigramas = frozenset(acolchoado[i:i + 3] for i in range(len(acolchoado) - 2)) if self.texto else frozenset()
+        self._hashes = {}
+    
+    def hashes(self, atributo):
+        """Hashes (int64, ordenados) dos tokens ou trigramas, para o modo em lote"""
+        if atributo not in self._hashes:
+            self._hashes[atributo] = np.unique(
+                np.fromiter((hash(item) for item in getattr(self, atributo)), dtype=np.int64)
+            )
+        return self._hashes[atributo]
+
+
+@lru_cache(maxsize=65536)
+def preparar(texto):
+    """TextoPreparado do texto (em cache: a mesma descrição é preparada uma vez só)"""
+    return TextoPreparado(texto)
+
+
+def _como_preparado(texto):
+    return texto if isinstance(texto, TextoPreparado) else preparar(str(texto or ''))
+
+
+def _dice(a, b):
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def similaridade_tokens(a, b):
+    """Dice dos conjuntos de palavras: ignora a ordem e palavras repetidas"""
+    return _dice(a.tokens, b.tokens)
+
+
+def similaridade_trigramas(a, b):
+    """Dice dos trigramas de caracteres: tolera abreviações e erros de digitação"""
+    return _dice(a.trigramas, b.trigramas)
+
+
+def similaridade_combinada(a, b):
+    """Média de tokens e trigramas"""
+    return (similaridade_tokens(a, b) + similaridade_trigramas(a, b)) / 2
+
+
+def similaridade_sequencia(a, b):
+    """SequenceMatcher sobre os textos normalizados (comportamento anterior; lento)"""
+    return SequenceMatcher(None, a.texto, b.texto).ratio()
+
+
+# Métodos disponíveis: nome -> (função por par, atributos comparados no modo em lote)
+METODOS = {
+    'tokens': (similaridade_tokens, ('tokens',)),
+    'trigramas': (similaridade_trigramas, ('trigramas',)),
+    'combinada': (similaridade_combinada, ('tokens', 'trigramas')),
+    'sequencia': (similaridade_sequencia, None)
+}
+
+
+def _metodo(nome):
+    nome = nome or Config.CONCILIACAO_SIMILARIDADE
+    if nome not in METODOS:
+        raise ValueError(f"Método de similaridade desconhecido: {nome}")
+    return METODOS[nome]
+
+
+def similaridade(a, b, metodo=None):
+    """
+    Similaridade entre dois textos, de 0 a 1
+    
+    Args:
+        a, b: Textos (str) ou TextoPreparado
+        metodo (str): Chave de METODOS (padrão: Config.CONCILIACAO_SIMILARIDADE)
+    """
+    funcao, _atributos = _metodo(metodo)
+    return funcao(_como_preparado(a), _como_preparado(b))
+
+
+class CandidatosPreparados:
+    """
+    Conjunto fixo de candidatos indexado para o modo em lote
+    
+    Os hashes de todos os candidatos ficam em um array ordenado (com o candidato dono de
+    cada um): pontuar um texto é uma busca binária por hash dele e um bincount dos donos
+    encontrados, sem percorrer os itens dos candidatos. Reutilizável entre várias linhas.
+    """
+    
+    def __init__(self, candidatos):
+        self.candidatos = [_como_preparado(candidato) for candidato in candidatos]
+        self._indices = {}
+    
+    def __len__(self):
+        return len(self.candidatos)
+    
+    def _indice(self, atributo):
+        if atributo not in self._indices:
+            hashes = [candidato.hashes(atributo) for candidato in self.candidatos]
+            tamanhos = np.fromiter((len(h) for h in hashes), dtype=np.int64, count=len(hashes))
+            todos = np.concatenate(hashes) if hashes else np.empty(0, dtype=np.int64)
+            dono = np.repeat(np.arange(len(hashes)), tamanhos)
+            ordem = np.argsort(todos, kind='stable')
+            self._indices[atributo] = (todos[ordem], dono[ordem], tamanhos)
+        return self._indices[atributo]
+    
+    def dice(self, base, atributo):
+        """Dice de base contra todos os candidatos (array na ordem dos candidatos)"""
+        todos, dono, tamanhos = self._indice(atributo)
+        hashes_base = base.hashes(atributo)
+        
+        esquerda = np.searchsorted(todos, hashes_base, side='left')
+        direita = np.searchsorted(todos, hashes_base, side='right')
+        encontrados = [dono[a:b] for a, b in zip(esquerda, direita) if b > a]
+        em_comum = np.bincount(
+            np.concatenate(encontrados) if encontrados else np.empty(0, dtype=np.int64),
+            minlength=len(self.candidatos)
+        )
+        
+        total = tamanhos + len(hashes_base)
+        validos = (tamanhos > 0) & (len(hashes_base) > 0)
+        return np.where(validos, 2 * em_comum / np.maximum(total, 1), 0.0)
+
+
+def similaridade_lote(base, candidatos, metodo=None):
+    """
+    Similaridade de um texto contra vários, de 0 a 1, na ordem dos candidatos
+    
+    A partir de LOTE_MINIMO candidatos os métodos de conjunto são calculados com numpy
+    (ver CandidatosPreparados); 'sequencia' é sempre par a par. Para pontuar várias
+    linhas contra os mesmos candidatos, passe um CandidatosPreparados já montado.
+    
+    Returns:
+        list: Uma similaridade por candidato
+    """
+    funcao, atributos = _metodo(metodo)
+    base = _como_preparado(base)
+    
+    if isinstance(candidatos, CandidatosPreparados):
+        preparados = candidatos
+    else:
+        candidatos = [_como_preparado(candidato) for candidato in candidatos]
+        if atributos is None or len(candidatos) < LOTE_MINIMO:
+            return [funcao(base, candidato) for candidato in candidatos]
+        preparados = CandidatosPreparados(candidatos)
+    
+    if atributos is None:
+        return [funcao(base, candidato) for candidato in preparados.candidatos]
+    
+    resultado = sum(preparados.dice(base, atributo) for atributo in atributos) / len(atributos)
+    return resultado.tolist()
@@ -0,0 +1,170 @@
+"""
+Script de teste dos parsers de extrato (services/parsers_extrato.py)
+Gera planilhas no formato do Itaú e do Banco do Brasil em um diretório temporário,
+confere os lançamentos lidos e mede a leitura de um extrato grande, sem banco
+
+Uso: python test_parsers_extrato.py
+"""
+import os
+import re
+import tempfile
+import time
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from openpyxl import Workbook
+from services.parsers_extrato import ParserItau, criar_parser, detectar_banco, processar_extrato
+
+
+def _planilha_itau(caminho, quantidade=3):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Lançamentos')
+    ws.append(['Extrato Conta Corrente'])
+    for _ in range(5):
+        ws.append([])
+    ws.append(['Periodo:', '01/01/2026 a 31/01/2026'])
+    ws.append(['Lançamentos'])
+    ws.append(['Data', 'Lançamento', 'Razão Social', 'CPF/CNPJ', 'Valor (R$)', 'Saldo (R$)'])
+    inicio = date(2026, 1, 1)
+    for i in range(quantidade):
+        # Alterna células de data/número com texto, como nas exportações reais
+        data = datetime.combine(inicio + timedelta(days=i % 365), datetime.min.time())
+        if i % 2:
+            data = data.strftime('%d/%m/%Y')
+        valor = -150.5 if i % 3 == 0 else '1.234,56'
+        ws.append([data, 'PIX ENVIADO' if i % 3 == 0 else 'TED RECEBIDA', f'EMPRESA {i}',
+                   12345678000190, valor, 1000.25])
+    ws.append([])
+    wb.save(caminho)
+
+
+def _planilha_bb(caminho):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Extrato')
+    ws.append(['Extrato Conta Corrente'])
+    ws.append(['Agência 1234 Conta 56789-0'])
+    ws.append(['Data', 'Dependencia Origem', 'Historico', 'Data do Balancete', 'Numero Documento',
+               'Valor R$ ', 'Inf.', 'Detalhamento Hist.', 'Cod. Historico'])
+    ws.append(['31/12/2025', '', 'Saldo Anterior', '', '', 5000, 'C', '', ''])
+    ws.append([datetime(2026, 1, 2), '', 'Pagamento de Boleto', '', 98765, 320.4, 'D', 'FORNECEDOR X', 109])
+    ws.append(['03/01/2026', '', 'Pix - Recebido', '', '', '2.500,00', 'C', None, None])
+    ws.append([None, '', 'S A L D O', '', '', 7179.6, 'C', '', ''])
+    wb.save(caminho)
+
+
+def _gravar_dimensao(caminho, dimensao):
+    """Regrava a dimensão da planilha, como fazem alguns exportadores com uma faixa errada"""
+    with zipfile.ZipFile(caminho) as origem:
+        arquivos = {nome: origem.read(nome) for nome in origem.namelist()}
+    xml = arquivos['xl/worksheets/sheet1.xml'].decode('utf-8')
+    xml = re.sub(r'<dimension [^>]*/>', '', xml)
+    xml = xml.replace('<sheetViews>', f'<dimension ref="{dimensao}"/><sheetViews>', 1)
+    arquivos['xl/worksheets/sheet1.xml'] = xml.encode('utf-8')
+    with zipfile.ZipFile(caminho, 'w', zipfile.ZIP_DEFLATED) as destino:
+        for nome, conteudo in arquivos.items():
+            destino.writestr(nome, conteudo)
+
+
+def test_itau(diretorio):
+    """Datas e valores como célula nativa ou texto"""
+    caminho = os.path.join(diretorio, 'itau.xlsx')
+    _planilha_itau(caminho)
+    
+    assert detectar_banco(caminho) == 'itau'
+    lancamentos = criar_parser(caminho).parse()
+    
+    assert len(lancamentos) == 3
+    assert lancamentos[0]['data_lancamento'] == date(2026, 1, 1)
+    assert lancamentos[0]['valor'] == Decimal('150.5') and lancamentos[0]['tipo_movimento'] == 'debito'
+    assert lancamentos[1]['data_lancamento'] == date(2026, 1, 2)
+    assert lancamentos[1]['valor'] == Decimal('1234.56') and lancamentos[1]['tipo_movimento'] == 'credito'
+    assert lancamentos[1]['historico'] == 'TED RECEBIDA - EMPRESA 1'
+    assert lancamentos[1]['documento'] == '12345678000190'
+    assert lancamentos[2]['saldo_apos'] == Decimal('1000.25')
+    print("✓ Itaú")
+
+
+def test_banco_brasil(diretorio):
+    """Colunas pelo nome do cabeçalho, saldo anterior e final ignorados"""
+    caminho = os.path.join(diretorio, 'bb.xlsx')
+    _planilha_bb(caminho)
+    
+    assert detectar_banco(caminho) == 'banco_brasil'
+    lancamentos = criar_parser(caminho).parse()
+    
+    assert len(lancamentos) == 2
+    assert lancamentos[0]['data_lancamento'] == date(2026, 1, 2)
+    assert lancamentos[0]['valor'] == Decimal('320.4') and lancamentos[0]['tipo_movimento'] == 'debito'
+    assert lancamentos[0]['documento'] == '98765'
+    assert lancamentos[0]['complemento'] == 'FORNECEDOR X | Cód: 109'
+    assert lancamentos[1]['valor'] == Decimal('2500.00') and lancamentos[1]['tipo_movimento'] == 'credito'
+    assert lancamentos[1]['complemento'] is None
+    print("✓ Banco do Brasil")
+
+
+def test_processar_extrato(diretorio):
+    """Pipeline com uma única abertura: banco, transações normalizadas e tempos por etapa"""
+    caminho = os.path.join(diretorio, 'bb.xlsx')
+    _planilha_bb(caminho)
+    
+    extrato = processar_extrato(caminho)
+    
+    assert extrato['banco'] == 'banco_brasil'
+    assert set(extrato['tempos']) == {'abrir', 'detectar', 'ler', 'normalizar'}
+    assert extrato['transacoes'][0] == {
+        'data_transacao': date(2026, 1, 2),
+        'descricao': 'Pagamento de Boleto',
+        'documento': '98765',
+        'valor': 320.4,
+        'tipo': 'debito',
+        'saldo_apos': None
+    }
+    
+    desconhecido = os.path.join(diretorio, 'outro.xlsx')
+    Workbook().save(desconhecido)
+    try:
+        processar_extrato(desconhecido)
+        assert False, 'formato desconhecido deveria ser recusado'
+    except ValueError:
+        pass
+    print("✓ Pipeline de importação")
+
+
+def test_dimensao_errada(diretorio):
+    """Dimensão gravada menor que a planilha não corta a leitura nem a detecção"""
+    caminho = os.path.join(diretorio, 'itau_dimensao.xlsx')
+    _planilha_itau(caminho, 20)
+    _gravar_dimensao(caminho, 'A1:F3')
+    assert detectar_banco(caminho) == 'itau'
+    assert len(criar_parser(caminho).parse()) == 20
+    
+    caminho = os.path.join(diretorio, 'bb_dimensao.xlsx')
+    _planilha_bb(caminho)
+    _gravar_dimensao(caminho, 'A2:F3')
+    assert detectar_banco(caminho) == 'banco_brasil'
+    assert len(criar_parser(caminho).parse()) == 2
+    print("✓ Dimensão errada no arquivo")
+
+
+def test_extrato_grande(diretorio, quantidade=100000):
+    """Leitura em streaming de um extrato grande"""
+    caminho = os.path.join(diretorio, 'itau_grande.xlsx')
+    _planilha_itau(caminho, quantidade)
+    
+    inicio = time.perf_counter()
+    total = sum(1 for _ in ParserItau(caminho).iter_lancamentos())
+    duracao = time.perf_counter() - inicio
+    
+    assert total == quantidade
+    print(f"✓ {quantidade} lançamentos lidos em {duracao:.2f}s ({quantidade / duracao:.0f} linhas/s)")
+
+
+if __name__ == '__main__':
+    print("=== TESTE DOS PARSERS DE EXTRATO ===\n")
+    with tempfile.TemporaryDirectory() as diretorio:
+        test_itau(diretorio)
+        test_banco_brasil(diretorio)
+        test_processar_extrato(diretorio)
+        test_dimensao_errada(diretorio)
+        test_extrato_grande(diretorio)
+    print("\n✅ Todos os testes passaram")
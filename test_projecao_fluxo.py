@@ -0,0 +1,125 @@
+"""
+Script de regressão do motor de projeção (services/projecao_fluxo.py)
+Compara as séries vetorizadas com o cálculo dia a dia em Decimal (implementação
+anterior de FluxoCaixaModel.get_projecao_diaria) sobre uma massa fixa, sem banco.
+O que o motor lê do banco é conferido em test_projecao_fluxo_banco.py
+
+Uso: python test_projecao_fluxo.py
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from services.projecao_fluxo import ProjecaoFluxoService
+
+
+def _massa(semente=42, inicio=date(2024, 1, 1), dias=800, contas=(1, 2, 3)):
+    """Movimentos diários por conta (None = lançamento manual, entra em todas as contas)"""
+    rnd = random.Random(semente)
+    movimentos = []
+    for _ in range(5000):
+        data = inicio + timedelta(days=rnd.randrange(-30, dias + 30))
+        conta = rnd.choice(contas + (None,))
+        entrada = Decimal(rnd.randrange(0, 5_000_000)) / 100
+        saida = Decimal(rnd.randrange(0, 5_000_000)) / 100
+        movimentos.append((data, conta, entrada, saida))
+    return movimentos
+
+
+def _projecao_decimal(data_inicio, data_fim, saldo_inicial, movimentos, conta):
+    """Laço dia a dia original, sobre os movimentos filtrados como no filtro de conta"""
+    mov_por_data = {}
+    for data, conta_mov, entrada, saida in movimentos:
+        if not (data_inicio <= data <= data_fim) or conta_mov not in (conta, None):
+            continue
+        dia = mov_por_data.setdefault(data, {'entradas': Decimal('0'), 'saidas': Decimal('0')})
+        dia['entradas'] += entrada
+        dia['saidas'] += saida
+    
+    projecao = []
+    saldo_atual = saldo_inicial
+    data_atual = data_inicio
+    while data_atual <= data_fim:
+        if data_atual in mov_por_data:
+            saldo_atual += mov_por_data[data_atual]['entradas']
+            saldo_atual -= mov_por_data[data_atual]['saidas']
+        projecao.append({
+            'data': data_atual,
+            'saldo': saldo_atual,
+            'entradas': mov_por_data.get(data_atual, {}).get('entradas', Decimal('0')),
+            'saidas': mov_por_data.get(data_atual, {}).get('saidas', Decimal('0'))
+        })
+        data_atual += timedelta(days=1)
+    return projecao
+
+
+def _agrupar(projecao, chave_periodo):
+    """Soma entradas/saídas e pega o último saldo de cada período da projeção diária"""
+    periodos = {}
+    for ponto in projecao:
+        chave = chave_periodo(ponto['data'])
+        if chave not in periodos:
+            periodos[chave] = {'data': ponto['data'], 'entradas': Decimal('0'), 'saidas': Decimal('0')}
+        periodos[chave]['entradas'] += ponto['entradas']
+        periodos[chave]['saidas'] += ponto['saidas']
+        periodos[chave]['saldo'] = ponto['saldo']
+    return list(periodos.values())
+
+
+def _series_vetorizadas(data_inicio, data_fim, saldos, movimentos, contas, periodo):
+    posicao = {conta: i for i, conta in enumerate(contas)}
+    linhas = [
+        (data, None if conta is None else posicao[conta], int(entrada * 100), int(saida * 100))
+        for data, conta, entrada, saida in movimentos
+    ]
+    series = ProjecaoFluxoService.calcular_series(
+        data_inicio, data_fim, linhas, [int(saldo * 100) for saldo in saldos], periodo
+    )
+    datas = series['datas'].astype(object)
+    return [
+        [
+            {
+                'data': datas[j],
+                'entradas': Decimal(int(series['entradas'][i, j])) / 100,
+                'saidas': Decimal(int(series['saidas'][i, j])) / 100,
+                'saldo': Decimal(int(series['saldos'][i, j])) / 100
+            }
+            for j in range(len(datas))
+        ]
+        for i in range(len(contas))
+    ]
+
+
+def test_projecao(periodo='dia'):
+    """Séries do motor == cálculo em Decimal, para cada conta e período"""
+    contas = (1, 2, 3)
+    data_inicio, data_fim = date(2024, 1, 10), date(2026, 3, 5)
+    saldos = [Decimal('1000.50'), Decimal('-250.07'), Decimal('0')]
+    movimentos = _massa(contas=contas)
+    
+    chaves_periodo = {
+        'dia': lambda d: d,
+        'semana': lambda d: d - timedelta(days=d.weekday()),
+        'mes': lambda d: (d.year, d.month)
+    }
+    
+    vetorizadas = _series_vetorizadas(data_inicio, data_fim, saldos, movimentos, contas, periodo)
+    for i, conta in enumerate(contas):
+        esperado = _agrupar(
+            _projecao_decimal(data_inicio, data_fim, saldos[i], movimentos, conta),
+            chaves_periodo[periodo]
+        )
+        assert vetorizadas[i] == esperado, f"Divergência na conta {conta} ({periodo})"
+    
+    print(f"✓ {periodo}: {len(contas)} contas x {len(vetorizadas[0])} períodos idênticos")
+    return True
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("REGRESSÃO DO MOTOR DE PROJEÇÃO")
+    print("=" * 50)
+    
+    for periodo in ('dia', 'semana', 'mes'):
+        test_projecao(periodo)
+    
+    print("\n" + "=" * 50)
@@ -0,0 +1,113 @@
+"""
+Script de regressão da leitura do motor de projeção no banco configurado (.env)
+Confere, dia a dia e para os mesmos filtros, que o que o motor lê de
+fato_financeiro_diario (get_por_dia_centavos / projetar) bate com as somas das
+movimentações de FluxoCaixaModel.get_movimentacoes (as consultas da implementação
+anterior sobre as tabelas de origem), e que os saldos iniciais agrupados batem com
+get_saldo_inicial por chave. Só leitura
+
+Uso: python test_projecao_fluxo_banco.py
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from database import DatabaseManager
+from models.fato_financeiro import FatoFinanceiroModel
+from models.fluxo_caixa import FluxoCaixaModel
+from models.saldo_fluxo import SaldoFluxoModel
+from services.projecao_fluxo import ProjecaoFluxoService
+
+INICIO = date.today() - timedelta(days=180)
+FIM = date.today() + timedelta(days=180)
+
+
+def _chaves(coluna):
+    """Filiais / contas bancárias com movimentação nas tabelas de origem"""
+    db = DatabaseManager()
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {coluna} FROM contas_receber WHERE {coluna} IS NOT NULL
+            UNION
+            SELECT {coluna} FROM contas_pagar WHERE {coluna} IS NOT NULL
+        """)
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def _esperado(filial_id=None, conta_bancaria_id=None):
+    """Entradas e saídas por dia somadas das movimentações (listas da tela de fluxo)"""
+    movimentacoes = FluxoCaixaModel.get_movimentacoes(INICIO, FIM, filial_id, conta_bancaria_id)
+    por_dia = {}
+    for chave in ('entradas', 'saidas'):
+        for movimento in movimentacoes[chave]:
+            dia = por_dia.setdefault(movimento['data'], {'entradas': Decimal('0'), 'saidas': Decimal('0')})
+            dia[chave] += Decimal(str(movimento['valor']))
+    return por_dia
+
+
+def _comparar(descricao, esperado, serie):
+    """serie: {data: {'entradas', 'saidas'}}; dias sem movimento valem zero nos dois lados"""
+    divergencias = []
+    for data in sorted(set(esperado) | set(serie)):
+        a = esperado.get(data, {'entradas': Decimal('0'), 'saidas': Decimal('0')})
+        b = serie.get(data, {'entradas': Decimal('0'), 'saidas': Decimal('0')})
+        if a['entradas'] != b['entradas'] or a['saidas'] != b['saidas']:
+            divergencias.append((data, a, b))
+    
+    assert not divergencias, f"{descricao}: {len(divergencias)} dias divergentes, ex.: {divergencias[:3]}"
+    print(f"✓ {descricao}")
+
+
+def _lido_do_fato(filial_id=None, conta_bancaria_id=None):
+    linhas = FatoFinanceiroModel.get_por_dia_centavos(INICIO, FIM, None, filial_id, conta_bancaria_id)
+    por_dia = {}
+    for data, _chave, _comum, entradas, saidas in linhas:
+        dia = por_dia.setdefault(data, {'entradas': Decimal('0'), 'saidas': Decimal('0')})
+        dia['entradas'] += Decimal(int(entradas)) / 100
+        dia['saidas'] += Decimal(int(saidas)) / 100
+    return por_dia
+
+
+def _da_projecao(serie):
+    return {ponto['data']: ponto for ponto in serie
+            if ponto['entradas'] or ponto['saidas']}
+
+
+def test_leitura_por_filtro():
+    """get_por_dia_centavos e a série única de projetar, sem filtro e por filial / conta"""
+    filtros = [(None, None)]
+    filtros += [(filial, None) for filial in _chaves('filial_id')]
+    filtros += [(None, conta) for conta in _chaves('conta_bancaria_id')]
+    
+    for filial_id, conta_bancaria_id in filtros:
+        esperado = _esperado(filial_id, conta_bancaria_id)
+        descricao = f"filial={filial_id} conta={conta_bancaria_id}"
+        _comparar(f"get_por_dia_centavos {descricao}", esperado, _lido_do_fato(filial_id, conta_bancaria_id))
+        serie = ProjecaoFluxoService.projetar(
+            INICIO, FIM, 'dia', filial_id=filial_id, conta_bancaria_id=conta_bancaria_id
+        )[None]
+        _comparar(f"projetar {descricao}", esperado, _da_projecao(serie))
+
+
+def test_series_agrupadas():
+    """Cada série agrupada igual à projeção filtrada pela chave, com o mesmo saldo inicial"""
+    for agrupar_por, coluna in (('filial', 'filial_id'), ('conta_bancaria', 'conta_bancaria_id')):
+        chaves = _chaves(coluna)
+        if not chaves:
+            continue
+        
+        series = ProjecaoFluxoService.projetar(INICIO, FIM, 'dia', agrupar_por=agrupar_por, chaves=chaves)
+        saldos = SaldoFluxoModel.get_saldos_iniciais(INICIO, agrupar_por, chaves)
+        for chave in chaves:
+            filtro = {'filial_id': chave} if agrupar_por == 'filial' else {'conta_bancaria_id': chave}
+            _comparar(f"série {agrupar_por}={chave}", _esperado(**filtro), _da_projecao(series[chave]))
+            
+            unico = SaldoFluxoModel.get_saldo_inicial(INICIO, **filtro)
+            assert saldos[chave] == unico, f"saldo inicial {agrupar_por}={chave}: {saldos[chave]} != {unico}"
+        print(f"✓ Saldos iniciais agrupados por {agrupar_por}")
+
+
+if __name__ == '__main__':
+    print("=== REGRESSÃO DA LEITURA DO MOTOR DE PROJEÇÃO (BANCO) ===\n")
+    test_leitura_por_filtro()
+    test_series_agrupadas()
+    print("\n✅ Todos os testes passaram")
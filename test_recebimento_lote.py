@@ -0,0 +1,103 @@
+"""
+Script de teste do recebimento em lote (ContaReceberModel.receber_lote) dentro de
+um unit_of_work, com um pool falso no lugar do MySQL
+
+Uso: python test_recebimento_lote.py
+"""
+import os
+from database import DatabaseManager
+from models.conta_receber import ContaReceberModel
+
+
+class _CursorFalso:
+    """Nenhuma conta encontrada: todo item do lote é inválido"""
+    
+    rowcount = 0
+    lastrowid = None
+    description = None
+    
+    def execute(self, operation, params=None, *args, **kwargs):
+        pass
+    
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        pass
+    
+    def fetchall(self):
+        return []
+    
+    def fetchone(self):
+        return None
+    
+    def close(self):
+        pass
+
+
+class _ConexaoFalsa:
+    def __init__(self):
+        self.in_transaction = False
+        self.commits = 0
+        self.rollbacks = 0
+    
+    def cursor(self, *args, **kwargs):
+        return _CursorFalso()
+    
+    def commit(self):
+        self.commits += 1
+    
+    def rollback(self):
+        self.rollbacks += 1
+    
+    def ping(self, reconnect=False):
+        pass
+
+
+class _PoolFalso:
+    def __init__(self):
+        self.conexao = _ConexaoFalsa()
+    
+    def acquire(self):
+        return self.conexao
+    
+    def release(self, connection):
+        pass
+
+
+def _usar_pool_falso():
+    pool = _PoolFalso()
+    DatabaseManager._pool = pool
+    DatabaseManager._pool_pid = os.getpid()
+    return pool
+
+
+def test_lote_todo_invalido():
+    """Lote sem nenhum item válido: relatório por item, sem desfazer a unidade"""
+    pool = _usar_pool_falso()
+    db = DatabaseManager()
+    
+    with db.unit_of_work():
+        resultado = ContaReceberModel.receber_lote([{'id': 999}, {'id': 'x'}], conta_bancaria_id=1)
+    
+    assert resultado['success'] is False
+    assert resultado['quantidade'] == 0
+    assert [item['success'] for item in resultado['itens']] == [False, False]
+    assert resultado['itens'][0]['message'] == 'Conta não encontrada'
+    assert pool.conexao.commits == 1 and pool.conexao.rollbacks == 0
+    print("✓ Lote todo inválido devolve o relatório por item")
+
+
+def test_lote_todo_invalido_fora_da_unidade():
+    """Fora de um unit_of_work o próprio model libera as linhas travadas"""
+    pool = _usar_pool_falso()
+    
+    resultado = ContaReceberModel.receber_lote([{'id': 999}], conta_bancaria_id=1)
+    
+    assert resultado['success'] is False
+    assert pool.conexao.rollbacks == 1
+    print("✓ Fora da unidade as linhas são liberadas com rollback")
+
+
+if __name__ == '__main__':
+    print("=== TESTE DO RECEBIMENTO EM LOTE ===\n")
+    test_lote_todo_invalido()
+    test_lote_todo_invalido_fora_da_unidade()
+    print("\n✅ Todos os testes passaram")
@@ -217,6 +217,24 @@ def auditar_agora(tabela, registro_id, acao, dados=None):
         ip_address=ip
     )
 
+def auditar_lote_agora(tabela, acao, registros):
+    """
+    Registra auditoria de vários registros de uma vez (operações em lote)
+    Usa informações da sessão e request automaticamente
+    
+    Args:
+        tabela: Nome da tabela
+        acao: 'insert', 'update', 'delete', etc
+        registros: Lista de tuplas (registro_id, dados)
+    """
+    return AuditoriaModel.registrar_acoes_lote(
+        tabela=tabela,
+        acao=acao,
+        registros=registros,
+        usuario_id=session.get('user_id'),
+        ip_address=obter_ip_usuario()
+    )
+
 def obter_dados_form_seguros():
     """
     Obtém dados do formulário removendo campos sensíveis
@@ -0,0 +1,138 @@
+"""
+Cache de resultados em memória para endpoints de dashboard e relatórios
+TTL + LRU, invalidado por contadores de versão das tabelas
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from flask import request, current_app
+from config import Config
+
+
+class ResultCache:
+    """
+    Cache LRU com expiração por TTL, seguro para múltiplas threads
+    
+    As chaves já carregam as versões das tabelas de que o resultado depende:
+    quando uma tabela muda, as entradas antigas simplesmente deixam de ser
+    encontradas e saem pelo LRU/TTL.
+    """
+    
+    def __init__(self, max_itens=256, ttl=300):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expirados': 0, 'removidos_lru': 0}
+    
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self._stats['misses'] += 1
+                return None
+            
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                self._stats['expirados'] += 1
+                self._stats['misses'] += 1
+                return None
+            
+            self._itens.move_to_end(chave)
+            self._stats['hits'] += 1
+            return valor
+    
+    def set(self, chave, valor, ttl=None):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + (ttl or self.ttl), valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self._stats['removidos_lru'] += 1
+    
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+    
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, itens=len(self._itens), max_itens=self.max_itens)
+
+
+cache_resultados = ResultCache(max_itens=Config.CACHE_MAX_ITENS, ttl=Config.CACHE_TTL)
+
+# Versão de cada tabela; incrementada a cada escrita confirmada
+_versoes = {}
+_versoes_lock = threading.Lock()
+
+
+def versoes_tabelas(tabelas):
+    """Tupla com a versão atual de cada tabela (na ordem recebida)"""
+    with _versoes_lock:
+        return tuple(_versoes.get(tabela, 0) for tabela in tabelas)
+
+
+def invalidar_tabelas(*tabelas, conn=None):
+    """
+    Incrementa a versão das tabelas, invalidando os resultados que dependem delas
+    
+    Quando a conexão informada está dentro de um unit_of_work o incremento só
+    acontece após o commit real, para que nenhuma requisição concorrente grave no
+    cache um resultado calculado antes da escrita ficar visível.
+    
+    Usage:
+        conn.commit()
+        invalidar_tabelas('contas_pagar', conn=conn)
+    """
+    def incrementar():
+        with _versoes_lock:
+            for tabela in tabelas:
+                _versoes[tabela] = _versoes.get(tabela, 0) + 1
+    
+    if conn is not None and hasattr(conn, 'apos_commit'):
+        conn.apos_commit(incrementar)
+    else:
+        incrementar()
+
+
+def cache_resposta(*tabelas, ttl=None):
+    """
+    Decorator que guarda a resposta da view, chaveada por endpoint, parâmetros e
+    versões das tabelas de que ela depende
+    
+    Em deploy com vários processos cada um tem o próprio cache; o TTL limita por
+    quanto tempo um processo pode servir um resultado anterior a uma escrita feita
+    em outro.
+    
+    Usage:
+        @dashboard_bp.route('/api/kpis')
+        @login_required
+        @cache_resposta('contas_receber', 'contas_pagar', ttl=60)
+        def api_kpis():
+            ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            chave = (
+                request.endpoint,
+                tuple(sorted(request.args.items(multi=True))),
+                tuple(sorted(kwargs.items())),
+                versoes_tabelas(tabelas),
+                date.today()  # janelas relativas a "hoje" mudam na virada do dia
+            )
+            
+            em_cache = cache_resultados.get(chave)
+            if em_cache is not None:
+                corpo, status, mimetype = em_cache
+                return current_app.response_class(corpo, status=status, mimetype=mimetype)
+            
+            resposta = current_app.make_response(f(*args, **kwargs))
+            if resposta.status_code == 200 and not resposta.is_streamed:
+                cache_resultados.set(chave, (resposta.get_data(), resposta.status_code, resposta.mimetype), ttl)
+            return resposta
+        return decorated_function
+    return decorator
@@ -0,0 +1,147 @@
+"""
+Paginação por keyset (cursor) para as listagens de contas
+O cursor é opaco para o cliente: base64 de um JSON com a ordenação, o valor da
+coluna de ordenação e o id da última (ou primeira) linha da página
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+# Ordenações aceitas: nome -> (coluna, direção). O id sempre desempata na mesma direção.
+ORDENACOES = {
+    'vencimento_asc': ('data_vencimento', 'ASC'),
+    'vencimento_desc': ('data_vencimento', 'DESC'),
+    'emissao_asc': ('data_emissao', 'ASC'),
+    'emissao_desc': ('data_emissao', 'DESC'),
+    'valor_asc': ('valor_total', 'ASC'),
+    'valor_desc': ('valor_total', 'DESC')
+}
+ORDEM_PADRAO = 'vencimento_asc'
+
+TAMANHOS_PAGINA = (25, 50, 100, 200)
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+
+
+def normalizar_ordem(ordem):
+    """Retorna a ordenação informada, ou a padrão quando for desconhecida"""
+    return ordem if ordem in ORDENACOES else ORDEM_PADRAO
+
+
+def normalizar_limite(limite):
+    """Limita o tamanho da página entre 1 e LIMITE_MAXIMO"""
+    try:
+        limite = int(limite)
+    except (TypeError, ValueError):
+        return LIMITE_PADRAO
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def _serializar(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def codificar_cursor(ordem, linha, sentido='depois'):
+    """
+    Gera o cursor a partir de uma linha da página
+    
+    Args:
+        ordem: Nome da ordenação (chave de ORDENACOES)
+        linha: Dict da linha (precisa ter a coluna de ordenação e o id)
+        sentido: 'depois' (próxima página) ou 'antes' (página anterior)
+    """
+    coluna = ORDENACOES[ordem][0]
+    dados = {'o': ordem, 'v': _serializar(linha[coluna]), 'id': linha['id'], 's': sentido}
+    texto = json.dumps(dados, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, ordem):
+    """
+    Lê o cursor recebido do cliente
+    
+    Returns:
+        dict com 'valor', 'id' e 'sentido', ou None quando o cursor estiver vazio,
+        inválido ou pertencer a outra ordenação (volta para a primeira página)
+    """
+    if not cursor:
+        return None
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        dados = json.loads(texto)
+        if dados['o'] != ordem or dados['s'] not in ('depois', 'antes'):
+            return None
+        return {'valor': dados['v'], 'id': int(dados['id']), 'sentido': dados['s']}
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def montar_keyset(alias, ordem, cursor):
+    """
+    Monta a condição e o ORDER BY da página
+    
+    Usa a forma expandida (col > v OR (col = v AND id > x)) em vez da comparação
+    de tuplas, que o MySQL nem sempre resolve pelo índice. Para a página anterior
+    a ordem é invertida e as linhas devem ser revertidas depois (ver paginar).
+    
+    Returns:
+        tuple: (sql_condicao, params, sql_order_by)
+    """
+    coluna, direcao = ORDENACOES[ordem]
+    
+    voltando = cursor is not None and cursor['sentido'] == 'antes'
+    if voltando:
+        direcao = 'DESC' if direcao == 'ASC' else 'ASC'
+    
+    order_by = f" ORDER BY {alias}.{coluna} {direcao}, {alias}.id {direcao}"
+    
+    if cursor is None:
+        return "", [], order_by
+    
+    op = '>' if direcao == 'ASC' else '<'
+    condicao = (f" AND ({alias}.{coluna} {op} %s"
+                f" OR ({alias}.{coluna} = %s AND {alias}.id {op} %s))")
+    return condicao, [cursor['valor'], cursor['valor'], cursor['id']], order_by
+
+
+def paginar(linhas, limite, ordem, cursor):
+    """
+    Monta o resultado da página a partir das linhas buscadas com LIMIT limite + 1
+    
+    Returns:
+        dict: {'itens', 'proximo_cursor', 'cursor_anterior', 'limite', 'ordem'}
+    """
+    tem_mais = len(linhas) > limite
+    itens = list(linhas[:limite])
+    
+    voltando = cursor is not None and cursor['sentido'] == 'antes'
+    if voltando:
+        itens.reverse()
+    
+    # Indo para frente: há próxima se sobrou linha; há anterior se veio de um cursor.
+    # Voltando: sempre há próxima (a página de onde se voltou); há anterior se sobrou linha.
+    tem_proxima = tem_mais if not voltando else True
+    tem_anterior = cursor is not None if not voltando else tem_mais
+    
+    return {
+        'itens': itens,
+        'proximo_cursor': codificar_cursor(ordem, itens[-1], 'depois') if itens and tem_proxima else None,
+        'cursor_anterior': codificar_cursor(ordem, itens[0], 'antes') if itens and tem_anterior else None,
+        'limite': limite,
+        'ordem': ordem
+    }
+
+
+def linha_json(linha):
+    """Converte Decimal/date da linha para tipos serializáveis em JSON"""
+    return {
+        chave: float(valor) if isinstance(valor, Decimal)
+        else valor.isoformat() if isinstance(valor, (date, datetime))
+        else valor
+        for chave, valor in linha.items()
+    }